@@ -3,25 +3,41 @@ AC DualSense Adapter - Assetto Corsa Series 自适应扳机与 DualSense 手柄
 支持: Assetto Corsa / Assetto Corsa Competizione / Assetto Corsa Rally
 Version 1.0.0
 """
-import socket
-import json
-from enum import Enum
-from ctypes import *
 import time
+from startup_report import StartupReport
+startup = StartupReport()  # 尽早创建，记录之后各阶段的启动耗时
+
+from ctypes import *
 import os
 import sys
 import configparser
 import psutil
 import mmap
 import math
-import tkinter as tk
-from tkinter import ttk
-from tkinter import font as tkfont
+import struct
+import atexit
 import threading
 from collections import deque
-import numpy as np
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+from shm_snapshot import SeqlockSnapshot
+from ac_config import load_runtime_config, replace_runtime_config, parse_config_file
+from config_common import parse_or_reject
+from config_watcher import ConfigWatcher
+from lap_ghost import LapGhost
+from adapter_core import (InstructionType, PlayerLEDNewRevision, Instruction, Packet, DSXClient,
+                          normal_trigger_instructions, rpm_led_color, interpolate_color, InputFrame, axle_slips,
+                          build_slip_triggers)
+
+# tkinter 只在启用仪表盘时由 load_gui_modules() 导入，控制台模式启动更快
+tk = ttk = tkfont = None
+
+def load_gui_modules():
+    """导入仪表盘所需模块(耗时计入启动报告)；可重复调用"""
+    global tk, ttk, tkfont
+    if tkfont is not None:
+        return
+    tk = startup.import_module('tkinter')
+    ttk = startup.import_module('tkinter.ttk')
+    tkfont = startup.import_module('tkinter.font')
 
 __version__ = '1.0.0'
 
@@ -74,6 +90,84 @@ class ACPhysics(Structure):
         ("abs", c_float),                       # 252: ABS
     ]
 
+# physics 页在 abs 之后的字段(AC 1.16 / ACC 公布的 SPageFilePhysics 布局)。热路径只用上面的 ACPhysics 前缀；
+# 这些字段只在有订阅者时(ACSharedMemoryReader.subscribe_extended)才映射、复制
+AC_PHYSICS_EXTENDED_FIELDS = [
+    ("kersCharge", c_float),                    # 256
+    ("kersInput", c_float),
+    ("autoShifterOn", c_int),
+    ("rideHeight", c_float * 2),
+    ("turboBoost", c_float),
+    ("ballast", c_float),
+    ("airDensity", c_float),
+    ("airTemp", c_float),
+    ("roadTemp", c_float),
+    ("localAngularVel", c_float * 3),
+    ("finalFF", c_float),
+    ("performanceMeter", c_float),
+    ("engineBrake", c_int),
+    ("ersRecoveryLevel", c_int),
+    ("ersPowerLevel", c_int),
+    ("ersHeatCharging", c_int),
+    ("ersIsCharging", c_int),
+    ("kersCurrentKJ", c_float),
+    ("drsAvailable", c_int),
+    ("drsEnabled", c_int),
+    ("brakeTemp", c_float * 4),                 # 348: 刹车温度
+    ("clutch", c_float),
+    ("tyreTempI", c_float * 4),                 # 胎面内/中/外侧温度
+    ("tyreTempM", c_float * 4),
+    ("tyreTempO", c_float * 4),
+    ("isAIControlled", c_int),
+    ("tyreContactPoint", (c_float * 3) * 4),    # 420: 轮胎接地点(世界坐标)
+    ("tyreContactNormal", (c_float * 3) * 4),
+    ("tyreContactHeading", (c_float * 3) * 4),
+    ("brakeBias", c_float),
+    ("localVelocity", c_float * 3),
+    ("P2PActivations", c_int),
+    ("P2PStatus", c_int),
+    ("currentMaxRpm", c_int),
+    ("mz", c_float * 4),
+    ("fx", c_float * 4),
+    ("fy", c_float * 4),
+    ("slipRatio", c_float * 4),                 # 640: 纵向滑移率
+    ("slipAngle", c_float * 4),                 # 656: 侧偏角
+    ("tcinAction", c_int),
+    ("absInAction", c_int),
+    ("suspensionDamage", c_float * 4),
+    ("tyreTemp", c_float * 4),                  # AC 1.16 的 physics 页到此为止，以下字段仅 ACC
+    ("waterTemp", c_float),                    # 712
+    ("brakePressure", c_float * 4),
+    ("frontBrakeCompound", c_int),
+    ("rearBrakeCompound", c_int),
+    ("padLife", c_float * 4),
+    ("discLife", c_float * 4),
+    ("ignitionOn", c_int),
+    ("starterEngineOn", c_int),
+    ("isEngineRunning", c_int),
+    ("kerbVibration", c_float),                 # 路肩/震动反馈(ACC)
+    ("slipVibrations", c_float),
+    ("gVibrations", c_float),
+    ("absVibrations", c_float),
+]
+
+class ACPhysicsFull(Structure):
+    """完整的 physics 页(ACC, 800 字节): ACPhysics 前缀 + 扩展字段"""
+    _fields_ = ACPhysics._fields_ + AC_PHYSICS_EXTENDED_FIELDS
+
+_AC_PAGE_END = [name for name, _ in AC_PHYSICS_EXTENDED_FIELDS].index('waterTemp')
+
+class ACPhysicsAC(Structure):
+    """AC 1.16 的 physics 页(712 字节，到 tyreTemp 为止)；页较短时映射 ACPhysicsFull 会失败，退回此布局"""
+    _fields_ = ACPhysics._fields_ + AC_PHYSICS_EXTENDED_FIELDS[:_AC_PAGE_END]
+
+# ACGraphics.status
+AC_OFF = 0
+AC_REPLAY = 1
+AC_LIVE = 2
+AC_PAUSE = 3
+AC_STATUS_NAMES = {AC_OFF: "Menu", AC_REPLAY: "Replay", AC_LIVE: "Live", AC_PAUSE: "Paused"}
+
 class ACGraphics(Structure):
     """AC/ACC/ACR Graphics Shared Memory Structure"""
     _fields_ = [
@@ -101,6 +195,26 @@ class ACGraphics(Structure):
         ("carCoordinates", c_float * 3),
     ]
 
+# graphics 页中按 graphics_rate_hz 读取的数值字段: 只解包这些字段，不复制整页，也不解码 c_wchar 字符串
+GRAPHICS_FIELDS = ('status', 'session', 'completedLaps', 'position', 'iCurrentTime', 'iLastTime', 'iBestTime',
+                   'isInPit', 'currentSectorIndex', 'lastSectorTime', 'normalizedCarPosition')
+
+def numeric_layout(struct_type, names):
+    """把 struct_type 中的 c_int/c_float 字段编译成一个 struct.Struct(字段之间的间隙用填充字节跳过)，
+    返回 (起始偏移, 按偏移排序的字段名, Struct)，一次 unpack_from 即可读出全部字段"""
+    types = dict(struct_type._fields_)
+    fields = sorted((getattr(struct_type, name).offset, name) for name in names)
+    start = position = fields[0][0]
+    fmt = '<'
+    for offset, name in fields:
+        if offset > position:
+            fmt += f'{offset - position}x'
+        fmt += 'i' if types[name] is c_int else 'f'
+        position = offset + 4
+    return start, tuple(name for _, name in fields), struct.Struct(fmt)
+
+GRAPHICS_LAYOUT = numeric_layout(ACGraphics, GRAPHICS_FIELDS)
+
 class ACStaticInfo(Structure):
     """AC/ACC/ACR Static Info Shared Memory Structure"""
     _fields_ = [
@@ -126,15 +240,33 @@ class ACStaticInfo(Structure):
 # Shared Memory Reader
 ###################################################################################
 
+TORN_READ_RETRIES = 3  # packetId 前后不一致(游戏正在写入)时的最大重试次数
+
 class ACSharedMemoryReader:
-    """AC系列游戏共享内存读取器"""
+    """AC系列游戏共享内存读取器
+    zero_copy=True 时 read_physics() 返回直接映射在共享内存上的 ACPhysics(不复制，字段读取的是游戏当前写入的值);
+    交给其他线程前用 stable_copy() 复制一份一致的快照"""
     
-    def __init__(self):
+    def __init__(self, zero_copy=False):
         self.physics_shm = None
         self.graphics_shm = None
+        self.graphics_snapshot = None  # graphics 数值字段的 SeqlockSnapshot(以 graphics 页的 packetId 为序号)
         self.static_shm = None
+        self.zero_copy = zero_copy
+        self.physics_view = None
+        self.physics_snapshot = None  # physics 页的 SeqlockSnapshot(以 packetId 为序号)
+        # 扩展字段订阅者: callback(完整 physics 快照)，在遥测线程中调用；没有订阅者时完整页不映射也不复制
+        self.extended_subscribers = []
+        self.extended_shm = None
+        self.extended_snapshot = None
+        self.next_extended_try = 0.0
         self.last_physics_data = None
         self.last_error_time = 0
+        self.torn_reads = 0  # 零拷贝计算期间 packetId 变化而重算的次数
+        # packetId 去重: 上次交给主循环处理的帧，以及读取/重复帧计数(由 take_frame_stats() 取出并清零)
+        self.last_packet_id = None
+        self.reads = 0
+        self.duplicate_reads = 0
         
     def connect(self):
         """连接到AC共享内存"""
@@ -145,6 +277,10 @@ class ACSharedMemoryReader:
                 sizeof(ACPhysics), 
                 tagname="Local\\acpmf_physics"
             )
+            self.physics_snapshot = SeqlockSnapshot.over_buffer(ACPhysics, self.physics_shm, 'packetId',
+                                                                retries=TORN_READ_RETRIES)
+            if self.zero_copy:
+                self.physics_view = ACPhysics.from_buffer(self.physics_shm)
             return True
         except Exception as e:
             current_time = time.time()
@@ -160,9 +296,7 @@ class ACSharedMemoryReader:
                 return None
         
         try:
-            self.physics_shm.seek(0)
-            data_bytes = self.physics_shm.read(sizeof(ACPhysics))
-            physics = ACPhysics.from_buffer_copy(data_bytes)
+            physics = self.physics_view if self.zero_copy else self.stable_copy()
             
             # 验证数据有效性
             if physics.packetId <= 0:
@@ -176,26 +310,108 @@ class ACSharedMemoryReader:
             if current_time - self.last_error_time > 5:
                 print(f"Error reading physics data: {e}")
                 self.last_error_time = current_time
-            self.physics_shm = None
+            self._release_physics()
             return None
     
-    def read_graphics(self):
-        """读取Graphics数据"""
+    def stable_copy(self):
+        """从 mmap 复制一份 ACPhysics(单次复制)；复制前后 packetId 不同说明读到了写入中的帧，重试"""
+        return self.physics_snapshot.read()[0]
+    
+    def _release_physics(self):
+        """关闭 physics 映射; 零拷贝视图引用着 mmap 的缓冲区，必须先释放视图才能关闭"""
+        self.physics_view = None
+        self.physics_snapshot = None
+        self.last_physics_data = None
+        if self.physics_shm:
+            try:
+                self.physics_shm.close()
+            except BufferError as e:
+                # 调用方仍持有 from_buffer 视图(主循环的 physics 等)，映射无法关闭
+                print(f"[AC] physics mapping still in use, not closed: {e}")
+            except OSError as e:
+                print(f"[AC] failed to close physics mapping: {e}")
+        self.physics_shm = None
+    
+    def subscribe_extended(self, callback):
+        """订阅 abs 之后的扩展字段(刹车温度、滑移率/侧偏角、接地点、路肩震动等)"""
+        self.extended_subscribers.append(callback)
+    
+    def unsubscribe_extended(self, callback):
+        if callback in self.extended_subscribers:
+            self.extended_subscribers.remove(callback)
+    
+    def _map_extended(self):
+        """按 ACC 的完整布局映射 physics 页，页较短(AC)时退回 ACPhysicsAC；都失败时 5 秒后再试"""
+        now = time.time()
+        if now < self.next_extended_try:
+            return False
+        self.next_extended_try = now + 5.0
+        for struct_type in (ACPhysicsFull, ACPhysicsAC):
+            try:
+                shm = mmap.mmap(-1, sizeof(struct_type), tagname="Local\\acpmf_physics")
+            except Exception:
+                continue
+            self.extended_shm = shm
+            self.extended_snapshot = SeqlockSnapshot.over_buffer(struct_type, shm, 'packetId',
+                                                                 retries=TORN_READ_RETRIES)
+            return True
+        return False
+    
+    def publish_extended(self):
+        """有订阅者时主循环在每个新物理帧调用: 复制一份完整的 physics 页交给各订阅者"""
+        if not self.extended_snapshot and not self._map_extended():
+            return
+        full, _ = self.extended_snapshot.read()
+        for callback in list(self.extended_subscribers):
+            callback(full)
+    
+    def peek_packet_id(self):
+        """只读取 physics 页的 packetId(4字节，不解码整个结构)；未连接时返回 None"""
+        if not self.physics_shm:
+            return None
         try:
-            if not self.graphics_shm:
-                self.graphics_shm = mmap.mmap(
-                    -1, 
-                    sizeof(ACGraphics), 
-                    tagname="Local\\acpmf_graphics"
-                )
-            
-            self.graphics_shm.seek(0)
-            data_bytes = self.graphics_shm.read(sizeof(ACGraphics))
-            graphics = ACGraphics.from_buffer_copy(data_bytes)
-            return graphics
-            
-        except:
-            self.graphics_shm = None
+            return struct.unpack_from('<i', self.physics_shm, 0)[0]
+        except Exception:
+            self._release_physics()
+            return None
+    
+    def read_new_physics(self, wait=0.0):
+        """返回 (physics, is_new): is_new 表示 packetId 自上次处理后已前进。
+        wait > 0 时先在 wait 秒内自旋等待游戏写入下一帧，使读取紧跟在物理帧更新之后"""
+        if wait > 0 and self.physics_shm:
+            current = self.peek_packet_id()
+            deadline = time.perf_counter() + wait
+            while self.peek_packet_id() == current and time.perf_counter() < deadline:
+                time.sleep(0)  # 让出 GIL，仪表盘线程不被饿死
+        physics = self.read_physics()
+        if not physics:
+            return None, False
+        self.reads += 1
+        if physics.packetId == self.last_packet_id:
+            self.duplicate_reads += 1
+            return physics, False
+        self.last_packet_id = physics.packetId
+        return physics, True
+    
+    def take_frame_stats(self):
+        """返回自上次调用以来的 (读取次数, 重复帧次数) 并清零"""
+        stats = (self.reads, self.duplicate_reads)
+        self.reads = self.duplicate_reads = 0
+        return stats
+    
+    def read_graphics_fields(self):
+        """按 GRAPHICS_LAYOUT 读取 graphics 页的数值字段，返回与 GRAPHICS_LAYOUT[1] 对应的元组；不可用时返回 None"""
+        try:
+            if not self.graphics_snapshot:
+                if not self.graphics_shm:
+                    self.graphics_shm = mmap.mmap(-1, sizeof(ACGraphics), tagname="Local\\acpmf_graphics")
+                shm, (start, _, layout) = self.graphics_shm, GRAPHICS_LAYOUT
+                self.graphics_snapshot = SeqlockSnapshot(lambda: struct.unpack_from('<i', shm, 0)[0],
+                                                         lambda: layout.unpack_from(shm, start),
+                                                         retries=TORN_READ_RETRIES)
+            return self.graphics_snapshot.read()[0]
+        except Exception:
+            self.graphics_shm = self.graphics_snapshot = None
             return None
     
     def read_static(self):
@@ -208,10 +424,7 @@ class ACSharedMemoryReader:
                     tagname="Local\\acpmf_static"
                 )
             
-            self.static_shm.seek(0)
-            data_bytes = self.static_shm.read(sizeof(ACStaticInfo))
-            static = ACStaticInfo.from_buffer_copy(data_bytes)
-            return static
+            return ACStaticInfo.from_buffer_copy(self.static_shm)
             
         except:
             self.static_shm = None
@@ -219,106 +432,156 @@ class ACSharedMemoryReader:
     
     def close(self):
         """关闭共享内存"""
-        try:
-            if self.physics_shm:
-                self.physics_shm.close()
-            if self.graphics_shm:
-                self.graphics_shm.close()
-            if self.static_shm:
-                self.static_shm.close()
-        except:
-            pass
+        self._release_physics()
+        self.extended_snapshot = None
+        for name, shm in (('extended', self.extended_shm), ('graphics', self.graphics_shm), ('static', self.static_shm)):
+            if shm:
+                try:
+                    shm.close()
+                except (BufferError, OSError) as e:
+                    print(f"[AC] failed to close {name} mapping: {e}")
+        self.graphics_shm = self.static_shm = self.extended_shm = None
+        self.graphics_snapshot = None
 
 ###################################################################################
-# DualSense Controller Communication
+# Utility Functions
 ###################################################################################
 
-class InstructionType(Enum):
-    """DSX指令类型"""
-    Invalid = 0
-    TriggerUpdate = 1
-    RGBUpdate = 2
-    PlayerLED = 3
-    TriggerThreshold = 4
-    MicLED = 5
-    PlayerLEDNewRevision = 6
-    ResetToUserSettings = 7
-    HapticFeedback = 20
-
-class Trigger(Enum):
-    """扳机类型"""
-    Invalid = 0
-    Left = 1       # L2 - 刹车
-    Right = 2      # R2 - 油门
+# AC系列游戏进程名(小写) -> 游戏名称；同时运行多个时按此顺序优先
+AC_GAME_PROCESSES = {
+    "acr.exe": "Assetto Corsa Rally",
+    "ac2-win64-shipping.exe": "Assetto Corsa Competizione",
+    "ac.exe": "Assetto Corsa",
+    "acs.exe": "Assetto Corsa",              # Assetto Corsa (另一个可执行文件名)
+}
 
-class TriggerMode(Enum):
-    """扳机模式"""
-    Normal = 0
-    GameCube = 1
-    VerySoft = 2
-    Soft = 3
-    Hard = 4
-    VeryHard = 5
-    Hardest = 6
-    Rigid = 7
-    VibrateTrigger = 8
-    Choppy = 9
-    Medium = 10
-    VibrateTriggerPulse = 11      # 脉冲振动 - 用于打滑反馈
-    CustomTriggerValue = 12
-    Resistance = 13
-    Bow = 14
-    Galloping = 15
-    SemiAutomaticGun = 16
-    AutomaticGun = 17
-    Machine = 18
+def find_game_process():
+    """遍历一次进程列表，返回 (pid, 游戏名称)；没有运行时返回 (None, None)"""
+    found = {}
+    for proc in psutil.process_iter(['pid', 'name']):
+        name = (proc.info['name'] or '').lower()
+        if name in AC_GAME_PROCESSES:
+            found[name] = proc.info['pid']
+    for name, game_name in AC_GAME_PROCESSES.items():
+        if name in found:
+            return found[name], game_name
+    return None, None
 
-class Instruction:
-    """DSX指令"""
-    def __init__(self, instruction_type, parameters):
-        # instruction_type 可以是整数或Enum,统一处理
-        self.type = instruction_type if isinstance(instruction_type, int) else instruction_type.value
-        self.parameters = parameters
+def game_process_alive(pid):
+    """会话进程是否仍在运行(按 PID 检查，不遍历进程列表)"""
+    return psutil.pid_exists(pid)
 
-class Packet:
-    """DSX数据包"""
-    def __init__(self, instructions):
-        self.instructions = instructions
+DEFAULT_MAX_RPM = 7000  # 静态信息不可用时的最大转速
 
-###################################################################################
-# Utility Functions
-###################################################################################
-
-def get_process_by_name(name):
-    """通过进程名查找进程"""
-    for proc in psutil.process_iter(['pid', 'name']):
-        if proc.info['name'].lower() == name.lower():
-            return proc.info['pid']
-    return None
-
-def is_game_running():
-    """检查AC系列游戏是否在运行"""
-    game_processes = [
-        "ac.exe",                    # Assetto Corsa
-        "acs.exe",                   # Assetto Corsa (另一个可执行文件名)
-        "AC2-Win64-Shipping.exe",    # Assetto Corsa Competizione
-        "acr.exe",                   # Assetto Corsa Rally
-    ]
+class ACSession:
+    """一次游戏会话内不变的信息: 游戏/PID 在会话开始时解析一次，车辆/赛道/maxRpm 来自 static 页。
+    只在进程退出、physics packetId 回退(重新加载会话)或 static 页 _smVersion/车辆/赛道变化时失效"""
+    
+    ALIVE_CHECK_INTERVAL = 1.0   # 检查进程是否退出的间隔(秒)
+    STATIC_RETRY_INTERVAL = 5.0  # static 页尚未就绪(菜单中 maxRpm=0)时的重试间隔
+    
+    def __init__(self):
+        self.invalidate()
+    
+    def invalidate(self):
+        self.pid = None
+        self.game_name = None
+        self.clear_static()
+        self.last_packet_id = 0
+        self.next_alive_check = 0.0
+    
+    def clear_static(self):
+        self.static_loaded = False
+        self.sm_version = ''
+        self.car_model = ''
+        self.track = ''
+        self.max_rpm = DEFAULT_MAX_RPM
+        self.static_time = 0.0   # static 页最近一次读取成功的时间
+        self.next_static_try = 0.0
+    
+    @property
+    def active(self):
+        return self.pid is not None
     
-    for proc_name in game_processes:
-        if get_process_by_name(proc_name):
+    def start(self):
+        """查找游戏进程并开始新会话；找不到时返回 False"""
+        pid, game_name = find_game_process()
+        if pid is None:
+            return False
+        self.invalidate()
+        self.pid, self.game_name = pid, game_name
+        print(f"Session started: {game_name} (PID {pid})")
+        return True
+    
+    def check_alive(self, now):
+        """按 ALIVE_CHECK_INTERVAL 检查进程；退出时使会话失效并返回 False"""
+        if now < self.next_alive_check:
+            return True
+        self.next_alive_check = now + self.ALIVE_CHECK_INTERVAL
+        if game_process_alive(self.pid):
             return True
-    return False
+        print(f"{self.game_name} exited, session closed")
+        self.invalidate()
+        return False
+    
+    def update(self, reader, packet_id, now):
+        """每个新物理帧调用: packetId 回退说明会话重新加载，需要重新读取 static 页；返回 static 信息是否变化"""
+        if packet_id < self.last_packet_id:
+            self.next_static_try = 0.0
+            self.static_loaded = False
+        self.last_packet_id = packet_id
+        if self.static_loaded or now < self.next_static_try:
+            return False
+        self.next_static_try = now + self.STATIC_RETRY_INTERVAL
+        static = reader.read_static()
+        if not static or static.maxRpm <= 0:
+            return False
+        identity = (static._smVersion, static.carModel, static.track)
+        changed = identity != (self.sm_version, self.car_model, self.track)
+        self.sm_version, self.car_model, self.track = identity
+        self.max_rpm = static.maxRpm
+        self.static_loaded = True
+        self.static_time = now
+        if changed:
+            print(f"Session: {self.car_model} @ {self.track} (max RPM {self.max_rpm}, shared memory {self.sm_version})")
+        return changed
 
-def get_game_name():
-    """获取当前运行的游戏名称"""
-    if get_process_by_name("acr.exe"):
-        return "Assetto Corsa Rally"
-    elif get_process_by_name("AC2-Win64-Shipping.exe"):
-        return "Assetto Corsa Competizione"
-    elif get_process_by_name("ac.exe") or get_process_by_name("acs.exe"):
-        return "Assetto Corsa"
-    return "Unknown"
+class ACFrame:
+    """三个共享内存页合并成的一帧: physics 每个新帧更新，graphics 数值字段按 graphics_rate_hz 更新，
+    static(车辆/赛道/maxRpm)每个会话读取一次。*_time 记录各部分字段最近一次更新的 time.time()(0 = 尚未读取)"""
+    
+    def __init__(self):
+        self.physics = None
+        self.physics_time = 0.0
+        self.clear()
+    
+    def clear(self):
+        """会话结束: graphics/static 字段作废"""
+        for name in GRAPHICS_FIELDS:
+            setattr(self, name, 0)
+        self.graphics_time = 0.0
+        self.car_model = self.track = ''
+        self.max_rpm = DEFAULT_MAX_RPM
+        self.static_time = 0.0
+    
+    def set_physics(self, physics, now):
+        self.physics = physics
+        self.physics_time = now
+    
+    def set_graphics(self, values, now):
+        """values: read_graphics_fields() 的结果"""
+        for name, value in zip(GRAPHICS_LAYOUT[1], values):
+            setattr(self, name, value)
+        self.graphics_time = now
+    
+    def set_static(self, session):
+        self.car_model, self.track, self.max_rpm = session.car_model, session.track, session.max_rpm
+        self.static_time = session.static_time
+    
+    def age(self, part, now):
+        """part: 'physics' / 'graphics' / 'static'；返回距上次更新的秒数，从未读取时为 inf"""
+        updated = getattr(self, part + '_time')
+        return now - updated if updated else float('inf')
 
 ###################################################################################
 # Configuration
@@ -334,6 +597,9 @@ DEFAULT_CONFIG = {
         'adaptive_trigger': 'True',
         'led_effect': 'True',
         'haptic_effect': 'False',
+        'use_gui_dashboard': 'True',
+        'startup_report': 'False',
+        'extended_physics': 'False',        # 仪表盘显示刹车温度/滑移率等扩展字段
     },
     # 刹车滑移反馈参数 (Brake Slip)
     'BrakeSlip': {
@@ -359,11 +625,24 @@ DEFAULT_CONFIG = {
         'fps': '60.0',
         'pause_updates': 'False',
     },
+    'Performance': {
+        'frame_wait_ms': '0',               # 等待下一物理帧的最长自旋时间 ms (0=不等待, 0-10)
+        'zero_copy_physics': 'False',       # 直接在共享内存上读取 physics 字段(不复制)
+        'graphics_rate_hz': '10',           # graphics 页(圈速/分段/状态/赛道位置)的读取频率 Hz (1-60)
+    },
     'LED': {
         'rpm_green': '70',
         'rpm_yellow': '85',
         'rpm_red': '95',
-    }
+    },
+    # 最佳圈参考(按赛道位置索引)与落后提示
+    'Ghost': {
+        'enabled': 'True',
+        'hint': 'player_led',               # off / player_led (触摸板下的玩家灯) / lightbar (灯条)
+        'behind_threshold_ms': '100',       # 落后超过该值才提示
+        'full_scale_ms': '1000',            # 落后该值时提示达到最大(5 个玩家灯/纯品红)
+        'ghosts_dir': 'ghosts',
+    },
 }
 
 # 加载配置
@@ -384,49 +663,71 @@ else:
 DSX_IP = config.get('Network', 'dsx_ip', fallback='127.0.0.1')
 DSX_PORT = config.getint('Network', 'dsx_port', fallback=6969)
 
-adaptive_trigger_enabled = config.getboolean('Features', 'adaptive_trigger', fallback=True)
-led_effect_enabled = config.getboolean('Features', 'led_effect', fallback=True)
-haptic_effect_enabled = config.getboolean('Features', 'haptic_effect', fallback=False)
+use_gui_dashboard = config.getboolean('Features', 'use_gui_dashboard', fallback=True)
+startup.verbose = config.getboolean('Features', 'startup_report', fallback=False)
+extended_physics_enabled = config.getboolean('Features', 'extended_physics', fallback=False)
+
+# 扳机/LED 参数快照: 仪表盘与 config_ac.ini 的修改都整体替换它，遥测循环每个 tick 读取一次
+runtime_config = load_runtime_config(config)
+dashboard = None         # GUI 模式下的 ACTelemetryDashboard，配置文件重载后同步控件
+last_saved_config = None  # 仪表盘最近写入文件的快照，监视线程据此忽略自己的写入
+
+# 每次读取前最多自旋等待多久的新物理帧(0 = 不等待，重复帧直接跳过)
+frame_wait = max(0.0, min(10.0, config.getfloat('Performance', 'frame_wait_ms', fallback=0.0))) / 1000
+# 零拷贝读取 physics: 不再每帧复制 ~256 字节，以 packetId 前后检查防止读到写入中的帧
+zero_copy_physics = config.getboolean('Performance', 'zero_copy_physics', fallback=False)
+# graphics 页的读取间隔: physics 每帧读取，graphics 变化慢，按较低频率读取即可
+graphics_interval = 1.0 / max(1.0, min(60.0, config.getfloat('Performance', 'graphics_rate_hz', fallback=10.0)))
+ghost_enabled = config.getboolean('Ghost', 'enabled', fallback=True)
+ghosts_dir = config.get('Ghost', 'ghosts_dir', fallback='ghosts')
 
-# 刹车滑移参数 (Brake Slip)
-brake_threshold = config.getfloat('BrakeSlip', 'brake_threshold', fallback=3.0)
-brake_front_slip_threshold = config.getfloat('BrakeSlip', 'front_slip_threshold', fallback=0.250)
-brake_rear_slip_threshold = config.getfloat('BrakeSlip', 'rear_slip_threshold', fallback=0.250)
-brake_feedback_strength = config.getint('BrakeSlip', 'feedback_strength', fallback=7)
-brake_amplitude = config.getint('BrakeSlip', 'amplitude', fallback=5)
-brake_min_frequency = config.getint('BrakeSlip', 'min_frequency', fallback=25)
-brake_max_frequency = config.getint('BrakeSlip', 'max_frequency', fallback=85)
+runtime_config_lock = threading.Lock()  # 仪表盘与监视线程两个写入方串行化；遥测循环只读引用，不加锁
 
-# 油门滑移参数 (Throttle Slip)
-throttle_threshold = config.getfloat('ThrottleSlip', 'throttle_threshold', fallback=3.0)
-throttle_front_slip_threshold = config.getfloat('ThrottleSlip', 'front_slip_threshold', fallback=0.350)
-throttle_rear_slip_threshold = config.getfloat('ThrottleSlip', 'rear_slip_threshold', fallback=0.250)
-throttle_feedback_strength = config.getint('ThrottleSlip', 'feedback_strength', fallback=8)
-throttle_amplitude = config.getint('ThrottleSlip', 'amplitude', fallback=4)
-throttle_min_frequency = config.getint('ThrottleSlip', 'min_frequency', fallback=30)
-throttle_max_frequency = config.getint('ThrottleSlip', 'max_frequency', fallback=96)
+def update_runtime_config(**changes):
+    """在当前快照基础上修改部分字段并原子替换; 遥测循环下一个 tick 即使用新值"""
+    global runtime_config
+    with runtime_config_lock:
+        runtime_config = replace_runtime_config(runtime_config, **changes)
 
-# 确保参数在合理范围内
-brake_threshold = max(0.1, min(99.0, brake_threshold))
-brake_front_slip_threshold = max(0.05, min(6.0, brake_front_slip_threshold))
-brake_rear_slip_threshold = max(0.05, min(6.0, brake_rear_slip_threshold))
-brake_feedback_strength = max(1, min(8, brake_feedback_strength))
-brake_amplitude = max(1, min(8, brake_amplitude))
-brake_min_frequency = max(1, min(50, brake_min_frequency))
-brake_max_frequency = max(20, min(150, brake_max_frequency))
+def reload_config():
+    """ConfigWatcher 回调(监视线程): 校验通过才替换快照，无效修改打印原因并保留当前配置"""
+    global config, runtime_config
+    parsed = parse_or_reject(config_file, parse_config_file)
+    if parsed is None:
+        return
+    new_parser, new_config = parsed
+    if new_config == last_saved_config:
+        return  # 仪表盘自己保存的文件，快照已经生效
+    with runtime_config_lock:
+        # GUI 保存时使用的 ConfigParser 与快照一起按引用替换(不在共享对象上 read()，文件中删除的键不会残留)
+        config = new_parser
+        runtime_config = new_config
+    if dashboard:
+        dashboard.root.after(0, dashboard.sync_config)
+    print(f"[Config] 已重新加载 {config_file}")
 
-throttle_threshold = max(0.1, min(99.0, throttle_threshold))
-throttle_front_slip_threshold = max(0.05, min(6.0, throttle_front_slip_threshold))
-throttle_rear_slip_threshold = max(0.05, min(10.0, throttle_rear_slip_threshold))
-throttle_feedback_strength = max(1, min(8, throttle_feedback_strength))
-throttle_amplitude = max(1, min(8, throttle_amplitude))
-throttle_min_frequency = max(1, min(50, throttle_min_frequency))
-throttle_max_frequency = max(20, min(150, throttle_max_frequency))
+CONFIG_SAVE_DELAY_MS = 500  # 拖动滑块时合并写文件: 停止调整该时间后才写入
 
-# LED颜色阈值
-RPM_GREEN_THRESHOLD = config.getfloat('LED', 'rpm_green', fallback=70.0)
-RPM_YELLOW_THRESHOLD = config.getfloat('LED', 'rpm_yellow', fallback=85.0)
-RPM_RED_THRESHOLD = config.getfloat('LED', 'rpm_red', fallback=95.0)
+# 仪表盘的滑移反馈滑块: (快照字段, 配置段, 配置键, 标签, 最小值, 最大值, 类型)；范围与 ac_config 的限制一致
+SLIP_CONTROLS = (
+    ('brake_threshold', 'BrakeSlip', 'brake_threshold', 'Brake Input %', 0.1, 99.0, float),
+    ('brake_front_slip_threshold', 'BrakeSlip', 'front_slip_threshold', 'Front Slip', 0.05, 6.0, float),
+    ('brake_rear_slip_threshold', 'BrakeSlip', 'rear_slip_threshold', 'Rear Slip', 0.05, 6.0, float),
+    ('brake_feedback_strength', 'BrakeSlip', 'feedback_strength', 'Feedback Strength', 1, 8, int),
+    ('brake_amplitude', 'BrakeSlip', 'amplitude', 'Amplitude', 1, 8, int),
+    ('brake_min_frequency', 'BrakeSlip', 'min_frequency', 'Min Frequency', 1, 50, int),
+    ('brake_max_frequency', 'BrakeSlip', 'max_frequency', 'Max Frequency', 20, 150, int),
+    ('throttle_threshold', 'ThrottleSlip', 'throttle_threshold', 'Throttle Input %', 0.1, 99.0, float),
+    ('throttle_front_slip_threshold', 'ThrottleSlip', 'front_slip_threshold', 'Front Slip', 0.05, 6.0, float),
+    ('throttle_rear_slip_threshold', 'ThrottleSlip', 'rear_slip_threshold', 'Rear Slip', 0.05, 10.0, float),
+    ('throttle_feedback_strength', 'ThrottleSlip', 'feedback_strength', 'Feedback Strength', 1, 8, int),
+    ('throttle_amplitude', 'ThrottleSlip', 'amplitude', 'Amplitude', 1, 8, int),
+    ('throttle_min_frequency', 'ThrottleSlip', 'min_frequency', 'Min Frequency', 1, 50, int),
+    ('throttle_max_frequency', 'ThrottleSlip', 'max_frequency', 'Max Frequency', 20, 150, int),
+)
+
+def format_control_value(value, kind):
+    return str(int(value)) if kind is int else f"{value:.2f}"
 
 ###################################################################################
 # GUI Dashboard
@@ -438,7 +739,7 @@ class ACTelemetryDashboard:
     def __init__(self, root):
         self.root = root
         self.root.title("AC DualSense Adapter - Assetto Corsa Series")
-        self.root.geometry("800x627")
+        self.root.geometry("800x820")
         
         # 设置窗口图标
         try:
@@ -457,16 +758,15 @@ class ACTelemetryDashboard:
         self.value_font = tkfont.Font(family="Arial", size=11)
         
         # 参数变量
-        self.trigger_strength = tk.DoubleVar(value=trigger_strength)
-        self.wheel_slip_threshold = tk.DoubleVar(value=wheel_slip_threshold)
-        self.trigger_threshold = tk.DoubleVar(value=trigger_threshold)
-        self.vibration_mode = tk.StringVar(value=vibration_mode)
-        self.max_strength_override = tk.IntVar(value=max_strength_override)
+        cfg = runtime_config
+        self.slip_vars = {field: tk.DoubleVar(value=getattr(cfg, field)) for field, *_ in SLIP_CONTROLS}
+        self.slip_value_labels = {}
+        self._save_job = None
         
         # 功能开关
-        self.adaptive_trigger_enabled = tk.BooleanVar(value=adaptive_trigger_enabled)
-        self.led_effect_enabled = tk.BooleanVar(value=led_effect_enabled)
-        self.haptic_effect_enabled = tk.BooleanVar(value=haptic_effect_enabled)
+        self.adaptive_trigger_enabled = tk.BooleanVar(value=cfg.adaptive_trigger_enabled)
+        self.led_effect_enabled = tk.BooleanVar(value=cfg.led_effect_enabled)
+        self.haptic_effect_enabled = tk.BooleanVar(value=cfg.haptic_effect_enabled)
         
         # FPS控制
         fps_value = min(config.getfloat('GUI', 'fps', fallback=60.0), 60.0)
@@ -556,6 +856,14 @@ class ACTelemetryDashboard:
         ttk.Label(frame, text="Status:", font=self.title_font).grid(row=0, column=2, sticky="w", padx=5)
         self.connection_status_label = ttk.Label(frame, text="Disconnected", font=self.value_font, foreground="red")
         self.connection_status_label.grid(row=0, column=3, sticky="w", padx=5)
+        
+        # 与最佳圈参考的时间差
+        ttk.Label(frame, text="Delta:", font=self.title_font).grid(row=1, column=0, sticky="w", padx=5)
+        self.delta_label = ttk.Label(frame, text="--", font=self.value_font)
+        self.delta_label.grid(row=1, column=1, sticky="w", padx=5)
+        ttk.Label(frame, text="Best:", font=self.title_font).grid(row=1, column=2, sticky="w", padx=5)
+        self.best_lap_label = ttk.Label(frame, text="--", font=self.value_font)
+        self.best_lap_label.grid(row=1, column=3, sticky="w", padx=5)
     
     def create_car_info_section(self, parent):
         """创建车辆信息区域"""
@@ -618,6 +926,8 @@ class ACTelemetryDashboard:
         self.fl_slip_label.pack()
         self.fl_temp_label = ttk.Label(fl_frame, text="Temp: 0°C")
         self.fl_temp_label.pack()
+        self.fl_extended_label = ttk.Label(fl_frame, text="")
+        self.fl_extended_label.pack()
         
         # 前右
         fr_frame = ttk.Frame(front_frame)
@@ -627,6 +937,8 @@ class ACTelemetryDashboard:
         self.fr_slip_label.pack()
         self.fr_temp_label = ttk.Label(fr_frame, text="Temp: 0°C")
         self.fr_temp_label.pack()
+        self.fr_extended_label = ttk.Label(fr_frame, text="")
+        self.fr_extended_label.pack()
         
         # 后轮
         rear_frame = ttk.Frame(wheels_frame)
@@ -640,6 +952,8 @@ class ACTelemetryDashboard:
         self.rl_slip_label.pack()
         self.rl_temp_label = ttk.Label(rl_frame, text="Temp: 0°C")
         self.rl_temp_label.pack()
+        self.rl_extended_label = ttk.Label(rl_frame, text="")
+        self.rl_extended_label.pack()
         
         # 后右
         rr_frame = ttk.Frame(rear_frame)
@@ -649,6 +963,8 @@ class ACTelemetryDashboard:
         self.rr_slip_label.pack()
         self.rr_temp_label = ttk.Label(rr_frame, text="Temp: 0°C")
         self.rr_temp_label.pack()
+        self.rr_extended_label = ttk.Label(rr_frame, text="")
+        self.rr_extended_label.pack()
         
         # 扳机反馈状态
         trigger_status_frame = ttk.Frame(frame)
@@ -681,118 +997,100 @@ class ACTelemetryDashboard:
             command=self.save_config
         ).pack(side=tk.LEFT, padx=10)
         
-        # 参数调节
+        # 滑移反馈参数: 刹车(L2) 与油门(R2) 各一列
         params_frame = ttk.Frame(frame)
         params_frame.pack(fill=tk.X, pady=5)
-        
-        # 扳机强度 (扩展至5.0以获得更强震动)
-        ttk.Label(params_frame, text="Trigger Strength:").grid(row=0, column=0, sticky="w", padx=5)
-        trigger_scale = ttk.Scale(
-            params_frame,
-            from_=0.1,
-            to=5.0,
-            variable=self.trigger_strength,
-            orient=tk.HORIZONTAL,
-            command=self.on_parameter_change
-        )
-        trigger_scale.grid(row=0, column=1, sticky="ew", padx=5)
-        self.trigger_value_label = ttk.Label(params_frame, text=f"{self.trigger_strength.get():.1f}")
-        self.trigger_value_label.grid(row=0, column=2, padx=5)
-        
-        # 震动模式: 连续模式通常比脉冲更强烈
-        ttk.Label(params_frame, text="Vibration Mode:").grid(row=2, column=0, sticky="w", padx=5)
-        vib_mode_combo = ttk.Combobox(params_frame, textvariable=self.vibration_mode, 
-                                      values=["pulse", "continuous"], state="readonly", width=12)
-        vib_mode_combo.grid(row=2, column=1, sticky="w", padx=5)
-        vib_mode_combo.bind("<<ComboboxSelected>>", self.on_parameter_change)
-        
-        # 实验性: 最大强度覆盖 (尝试发送255以获得硬件最大震动)
-        self.max_strength_var = tk.BooleanVar(value=(max_strength_override == 255))
-        ttk.Checkbutton(
-            params_frame,
-            text="Experimental: Max Strength (255)",
-            variable=self.max_strength_var,
-            command=self.on_parameter_change
-        ).grid(row=3, column=0, columnspan=2, sticky="w", padx=5)
-        
-        # 打滑阈值
-        ttk.Label(params_frame, text="Slip Threshold:").grid(row=1, column=0, sticky="w", padx=5)
-        slip_scale = ttk.Scale(
-            params_frame,
-            from_=0.05,
-            to=1.0,
-            variable=self.wheel_slip_threshold,
-            orient=tk.HORIZONTAL,
-            command=self.on_parameter_change
-        )
-        slip_scale.grid(row=1, column=1, sticky="ew", padx=5)
-        self.slip_value_label = ttk.Label(params_frame, text=f"{self.wheel_slip_threshold.get():.2f}")
-        self.slip_value_label.grid(row=1, column=2, padx=5)
-        
-        params_frame.grid_columnconfigure(1, weight=1)
+        columns = {'BrakeSlip': ttk.LabelFrame(params_frame, text="Brake Slip (L2)", padding=5),
+                   'ThrottleSlip': ttk.LabelFrame(params_frame, text="Throttle Slip (R2)", padding=5)}
+        for column, section_frame in enumerate(columns.values()):
+            section_frame.grid(row=0, column=column, sticky="nsew", padx=5)
+            section_frame.grid_columnconfigure(1, weight=1)
+            params_frame.grid_columnconfigure(column, weight=1)
+        
+        rows = dict.fromkeys(columns, 0)
+        for field, section, _, label, low, high, kind in SLIP_CONTROLS:
+            section_frame, row = columns[section], rows[section]
+            rows[section] += 1
+            ttk.Label(section_frame, text=label + ":").grid(row=row, column=0, sticky="w", padx=5)
+            ttk.Scale(
+                section_frame,
+                from_=low,
+                to=high,
+                variable=self.slip_vars[field],
+                orient=tk.HORIZONTAL,
+                command=self.on_parameter_change
+            ).grid(row=row, column=1, sticky="ew", padx=5)
+            value_label = ttk.Label(section_frame, width=6,
+                                    text=format_control_value(self.slip_vars[field].get(), kind))
+            value_label.grid(row=row, column=2, padx=5)
+            self.slip_value_labels[field] = value_label
+    
+    def slider_values(self):
+        """滑块当前值(整数参数取整); 最小频率超过最大频率时把最大频率推到同一值"""
+        values = {field: kind(round(self.slip_vars[field].get())) if kind is int else self.slip_vars[field].get()
+                  for field, *_, kind in SLIP_CONTROLS}
+        for prefix in ('brake', 'throttle'):
+            if values[prefix + '_min_frequency'] > values[prefix + '_max_frequency']:
+                values[prefix + '_max_frequency'] = values[prefix + '_min_frequency']
+                self.slip_vars[prefix + '_max_frequency'].set(values[prefix + '_min_frequency'])
+        return values
+    
+    def show_slider_values(self, cfg):
+        for field, *_, kind in SLIP_CONTROLS:
+            self.slip_value_labels[field].config(text=format_control_value(getattr(cfg, field), kind))
     
     def on_parameter_change(self, event=None):
         """参数变化回调"""
-        # 更新所有值标签
-        if hasattr(self, '_brake_threshold_label'):
-            self._brake_threshold_label.config(text=f"{self.brake_threshold.get():.1f}%")
-        if hasattr(self, '_front_slip_threshold_label'):
-            self._front_slip_threshold_label.config(text=f"{self.brake_front_slip_threshold.get():.3f}")
-        if hasattr(self, '_rear_slip_threshold_label'):
-            self._rear_slip_threshold_label.config(text=f"{self.brake_rear_slip_threshold.get():.3f}")
-        if hasattr(self, '_feedback_strength_label'):
-            self._feedback_strength_label.config(text=f"{self.brake_feedback_strength.get()}")
-        if hasattr(self, '_amplitude_label'):
-            self._amplitude_label.config(text=f"{self.brake_amplitude.get()}")
-        if hasattr(self, '_min_frequency_label'):
-            self._min_frequency_label.config(text=f"{self.brake_min_frequency.get()} Hz")
-        if hasattr(self, '_max_frequency_label'):
-            self._max_frequency_label.config(text=f"{self.brake_max_frequency.get()} Hz")
-        
-        # 油门参数标签更新
-        if hasattr(self, '_throttle_threshold_label'):
-            self._throttle_threshold_label.config(text=f"{self.throttle_threshold.get():.1f}%")
-        
         self.save_config()
     
     def save_config(self):
-        """保存配置"""
-        global adaptive_trigger_enabled, led_effect_enabled, haptic_effect_enabled
-        global trigger_strength, wheel_slip_threshold, trigger_threshold
-        global vibration_mode, max_strength_override
-        
-        # 更新全局变量
-        adaptive_trigger_enabled = self.adaptive_trigger_enabled.get()
-        led_effect_enabled = self.led_effect_enabled.get()
-        haptic_effect_enabled = self.haptic_effect_enabled.get()
-        trigger_strength = self.trigger_strength.get()
-        wheel_slip_threshold = self.wheel_slip_threshold.get()
-        trigger_threshold = self.trigger_threshold.get()
-        vibration_mode = self.vibration_mode.get()
-        max_strength_override = 255 if self.max_strength_var.get() else 0
-        
-        # 保存到配置文件
-        config['Features']['adaptive_trigger'] = str(adaptive_trigger_enabled)
-        config['Features']['led_effect'] = str(led_effect_enabled)
-        config['Features']['haptic_effect'] = str(haptic_effect_enabled)
-        config['Feedback']['trigger_strength'] = f"{trigger_strength:.2f}"
-        config['Feedback']['wheel_slip_threshold'] = f"{wheel_slip_threshold:.3f}"
-        config['Feedback']['trigger_threshold'] = f"{trigger_threshold:.3f}"
-        config['Feedback']['vibration_mode'] = vibration_mode
-        config['Feedback']['max_strength_override'] = str(max_strength_override)
-        
-        with open(config_file, 'w') as f:
+        """控件修改立即生效(替换快照)，写入 config_ac.ini 推迟到停止调整之后"""
+        update_runtime_config(
+            adaptive_trigger_enabled=self.adaptive_trigger_enabled.get(),
+            led_effect_enabled=self.led_effect_enabled.get(),
+            haptic_effect_enabled=self.haptic_effect_enabled.get(),
+            **self.slider_values(),
+        )
+        self.show_slider_values(runtime_config)
+        if self._save_job:
+            self.root.after_cancel(self._save_job)
+        self._save_job = self.root.after(CONFIG_SAVE_DELAY_MS, self.write_config)
+    
+    def write_config(self):
+        """把当前快照中仪表盘可调的参数写回配置文件"""
+        global last_saved_config
+        self._save_job = None
+        cfg = last_saved_config = runtime_config
+        for section in ('Features', 'BrakeSlip', 'ThrottleSlip'):
+            if not config.has_section(section):
+                config.add_section(section)
+        config['Features']['adaptive_trigger'] = str(cfg.adaptive_trigger_enabled)
+        config['Features']['led_effect'] = str(cfg.led_effect_enabled)
+        config['Features']['haptic_effect'] = str(cfg.haptic_effect_enabled)
+        for field, section, key, _, _, _, kind in SLIP_CONTROLS:
+            value = getattr(cfg, field)
+            config[section][key] = str(value) if kind is int else f"{value:.3f}"
+        
+        with open(config_file, 'w', encoding='utf-8') as f:
             config.write(f)
     
+    def sync_config(self):
+        """配置文件被外部修改并重新加载后，让控件显示新值"""
+        cfg = runtime_config
+        self.adaptive_trigger_enabled.set(cfg.adaptive_trigger_enabled)
+        self.led_effect_enabled.set(cfg.led_effect_enabled)
+        self.haptic_effect_enabled.set(cfg.haptic_effect_enabled)
+        for field, *_ in SLIP_CONTROLS:
+            self.slip_vars[field].set(getattr(cfg, field))
+        self.show_slider_values(cfg)
+    
     def update_values(self, physics_data):
         """更新显示值"""
         if not physics_data:
             return
         
         try:
-            # 更新游戏状态
-            game_name = get_game_name()
-            self.game_name_label.config(text=game_name)
+            # 游戏名称由 show_session() 在会话变化时更新，这里不再每帧查找进程
             self.connection_status_label.config(text="Connected", foreground="green")
             
             # 更新车辆信息
@@ -824,6 +1122,41 @@ class ACTelemetryDashboard:
         except Exception as e:
             print(f"Error updating values: {e}")
     
+    def show_session(self, game_name, car_model='', track=''):
+        """会话开始/结束或车辆、赛道变化时由遥测线程调度(root.after)"""
+        if game_name is None:
+            self.game_name_label.config(text="Waiting...")
+            self.connection_status_label.config(text="Disconnected", foreground="red")
+            return
+        details = f" - {car_model} @ {track}" if car_model else ""
+        self.game_name_label.config(text=game_name + details)
+    
+    def show_game_status(self, status):
+        """graphics status 变化时由遥测线程调度: 暂停/重放/菜单时显示为空闲"""
+        if status is None or status == AC_LIVE:
+            self.connection_status_label.config(text="Connected", foreground="green")
+        else:
+            self.connection_status_label.config(text=f"Idle ({AC_STATUS_NAMES.get(status, status)})", foreground="orange")
+    
+    def show_delta(self, delta_ms, best_lap_ms):
+        """graphics 采样时由遥测线程调度: 正值(落后)显示为红色"""
+        if delta_ms is None:
+            self.delta_label.config(text="--", foreground="gray")
+        else:
+            self.delta_label.config(text=f"{delta_ms / 1000:+.2f}s", foreground="red" if delta_ms > 0 else "green")
+        if best_lap_ms:
+            minutes, seconds = divmod(best_lap_ms / 1000, 60)
+            self.best_lap_label.config(text=f"{int(minutes)}:{seconds:06.3f}")
+        else:
+            self.best_lap_label.config(text="--")
+    
+    def update_extended(self, full):
+        """扩展字段订阅回调([Features] extended_physics): 每个车轮显示刹车温度与滑移率/侧偏角"""
+        labels = (self.fl_extended_label, self.fr_extended_label, self.rl_extended_label, self.rr_extended_label)
+        for i, label in enumerate(labels):
+            label.config(text=f"Brake: {full.brakeTemp[i]:.0f}°C  SR {full.slipRatio[i]:.2f}  "
+                              f"SA {math.degrees(full.slipAngle[i]):.1f}°")
+    
     def update_wheel_slip_display(self, physics_data):
         """更新轮胎打滑显示"""
         wheel_slip = physics_data.wheelSlip
@@ -853,7 +1186,8 @@ class ACTelemetryDashboard:
         """根据打滑值返回颜色"""
         abs_slip = abs(slip_value)
         # 使用刹车和油门阈值的平均值
-        avg_threshold = (brake_front_slip_threshold + throttle_front_slip_threshold) / 2
+        cfg = runtime_config
+        avg_threshold = (cfg.brake_front_slip_threshold + cfg.throttle_front_slip_threshold) / 2
         if abs_slip < avg_threshold:
             return "green"
         elif abs_slip < avg_threshold * 2:
@@ -863,32 +1197,33 @@ class ACTelemetryDashboard:
     
     def update_trigger_status(self, physics_data):
         """更新扳机反馈状态"""
-        if not adaptive_trigger_enabled:
+        cfg = runtime_config
+        if not cfg.adaptive_trigger_enabled:
             self.trigger_status_label.config(text="Disabled", foreground="gray")
             return
         
-        wheel_slip = physics_data.wheelSlip
         gas = physics_data.gas * 100
         brake = physics_data.brake * 100
         
         # 计算前后轮打滑 (max兼容前驱/后驱/四驱)
-        front_slip = max(abs(wheel_slip[0]), abs(wheel_slip[1]))
-        rear_slip = max(abs(wheel_slip[2]), abs(wheel_slip[3]))
+        front_slip, rear_slip = axle_slips(physics_data.wheelSlip, 0)
         
         status_text = "Normal"
         status_color = "green"
         
         # 油门滑移检测(右扳机 R2)
-        if gas > throttle_threshold:
-            if front_slip > throttle_front_slip_threshold or rear_slip > throttle_rear_slip_threshold:
-                percentage = min(1.0, (front_slip * 3.0 + rear_slip * 5.0) / 12.5)
+        spec = cfg.throttle_trigger
+        if gas > spec.input_threshold:
+            if front_slip > spec.front_threshold or rear_slip > spec.rear_threshold:
+                percentage = min(1.0, front_slip * spec.front_weight + rear_slip * spec.rear_weight)
                 status_text = f"Throttle Slip! (R2: {percentage:.2f})"
                 status_color = "red"
         
         # 刹车滑移检测(左扳机 L2)
-        elif brake > brake_threshold:
-            if front_slip > brake_front_slip_threshold or rear_slip > brake_rear_slip_threshold:
-                percentage = min(1.0, (front_slip * 4.0 + rear_slip * 2.0) / 17.5)
+        elif brake > cfg.brake_trigger.input_threshold:
+            spec = cfg.brake_trigger
+            if front_slip > spec.front_threshold or rear_slip > spec.rear_threshold:
+                percentage = min(1.0, front_slip * spec.front_weight + rear_slip * spec.rear_weight)
                 status_text = f"Brake Lock! (L2: {percentage:.2f})"
                 status_color = "red"
         
@@ -898,13 +1233,15 @@ class ACTelemetryDashboard:
 # Main Loop - Telemetry and Controller Feedback
 ###################################################################################
 
+dsx_client = None  # 第一次发送时创建，之后一直复用同一个 socket
+
 def send_to_dsx(packet):
     """发送数据包到DSX"""
+    global dsx_client
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        message = json.dumps(packet, default=lambda o: o.__dict__)
-        sock.sendto(message.encode(), (DSX_IP, DSX_PORT))
-        sock.close()
+        if dsx_client is None:
+            dsx_client = DSXClient(DSX_IP, DSX_PORT)
+        dsx_client.send(packet)
         return True
     except Exception as e:
         # 只在第一次失败时打印错误,避免刷屏
@@ -917,169 +1254,211 @@ def send_to_dsx(packet):
             send_to_dsx._error_printed = True
         return False
 
-def interpolate_color(color1, color2, factor):
-    """颜色插值"""
-    return [
-        int(color1[0] + (color2[0] - color1[0]) * factor),
-        int(color1[1] + (color2[1] - color1[1]) * factor),
-        int(color1[2] + (color2[2] - color1[2]) * factor)
-    ]
+FRAME_STATS_INTERVAL = 10.0  # 重复帧比例的统计/输出间隔(秒)
+IDLE_POLL_INTERVAL = 0.05      # 空闲(暂停/重放/菜单)时检查 packetId 的间隔(秒); 重放中 packetId 持续前进，graphics 页最多每次轮询读取一次
+
+def reset_packet():
+    """空闲时发送一次: 扳机恢复正常、灯条与玩家灯(参考圈提示)熄灭"""
+    return Packet(normal_trigger_instructions() + [
+        Instruction(InstructionType.RGBUpdate, [0, 0, 0, 0]),
+        Instruction(InstructionType.PlayerLEDNewRevision, [0, PlayerLEDNewRevision.AllOff]),
+    ])
+
+def ghost_hint_instruction(cfg, delta_ms):
+    """落后于参考圈的提示: player_led 按落后程度点亮 1-5 个玩家灯; lightbar 灯条由蓝变品红(代替转速灯)。
+    不需要提示时 player_led 熄灭玩家灯，lightbar 返回 None(保留转速灯)"""
+    behind = delta_ms is not None and delta_ms > cfg.ghost_behind_ms
+    factor = min(1.0, (delta_ms - cfg.ghost_behind_ms) / (cfg.ghost_full_scale_ms - cfg.ghost_behind_ms)) if behind else 0.0
+    if cfg.ghost_hint == 'player_led':
+        led = PlayerLEDNewRevision(min(4, int(factor * 5))) if behind else PlayerLEDNewRevision.AllOff
+        return Instruction(InstructionType.PlayerLEDNewRevision, [0, led])
+    if behind:
+        r, g, b = interpolate_color((0, 0, 255), (255, 0, 255), factor)
+        return Instruction(InstructionType.RGBUpdate, [0, r, g, b])
+    return None
+
+def report_frame_stats(ac_reader, app=None, root=None):
+    """输出最近一个区间的重复帧比例: 仪表盘模式显示在状态栏，控制台模式打印"""
+    reads, duplicates = ac_reader.take_frame_stats()
+    if not reads:
+        return
+    text = (f"Frames: {reads - duplicates} new / {duplicates} duplicate "
+            f"({duplicates / reads * 100:.0f}% duplicate) in the last {FRAME_STATS_INTERVAL:.0f}s")
+    if ac_reader.physics_snapshot:
+        # 复制快照的一致性统计(累计)与零拷贝重算次数
+        text += f" | snapshots: {ac_reader.physics_snapshot.stats_text()}, {ac_reader.torn_reads} recomputed"
+    if app:
+        root.after(0, lambda: app.status_bar.config(text=text))
+    else:
+        print(f"[AC] {text}")
+
+###################################################################################
+# 扳机反馈逻辑 - 基于 Race-Element 优化算法
+###################################################################################
+
+def ac_input_frame(physics):
+    """ACPhysics -> InputFrame: wheelSlip 保持 AC 的单位(不是百分比)，踏板转换为 %，车速不超过 5 km/h 时 slips 为 None"""
+    slips = tuple(physics.wheelSlip) if physics.speedKmh > 5 else None
+    return InputFrame(slips, physics.brake * 100, physics.gas * 100, physics.rpms)
 
-def main_telemetry_loop(app, root):
-    """主遥测循环"""
+def build_ac_packet(physics, max_rpm):
+    """由一帧 physics 计算扳机与 LED 指令; 不修改任何状态，零拷贝读取时可在 packetId 变化后重算"""
+    cfg = runtime_config  # 整个包使用同一个快照
+    inputs = ac_input_frame(physics)
+    packet = Packet([])
+
+    # 自适应扳机
+    if cfg.adaptive_trigger_enabled:
+        packet.instructions.extend(build_slip_triggers(cfg.brake_trigger, cfg.throttle_trigger, inputs))
+
+    # LED效果
+    if cfg.led_effect_enabled and inputs.rpm > 0:
+        rpm_percentage = min(100, (inputs.rpm / max_rpm) * 100)
+        r, g, b = rpm_led_color(rpm_percentage, cfg.rpm_green, cfg.rpm_yellow, cfg.rpm_red)
+        packet.instructions.append(Instruction(InstructionType.RGBUpdate, [0, r, g, b]))
+    
+    return packet
+
+def main_telemetry_loop(app=None, root=None):
+    """主遥测循环; app/root 为 None 时为控制台模式(无仪表盘)"""
     print("Starting AC telemetry thread...")
     
-    ac_reader = ACSharedMemoryReader()
-    last_static_info_time = 0
-    static_info = None
-    max_rpm = 7000  # 默认最大转速
+    ac_reader = ACSharedMemoryReader(zero_copy_physics)
+    session = ACSession()
+    frame = ACFrame()
+    physics = None
+    ghost = LapGhost(ghosts_dir) if ghost_enabled else None
+    if ghost:
+        atexit.register(ghost.writer.flush)  # 退出前写完尚未写盘的参考圈
+    if app and extended_physics_enabled:
+        ac_reader.subscribe_extended(lambda full: root.after(0, lambda f=full: app.update_extended(f)))
+    
+    def show_session():
+        if app and root.winfo_exists():
+            root.after(0, lambda s=(session.game_name, session.car_model, session.track): app.show_session(*s))
     
-    while app.update_thread_running and root.winfo_exists() and not app.exit_event.is_set():
+    # graphics status 门控: 非驾驶状态下进入空闲模式，不计算效果、不发送(进入时发送一次复位包)
+    idle = False
+    idle_packet_id = None
+    next_status_check = 0.0
+    exit_event = app.exit_event if app else threading.Event()
+    console_interval = 1.0 / min(config.getfloat('GUI', 'fps', fallback=60.0), 60.0)
+    next_stats_time = time.time() + FRAME_STATS_INTERVAL
+    
+    while not exit_event.is_set() and (app is None or (app.update_thread_running and root.winfo_exists())):
         try:
-            # 检查游戏是否运行
-            if not is_game_running():
-                time.sleep(1)
+            tick_start = time.perf_counter()
+            interval = app.update_interval if app else console_interval
+            
+            # 检查游戏是否运行: 会话开始时遍历一次进程列表，之后只按 PID 检查
+            if not session.active:
+                if not session.start():
+                    time.sleep(1)
+                    continue
+                show_session()
+            elif not session.check_alive(time.time()):
+                physics = None  # 先释放对零拷贝视图的引用，否则 mmap 无法关闭(BufferError)
+                ac_reader.close()  # 释放旧会话的映射，游戏重新启动后重新连接
+                frame.clear()
+                if ghost:
+                    ghost.end_session()
+                show_session()
+                continue
+            
+            # graphics 页按 graphics_rate_hz 读取; 空闲时每次轮询发现 packetId 前进就立即读取，恢复驾驶后当帧即回到全速
+            now = time.time()
+            packet_id = ac_reader.peek_packet_id() if idle else None
+            if now >= next_status_check or (idle and packet_id != idle_packet_id):
+                next_status_check = now + graphics_interval
+                graphics = ac_reader.read_graphics_fields()
+                if graphics:
+                    frame.set_graphics(graphics, now)
+                status = frame.status if graphics else None
+                live = status is None or status == AC_LIVE  # 无 graphics 页时不做门控
+                if idle != (not live):
+                    idle = not live
+                    print(f"[AC] {AC_STATUS_NAMES.get(status, status)}: "
+                          + ("idle, effects paused" if idle else "resuming effects"))
+                    if idle:
+                        send_to_dsx(reset_packet())
+                    if app and root.winfo_exists():
+                        root.after(0, lambda s=status: app.show_game_status(s))
+                idle_packet_id = ac_reader.peek_packet_id()
+                # 最佳圈参考: 只记录驾驶中的圈(不含重放)，delta 为一次数组索引
+                if ghost and graphics and status == AC_LIVE and frame.static_time:
+                    delta = ghost.update(frame.normalizedCarPosition, frame.iCurrentTime, frame.completedLaps,
+                                         frame.iLastTime, frame.isInPit)
+                    if app and root.winfo_exists():
+                        root.after(0, lambda d=delta, b=ghost.best_lap_ms: app.show_delta(d, b))
+            if idle:
+                time.sleep(IDLE_POLL_INTERVAL)
                 continue
             
             # 读取Physics数据
-            physics = ac_reader.read_physics()
+            physics, new_frame = ac_reader.read_new_physics(frame_wait)
             
             if not physics or physics.packetId <= 0:
                 time.sleep(0.1)
                 continue
+            frame.set_physics(physics, time.time())
             
-            # 更新GUI
-            if not app.pause_updates and root.winfo_exists():
-                root.after(0, lambda p=physics: app.update_values(p))
+            if time.time() >= next_stats_time:
+                next_stats_time = time.time() + FRAME_STATS_INTERVAL
+                report_frame_stats(ac_reader, app, root)
             
-            # 读取静态信息(每5秒一次)
-            current_time = time.time()
-            if current_time - last_static_info_time > 5:
-                static_info = ac_reader.read_static()
-                if static_info and static_info.maxRpm > 0:
-                    max_rpm = static_info.maxRpm
-                last_static_info_time = current_time
+            # packetId 未前进(暂停/加载，或读取快于游戏物理频率): 与上次结果相同，跳过计算、发送和GUI更新
+            if not new_frame:
+                time.sleep(interval)
+                continue
             
-            ###################################################################################
-            # 扳机反馈逻辑 - 基于 Race-Element 优化算法
-            ###################################################################################
+            # 更新GUI(在 Tk 线程中读取，零拷贝模式下先复制一份一致的快照)
+            if app and not app.pause_updates and root.winfo_exists():
+                snapshot = ac_reader.stable_copy() if ac_reader.zero_copy else physics
+                root.after(0, lambda p=snapshot: app.update_values(p))
+            if ac_reader.extended_subscribers:
+                ac_reader.publish_extended()
             
-            packet = Packet([])
+            # 静态信息(车辆/赛道/maxRpm)每个会话只读取一次
+            if session.update(ac_reader, physics.packetId, time.time()):
+                show_session()
+            if session.static_time != frame.static_time:
+                frame.set_static(session)
+                if ghost:
+                    ghost.start_session(frame.track, frame.car_model)
+            max_rpm = frame.max_rpm
             
-            # 自适应扳机
-            if adaptive_trigger_enabled:
-                # 只在车辆运动时应用效果
-                if physics.speedKmh > 5:
-                    wheel_slip = physics.wheelSlip
-                    brake_input = physics.brake * 100  # 转换为百分比
-                    throttle_input = physics.gas * 100
-                    
-                    # 计算前后轮打滑 (绝对值)
-                    front_slip = max(abs(wheel_slip[0]), abs(wheel_slip[1]))
-                    rear_slip = max(abs(wheel_slip[2]), abs(wheel_slip[3]))
-                    
-                    # === 刹车滑移反馈 (左扳机 L2) ===
-                    if brake_input > brake_threshold:
-                        # 检查前后轮是否超过阈值
-                        if front_slip > brake_front_slip_threshold or rear_slip > brake_rear_slip_threshold:
-                            # 计算滑移系数 (参考 Race-Element 算法)
-                            front_slip_coef = front_slip * 4.0  # 限制在 ~10
-                            rear_slip_coef = rear_slip * 2.0    # 限制在 ~7.5
-                            
-                            # 计算总百分比 (0-1)
-                            percentage = (front_slip_coef + rear_slip_coef) / 17.5
-                            percentage = max(0.0, min(1.0, percentage))
-                            
-                            if percentage >= 0.05:  # 最小触发阈值
-                                # 1) FEEDBACK 模式 - 提供阻力感
-                                feedback_str = int(brake_feedback_strength * percentage)
-                                feedback_str = max(1, min(8, feedback_str))
-                                
-                                packet.instructions.append(
-                                    Instruction(InstructionType.TriggerUpdate.value,
-                                               [0, Trigger.Left.value, 21, 1, feedback_str, 0])  # mode=21=FEEDBACK
-                                )
-                                
-                                # 2) VIBRATION 模式 - 提供震动反馈
-                                freq = int(brake_min_frequency + (brake_max_frequency - brake_min_frequency) * percentage)
-                                freq = max(brake_min_frequency, min(brake_max_frequency, freq))
-                                
-                                packet.instructions.append(
-                                    Instruction(InstructionType.TriggerUpdate.value,
-                                               [0, Trigger.Left.value, 23, 0, brake_amplitude, freq])  # mode=23=VIBRATION
-                                )
-                    
-                    # === 油门滑移反馈 (右扳机 R2) ===
-                    if throttle_input > throttle_threshold:
-                        # 检查前后轮是否超过阈值
-                        if front_slip > throttle_front_slip_threshold or rear_slip > throttle_rear_slip_threshold:
-                            # 计算滑移系数 (参考 Race-Element 算法)
-                            front_slip_coef = front_slip * 3.0  # 限制在 ~5
-                            rear_slip_coef = rear_slip * 5.0    # 限制在 ~7.5
-                            
-                            # 计算总百分比 (0-1)
-                            percentage = (front_slip_coef + rear_slip_coef) / 12.5
-                            percentage = max(0.0, min(1.0, percentage))
-                            
-                            if percentage >= 0.05:  # 最小触发阈值
-                                # 1) FEEDBACK 模式 - 提供阻力感
-                                feedback_str = int(throttle_feedback_strength * percentage)
-                                feedback_str = max(1, min(8, feedback_str))
-                                
-                                packet.instructions.append(
-                                    Instruction(InstructionType.TriggerUpdate.value,
-                                               [0, Trigger.Right.value, 21, 1, feedback_str, 0])  # mode=21=FEEDBACK
-                                )
-                                
-                                # 2) VIBRATION 模式 - 提供震动反馈
-                                freq = int(throttle_min_frequency + (throttle_max_frequency - throttle_min_frequency) * percentage)
-                                freq = max(throttle_min_frequency, min(throttle_max_frequency, freq))
-                                
-                                packet.instructions.append(
-                                    Instruction(InstructionType.TriggerUpdate.value,
-                                               [0, Trigger.Right.value, 23, 0, throttle_amplitude, freq])  # mode=23=VIBRATION
-                                )
-                
-                # 如果没有触发任何效果,恢复正常模式
-                if not packet.instructions:
-                    packet.instructions.append(
-                        Instruction(InstructionType.TriggerUpdate.value,
-                                   [0, Trigger.Left.value, TriggerMode.Normal.value, 0, 0, 0])
-                    )
-                    packet.instructions.append(
-                        Instruction(InstructionType.TriggerUpdate.value,
-                                   [0, Trigger.Right.value, TriggerMode.Normal.value, 0, 0, 0])
-                    )
+            packet = build_ac_packet(physics, max_rpm)
+            if ac_reader.zero_copy:
+                # 零拷贝: 字段是在游戏写入的同时读取的; 计算期间 packetId 变化说明可能读到了两帧混合的数据，重算
+                for _ in range(TORN_READ_RETRIES):
+                    packet_id = physics.packetId
+                    if packet_id == ac_reader.last_packet_id:
+                        break
+                    ac_reader.torn_reads += 1
+                    ac_reader.last_packet_id = packet_id
+                    packet = build_ac_packet(physics, max_rpm)
             
-            # LED效果
-            if led_effect_enabled and physics.rpms > 0:
-                rpm_percentage = min(100, (physics.rpms / max_rpm) * 100)
-                
-                if rpm_percentage < RPM_GREEN_THRESHOLD:
-                    r, g, b = 0, 255, 0
-                elif rpm_percentage < RPM_YELLOW_THRESHOLD:
-                    factor = (rpm_percentage - RPM_GREEN_THRESHOLD) / (RPM_YELLOW_THRESHOLD - RPM_GREEN_THRESHOLD)
-                    r, g, b = interpolate_color([0, 255, 0], [255, 255, 0], factor)
-                elif rpm_percentage < RPM_RED_THRESHOLD:
-                    factor = (rpm_percentage - RPM_YELLOW_THRESHOLD) / (RPM_RED_THRESHOLD - RPM_YELLOW_THRESHOLD)
-                    r, g, b = interpolate_color([255, 255, 0], [255, 0, 0], factor)
-                else:
-                    r, g, b = 255, 0, 0
-                
-                packet.instructions.append(Instruction(InstructionType.RGBUpdate.value, [0, r, g, b]))
+            cfg = runtime_config
+            if ghost and ghost.best is not None and cfg.ghost_hint != 'off':
+                hint = ghost_hint_instruction(cfg, ghost.delta_ms)
+                if hint and hint.type == InstructionType.RGBUpdate:
+                    packet.instructions = [i for i in packet.instructions if i.type != InstructionType.RGBUpdate]
+                if hint:
+                    packet.instructions.append(hint)
             
             # 发送到DSX
-            if packet.instructions:
-                send_to_dsx(packet)
+            if packet.instructions and send_to_dsx(packet):
+                startup.first_packet()
             
-            # 控制更新频率
-            time.sleep(app.update_interval)
+            # 控制更新频率(自旋等待新帧的时间也计入本周期)
+            time.sleep(max(0, interval - (time.perf_counter() - tick_start)))
             
         except Exception as e:
             print(f"Error in telemetry loop: {e}")
             time.sleep(0.5)
     
-    # 清理
+    # 清理: 先释放对零拷贝视图的引用，否则 mmap 无法关闭(BufferError)
+    physics = None
     ac_reader.close()
     print("Telemetry thread exited")
 
@@ -1089,6 +1468,8 @@ def main_telemetry_loop(app, root):
 
 def main():
     """主函数"""
+    global dashboard
+    startup.mark('module imports and config')
     print("="*70)
     print("AC DualSense Adapter - Assetto Corsa Series")
     print(f"Version {__version__}")
@@ -1103,16 +1484,32 @@ def main():
     print("="*70)
     
     # 检查游戏是否运行
-    if is_game_running():
-        print(f"Detected: {get_game_name()}")
+    game_pid, game_name = find_game_process()
+    if game_pid:
+        print(f"Detected: {game_name}")
     else:
         print("Warning: No AC game detected. Please start the game first.")
     
     print("="*70)
     
+    # 运行时热重载 config_ac.ini（修改后保存即可生效，无需重启）；监视/解析/校验均在后台线程
+    config_watcher = ConfigWatcher(config_file, reload_config)
+    config_watcher.start()
+    
+    if not use_gui_dashboard:
+        # 控制台模式: 不导入 tkinter，遥测循环直接在主线程运行
+        print("Telemetry dashboard disabled (console mode), press Ctrl+C to exit")
+        try:
+            main_telemetry_loop()
+        except KeyboardInterrupt:
+            print("Shutdown complete")
+        return
+    
     # 创建GUI
+    load_gui_modules()
+    startup.mark('GUI modules imported')
     root = tk.Tk()
-    app = ACTelemetryDashboard(root)
+    app = dashboard = ACTelemetryDashboard(root)
     
     # 启动遥测线程
     app.update_thread_running = True
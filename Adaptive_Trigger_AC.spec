@@ -16,6 +16,8 @@ a = Analysis(
         'pydirectinput', 'keyboard', 'psutil',
         'win32gui', 'win32con', 'win32api', 'win32process',
         'numpy', 'matplotlib', 'PIL', 'PIL._tkinter_finder',
+        # 仪表盘模块由 load_gui_modules() 按名称导入，分析阶段看不到
+        'tkinter', 'tkinter.ttk', 'tkinter.font',
     ],
     hookspath=[],
     hooksconfig={},
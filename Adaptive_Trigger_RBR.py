@@ -2,38 +2,58 @@
 RBR DualSense Adapter - Richard Burns Rally 自适应扳机与 DualSense 手柄适配
 Version 1.5.7
 """
-import socket
+import time
+from startup_report import StartupReport
+startup = StartupReport()  # 尽早创建，记录之后各阶段的启动耗时
+
 import json
-from enum import Enum
 from ctypes import *
-import time
 import os
 import sys
+import importlib.util
 import configparser
-import psutil  # Add this import for process handling
+from gear_shift import AutoShiftLogic, SHIFT_UP, SHIFT_DOWN, MAX_SHIFT_CLUTCH, GEAR_SHIFT_PRESETS
+from rbr_config import load_runtime_config, replace_runtime_config, parse_config_file
+from config_common import parse_or_reject
+from config_watcher import ConfigWatcher
+from shift_worker import ShiftWorker, ShiftFrame
+from key_injector import KeyInjector, PyDirectInputBackend, RecordingBackend
+from tick_profiler import TickProfiler, REPORT_INTERVAL as PROFILE_REPORT_INTERVAL
+from metrics_server import LoopMetrics, TickRate, MetricsServer, histogram_quantiles
+from stack_sampler import StackSampler
+from error_log import ErrorLog
+from adapter_core import (InstructionType, AudioEditType, Instruction, Packet, encode_packet, DSXClient,
+                          normal_trigger_instructions, rpm_led_color, get_process_by_name,
+                          TelemetrySource, InputFrame, build_slip_triggers)
 
 __version__ = '1.5.7'
 
-# pydirectinput for game key simulation; keyboard for global hotkey (preset switch)
-try:
-    import pydirectinput
-    PYDIRECTINPUT_AVAILABLE = True
-except ImportError:
-    PYDIRECTINPUT_AVAILABLE = False
+# pydirectinput for game key simulation (imported by PyDirectInputBackend); keyboard for global hotkeys (preset switch, stack sampling)
+PYDIRECTINPUT_AVAILABLE = importlib.util.find_spec('pydirectinput') is not None
 try:
     import keyboard
     KEYBOARD_AVAILABLE = True
 except ImportError:
     KEYBOARD_AVAILABLE = False
 import math
-import tkinter as tk
-from tkinter import ttk
-from tkinter import font as tkfont
+import atexit
 import threading
 from collections import deque
-import numpy as np
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+
+# GUI 依赖(tkinter/numpy/matplotlib)只在启用仪表盘时由 load_gui_modules() 导入，控制台模式启动更快
+tk = ttk = tkfont = np = FigureCanvasTkAgg = Figure = None
+
+def load_gui_modules():
+    """导入仪表盘所需模块(耗时计入启动报告)；可重复调用"""
+    global tk, ttk, tkfont, np, FigureCanvasTkAgg, Figure
+    if Figure is not None:
+        return
+    tk = startup.import_module('tkinter')
+    ttk = startup.import_module('tkinter.ttk')
+    tkfont = startup.import_module('tkinter.font')
+    np = startup.import_module('numpy')
+    FigureCanvasTkAgg = startup.import_module('matplotlib.backends.backend_tkagg').FigureCanvasTkAgg
+    Figure = startup.import_module('matplotlib.figure').Figure
 
 # ToolTip class for hover hints
 class ToolTip:
@@ -79,13 +99,6 @@ except ImportError:
     print("Please install the required library using 'pip install pywin32'.")
     WINDOWS_API_AVAILABLE = False
 
-# Define memory reading functions
-def get_process_by_name(name):
-    for proc in psutil.process_iter(['pid', 'name']):
-        if proc.info['name'].lower() == name.lower():
-            return proc.info['pid']
-    return None
-
 def bring_game_window_to_foreground(process_name="RichardBurnsRally_SSE.exe"):
     """Bring the game window to foreground so keyboard input reaches it."""
     if not WINDOWS_API_AVAILABLE:
@@ -132,8 +145,6 @@ class MemoryReader:
         self.base_address = None
         self.is_connected = False
         self.show_errors = True  # Add a flag to control error message display
-        self._last_error_time = 0  # Track when the last error was shown
-        self._error_cooldown = 5  # Cooldown in seconds between error messages
         
         # Initialize the memory reader
         self.connect()
@@ -268,21 +279,28 @@ class MemoryReader:
                 sizeof(data_type),
                 byref(bytes_read)
             ):
-                # Only show error if show_errors is True and we're not in cooldown period
-                current_time = time.time()
-                if self.show_errors and (current_time - self._last_error_time) > self._error_cooldown:
-                    print(f"Failed to read memory at address {hex(address)}")
-                    self._last_error_time = current_time
+                # 只计数; 控制台输出由 ErrorLog 后台线程限流完成
+                if self.show_errors:
+                    errors.record('memory.read', f"Failed to read memory at address {hex(address)}")
                 return None
             
             return cast(buffer, POINTER(data_type)).contents.value
         except Exception as e:
-            current_time = time.time()
-            if self.show_errors and (current_time - self._last_error_time) > self._error_cooldown:
-                print(f"Error reading memory: {e}")
-                self._last_error_time = current_time
+            if self.show_errors:
+                errors.record('memory.read', f"Error reading memory: {e}")
             return None
     
+    def read_struct(self, address, struct_type):
+        """读取整个结构体的一份副本(read_memory 只适用于标量类型)；失败时返回 None"""
+        if not self.is_connected:
+            return None
+        buffer = create_string_buffer(sizeof(struct_type))
+        if not windll.kernel32.ReadProcessMemory(self.process_handle, address, buffer, sizeof(struct_type), None):
+            if self.show_errors:
+                errors.record('memory.read', f"Failed to read {struct_type.__name__} at address {hex(address)}")
+            return None
+        return struct_type.from_buffer_copy(buffer)
+
     def read_float(self, address):
         return self.read_memory(address, c_float)
     
@@ -298,122 +316,6 @@ class MemoryReader:
             self.process_handle = None
         self.is_connected = False
 
-# Define trigger modes
-class TriggerMode():
-    Normal = 0
-    GameCube = 1
-    VerySoft = 2
-    Soft = 3
-    Hard = 4
-    VeryHard = 5
-    Hardest = 6
-    Rigid = 7
-    VibrateTrigger = 8
-    Choppy = 9
-    Medium = 10
-    VibrateTriggerPulse = 11
-    CustomTriggerValue = 12
-    Resistance = 13
-    Bow = 14
-    Galloping = 15
-    SemiAutomaticGun = 16
-    AutomaticGun = 17
-    Machine = 18
-
-class CustomTriggerValueMode():
-    OFF = 0
-    Rigid = 1
-    RigidA = 2
-    RigidB = 3
-    RigidAB = 4
-    Pulse = 5
-    PulseA = 6
-    PulseB = 7
-    PulseAB = 8
-    VibrateResistance = 9
-    VibrateResistanceA = 10
-    VibrateResistanceB = 11
-    VibrateResistanceAB = 12
-    VibratePulse = 13
-    VibratePulseA = 14
-    VibratePulseB = 15
-    VibratePulseAB = 16
-
-class PlayerLEDNewRevision():
-    One = 0
-    Two = 1
-    Three = 2
-    Four = 3
-    Five = 4  # Five is Also All On
-    AllOff = 5
-
-class MicLEDMode():
-    On = 0
-    Pulse = 1
-    Off = 2
-
-class Trigger():
-    Invalid = 0
-    Left = 1
-    Right = 2
-
-class InstructionType(Enum):
-    Invalid = 0
-    TriggerUpdate = 1
-    RGBUpdate = 2
-    PlayerLED = 3
-    TriggerThreshold = 4
-    MicLED = 5
-    PlayerLEDNewRevision = 6
-    ResetToUserSettings = 7
-    HapticFeedback = 20
-    EditAudio = 21
-
-class AudioEditType(Enum):
-    Pitch = 0
-    Volume = 1
-    Stop = 2
-    StopAll = 3
-
-class Instruction:
-    def __init__(self, instruction_type, parameters):
-        self.type = instruction_type
-        self.parameters = parameters
-
-    def to_dict(self):
-        # 转换参数中的枚举值
-        converted_params = []
-        for param in self.parameters:
-            if isinstance(param, Enum):
-                converted_params.append(param.value)  # 使用枚举的值
-            else:
-                converted_params.append(param)
-
-        return {
-            "type": self.type.value,  # 使用枚举的值，而不是名称
-            "parameters": converted_params
-        }
-
-    @classmethod
-    def from_dict(cls, data):
-        instruction_type = InstructionType[data["type"]]
-        parameters = data["parameters"]
-        return cls(instruction_type, parameters)
-
-class Packet:
-    def __init__(self, instructions):
-        self.instructions = instructions
-
-    def to_dict(self):
-        return {
-            "instructions": [instr.to_dict() for instr in self.instructions]
-        }
-
-    @classmethod
-    def from_dict(cls, data):
-        instructions = [Instruction.from_dict(instr) for instr in data["instructions"]]
-        return cls(instructions)
-
 class ServerResponse:
     def __init__(self, status, time_received, is_controller_connected, battery_level):
         self.Status = status
@@ -565,16 +467,6 @@ RPM_GREEN_THRESHOLD = 60  # Below this percentage, LED is green
 RPM_YELLOW_THRESHOLD = 80  # Below this percentage, LED transitions from green to yellow
 RPM_RED_THRESHOLD = 95    # Below this percentage, LED transitions from yellow to red
 
-# Helper function for color interpolation
-def interpolate_color(color1, color2, factor):
-    """在两种颜色之间进行线性插值"""
-    r1, g1, b1 = color1
-    r2, g2, b2 = color2
-    r = r1 + (r2 - r1) * factor
-    g = g1 + (g2 - g1) * factor
-    b = b1 + (b2 - b1) * factor
-    return (int(r), int(g), int(b))
-
 class TelemetryOverlay:
     """In-game telemetry data overlay"""
     def __init__(self):
@@ -848,39 +740,39 @@ class TelemetryDashboard:
         self.value_font = tkfont.Font(family="Arial", size=11)
         
         # Haptic震动参数变量
-        self.trigger_strength = tk.DoubleVar(value=trigger_strength)  # 保留用于兼容性（未使用）
-        self.haptic_strength = tk.DoubleVar(value=haptic_strength)
-        self.wheel_slip_threshold = tk.DoubleVar(value=wheel_slip_threshold)
+        self.trigger_strength = tk.DoubleVar(value=runtime_config.trigger_strength)  # 保留用于兼容性（未使用）
+        self.haptic_strength = tk.DoubleVar(value=runtime_config.haptic_strength)
+        self.wheel_slip_threshold = tk.DoubleVar(value=runtime_config.wheel_slip_threshold)
         
         # 刹车滑移参数变量 (Brake Slip)
-        self.brake_threshold = tk.DoubleVar(value=brake_threshold)
-        self.brake_front_slip_threshold = tk.DoubleVar(value=brake_front_slip_threshold)
-        self.brake_rear_slip_threshold = tk.DoubleVar(value=brake_rear_slip_threshold)
-        self.brake_feedback_strength = tk.IntVar(value=brake_feedback_strength)
-        self.brake_amplitude = tk.IntVar(value=brake_amplitude)
-        self.brake_min_frequency = tk.IntVar(value=brake_min_frequency)
-        self.brake_max_frequency = tk.IntVar(value=brake_max_frequency)
-        self.brake_reverse_frequency_mode = tk.BooleanVar(value=brake_reverse_frequency_mode)
-        self.brake_use_automatic_gun = tk.BooleanVar(value=brake_use_automatic_gun)
+        self.brake_threshold = tk.DoubleVar(value=runtime_config.brake_threshold)
+        self.brake_front_slip_threshold = tk.DoubleVar(value=runtime_config.brake_front_slip_threshold)
+        self.brake_rear_slip_threshold = tk.DoubleVar(value=runtime_config.brake_rear_slip_threshold)
+        self.brake_feedback_strength = tk.IntVar(value=runtime_config.brake_feedback_strength)
+        self.brake_amplitude = tk.IntVar(value=runtime_config.brake_amplitude)
+        self.brake_min_frequency = tk.IntVar(value=runtime_config.brake_min_frequency)
+        self.brake_max_frequency = tk.IntVar(value=runtime_config.brake_max_frequency)
+        self.brake_reverse_frequency_mode = tk.BooleanVar(value=runtime_config.brake_reverse_frequency_mode)
+        self.brake_use_automatic_gun = tk.BooleanVar(value=runtime_config.brake_use_automatic_gun)
         
         # 油门滑移参数变量 (Throttle Slip)
-        self.throttle_threshold = tk.DoubleVar(value=throttle_threshold)
-        self.throttle_front_slip_threshold = tk.DoubleVar(value=throttle_front_slip_threshold)
-        self.throttle_rear_slip_threshold = tk.DoubleVar(value=throttle_rear_slip_threshold)
-        self.throttle_feedback_strength = tk.IntVar(value=throttle_feedback_strength)
-        self.throttle_amplitude = tk.IntVar(value=throttle_amplitude)
-        self.throttle_min_frequency = tk.IntVar(value=throttle_min_frequency)
-        self.throttle_max_frequency = tk.IntVar(value=throttle_max_frequency)
-        self.throttle_reverse_frequency_mode = tk.BooleanVar(value=throttle_reverse_frequency_mode)
-        self.throttle_use_automatic_gun = tk.BooleanVar(value=throttle_use_automatic_gun)
+        self.throttle_threshold = tk.DoubleVar(value=runtime_config.throttle_threshold)
+        self.throttle_front_slip_threshold = tk.DoubleVar(value=runtime_config.throttle_front_slip_threshold)
+        self.throttle_rear_slip_threshold = tk.DoubleVar(value=runtime_config.throttle_rear_slip_threshold)
+        self.throttle_feedback_strength = tk.IntVar(value=runtime_config.throttle_feedback_strength)
+        self.throttle_amplitude = tk.IntVar(value=runtime_config.throttle_amplitude)
+        self.throttle_min_frequency = tk.IntVar(value=runtime_config.throttle_min_frequency)
+        self.throttle_max_frequency = tk.IntVar(value=runtime_config.throttle_max_frequency)
+        self.throttle_reverse_frequency_mode = tk.BooleanVar(value=runtime_config.throttle_reverse_frequency_mode)
+        self.throttle_use_automatic_gun = tk.BooleanVar(value=runtime_config.throttle_use_automatic_gun)
         
         # Add feature toggle variables
-        self.adaptive_trigger_enabled = tk.BooleanVar(value=adaptive_trigger_enabled)
-        self.haptic_effect_enabled = tk.BooleanVar(value=haptic_effect_enabled)
-        self.led_effect_enabled = tk.BooleanVar(value=led_effect_enabled)
+        self.adaptive_trigger_enabled = tk.BooleanVar(value=runtime_config.adaptive_trigger_enabled)
+        self.haptic_effect_enabled = tk.BooleanVar(value=runtime_config.haptic_effect_enabled)
+        self.led_effect_enabled = tk.BooleanVar(value=runtime_config.led_effect_enabled)
         
         # 自动换挡模式: 0=关闭, 1=配置1, 2=配置2, 3=配置3
-        self.gear_shift_mode = tk.IntVar(value=0 if not auto_gear_shift_enabled else (active_gear_preset + 1))
+        self.gear_shift_mode = tk.IntVar(value=0 if not runtime_config.auto_gear_shift_enabled else (runtime_config.active_gear_preset + 1))
         
         # Add theme configuration
         self.is_dark_theme = tk.BooleanVar(value=False)
@@ -1367,6 +1259,14 @@ class TelemetryDashboard:
         self.slip_value_label = ttk.Label(slip_frame, text=f"{self.wheel_slip_threshold.get():.1f}", style='Theme.TLabel', width=8, anchor="e")
         self.slip_value_label.grid(row=0, column=2)
         
+        # === Timing 标签页 (主循环各阶段耗时) ===
+        timing_tab_frame = ttk.Frame(notebook, style='Theme.TFrame', padding=10)
+        notebook.add(timing_tab_frame, text="Timing")
+        self.timing_label = ttk.Label(timing_tab_frame, text="", style='Theme.TLabel', font=('Consolas', 9), justify=tk.LEFT)
+        self.timing_label.grid(row=0, column=0, sticky="nw", padx=5)
+        ToolTip(self.timing_label, "主循环每个阶段的耗时分布 (微秒)\nread=读内存 derive=滑移计算 effects=扳机/LED/震动\nshift=换挡帧发布 serialise=JSON序列化 send=UDP发送 gui=仪表盘更新\noverruns: 超过 10ms tick 预算的次数\nErrors: 各出错位置的次数、首次/最近时间与最近一条消息")
+        self.refresh_timing_panel()
+        
         # Add pause update button
         self.pause_button = ttk.Button(
             self.control_panel, 
@@ -1397,6 +1297,16 @@ class TelemetryDashboard:
         self.fps_label.pack(side=tk.LEFT)
     
 
+    def refresh_timing_panel(self):
+        """每秒刷新 Timing 标签页"""
+        if runtime_config.tick_profiling_enabled:
+            text = "\n".join(tick_profiler.table())
+        else:
+            text = "未开启: config.ini [Features] tick_profiling = True"
+        text += "\n\nErrors:\n" + "\n".join(errors.summary())
+        self.timing_label.config(text=text)
+        self.root.after(1000, self.refresh_timing_panel)
+
     def toggle_pause_updates(self):
         """Toggle pause/resume update state"""
         self.pause_updates = not self.pause_updates
@@ -1479,12 +1389,12 @@ class TelemetryDashboard:
     
     def update_haptic_parameters(self, variable, format_str, unit, label):
         """更新Haptic震动参数"""
-        global haptic_strength, wheel_slip_threshold
-        
-        # 更新全局变量
         haptic_strength = self.haptic_strength.get()
         wheel_slip_threshold = self.wheel_slip_threshold.get()
         
+        # 替换运行时配置快照
+        update_runtime_config(haptic_strength=haptic_strength, wheel_slip_threshold=wheel_slip_threshold)
+        
         # 更新传入的标签显示
         value = variable.get()
         label.config(text=(format_str % value) + unit)
@@ -1498,12 +1408,6 @@ class TelemetryDashboard:
     
     def update_new_parameters(self, variable, format_str, unit, label):
         """更新新的Brake/Throttle Slip参数"""
-        global brake_threshold, brake_front_slip_threshold, brake_rear_slip_threshold
-        global brake_feedback_strength, brake_amplitude, brake_min_frequency, brake_max_frequency, brake_reverse_frequency_mode, brake_use_automatic_gun
-        global throttle_threshold, throttle_front_slip_threshold, throttle_rear_slip_threshold
-        global throttle_feedback_strength, throttle_amplitude, throttle_min_frequency, throttle_max_frequency, throttle_reverse_frequency_mode, throttle_use_automatic_gun
-        
-        # 更新全局变量
         brake_threshold = self.brake_threshold.get()
         brake_front_slip_threshold = self.brake_front_slip_threshold.get()
         brake_rear_slip_threshold = self.brake_rear_slip_threshold.get()
@@ -1524,6 +1428,18 @@ class TelemetryDashboard:
         throttle_reverse_frequency_mode = self.throttle_reverse_frequency_mode.get()
         throttle_use_automatic_gun = self.throttle_use_automatic_gun.get()
         
+        # 替换运行时配置快照
+        update_runtime_config(brake_threshold=brake_threshold, brake_front_slip_threshold=brake_front_slip_threshold,
+            brake_rear_slip_threshold=brake_rear_slip_threshold, brake_feedback_strength=brake_feedback_strength,
+            brake_amplitude=brake_amplitude, brake_min_frequency=brake_min_frequency,
+            brake_max_frequency=brake_max_frequency, brake_reverse_frequency_mode=brake_reverse_frequency_mode,
+            brake_use_automatic_gun=brake_use_automatic_gun,
+            throttle_threshold=throttle_threshold, throttle_front_slip_threshold=throttle_front_slip_threshold,
+            throttle_rear_slip_threshold=throttle_rear_slip_threshold, throttle_feedback_strength=throttle_feedback_strength,
+            throttle_amplitude=throttle_amplitude, throttle_min_frequency=throttle_min_frequency,
+            throttle_max_frequency=throttle_max_frequency, throttle_reverse_frequency_mode=throttle_reverse_frequency_mode,
+            throttle_use_automatic_gun=throttle_use_automatic_gun)
+        
         # 更新传入的标签显示
         if label is not None:  # 允许label为None（用于复选框）
             value = variable.get()
@@ -1558,13 +1474,14 @@ class TelemetryDashboard:
     
     def update_feedback_strength(self, format_target=None, *args):
         """Update feedback strength parameter"""
-        global trigger_strength, haptic_strength, wheel_slip_threshold
-        
-        # Update global variables
         trigger_strength = self.trigger_strength.get()
         haptic_strength = self.haptic_strength.get()
         wheel_slip_threshold = self.wheel_slip_threshold.get()
         
+        # Swap in a new runtime config snapshot
+        update_runtime_config(trigger_strength=trigger_strength, haptic_strength=haptic_strength,
+            wheel_slip_threshold=wheel_slip_threshold)
+        
         # Update displayed values
         if format_target is not None:
             if format_target == self.trigger_value_label:
@@ -1585,13 +1502,11 @@ class TelemetryDashboard:
     
     def update_gear_shift_mode(self):
         """切换自动换挡模式(0=关闭,1=配置1,2=配置2,3=配置3)，立即热加载"""
-        global auto_gear_shift_enabled, active_gear_preset, shift_up_rpm, shift_down_rpm
         mode = self.gear_shift_mode.get()
         auto_gear_shift_enabled = mode > 0
-        if mode > 0:
-            active_gear_preset = mode - 1
-            shift_up_rpm[:] = gear_shift_presets[active_gear_preset][0]
-            shift_down_rpm[:] = gear_shift_presets[active_gear_preset][1]
+        active_gear_preset = mode - 1 if mode > 0 else runtime_config.active_gear_preset
+        # 新快照中 shift_up_rpm/shift_down_rpm 随 active_gear_preset 重新计算
+        update_runtime_config(auto_gear_shift_enabled=auto_gear_shift_enabled, active_gear_preset=active_gear_preset)
         # 写入 config 并保存
         if not config.has_section('GearShift'):
             config.add_section('GearShift')
@@ -1606,20 +1521,23 @@ class TelemetryDashboard:
     
     def update_feature_toggles(self):
         """更新功能开关状态"""
-        global adaptive_trigger_enabled, haptic_effect_enabled, led_effect_enabled
-        
-        # 更新全局变量
         adaptive_trigger_enabled = self.adaptive_trigger_enabled.get()
         haptic_effect_enabled = self.haptic_effect_enabled.get()
         led_effect_enabled = self.led_effect_enabled.get()
         
+        # 替换运行时配置快照
+        update_runtime_config(adaptive_trigger_enabled=adaptive_trigger_enabled,
+            haptic_effect_enabled=haptic_effect_enabled, led_effect_enabled=led_effect_enabled)
+        
         # 更新配置文件
         config['Features'] = {
             'adaptive_trigger': str(adaptive_trigger_enabled),
             'led_effect': str(led_effect_enabled),
             'haptic_effect': str(haptic_effect_enabled),
-            'print_telemetry': str(print_telemetry_enabled),
-            'use_gui_dashboard': str(use_gui_dashboard)
+            'print_telemetry': str(runtime_config.print_telemetry_enabled),
+            'use_gui_dashboard': str(use_gui_dashboard),
+            'startup_report': str(startup.verbose),
+            'tick_profiling': str(runtime_config.tick_profiling_enabled)
         }
         
         try:
@@ -1964,10 +1882,10 @@ class TelemetryDashboard:
         
         # Create empty lines for vibration
         self.throttle_line, = self.ax_vibration.plot([], [], 'g-', 
-            label=f'Throttle (Threshold: {wheel_slip_threshold:.1f}, Strength: {trigger_strength:.1f})', 
+            label=f'Throttle (Threshold: {runtime_config.wheel_slip_threshold:.1f}, Strength: {runtime_config.trigger_strength:.1f})', 
             linewidth=1.5)
         self.brake_line, = self.ax_vibration.plot([], [], 'r-', 
-            label=f'Brake (Threshold: {wheel_slip_threshold:.1f}, Strength: {trigger_strength:.1f})', 
+            label=f'Brake (Threshold: {runtime_config.wheel_slip_threshold:.1f}, Strength: {runtime_config.trigger_strength:.1f})', 
             linewidth=1.5)
         
         # Add legend with customized appearance
@@ -2182,9 +2100,7 @@ class TelemetryDashboard:
             self.current_rr_slip = data['slip_rr']
             
         except Exception as e:
-            print(f"Error in update_values: {e}")
-            import traceback
-            traceback.print_exc()  # Print full error stack trace
+            errors.record('gui.update_values', f"Error in update_values: {e}", with_traceback=True)
             # Continue execution despite errors
     
     def start_dashboard(self):
@@ -2229,7 +2145,7 @@ class TelemetryDashboard:
                         return
                     
                     # Get the base address for telemetry data
-                    base_address = memory_reader._get_module_base_address(memory_reader.process.pid, "RichardBurnsRally_SSE.exe")
+                    base_address = memory_reader.base_address  # connect() 已获取模块基址
                     if not base_address:
                         print("Failed to get base address")
                         app.update_thread_running = False
@@ -2248,7 +2164,7 @@ class TelemetryDashboard:
                             # Even if updates are paused, continue reading data but don't send to GUI
                             # Read telemetry data
                             telemetry_address = base_address + telemetry_offset
-                            telemetry_data = memory_reader.read_memory(telemetry_address, TelemetryData)
+                            telemetry_data = memory_reader.read_struct(telemetry_address, TelemetryData)
                             
                             # Only update GUI if not paused and window exists
                             if telemetry_data and root.winfo_exists():
@@ -2267,9 +2183,7 @@ class TelemetryDashboard:
                                 update_interval = getattr(app, 'update_interval', 0.016)  # Default about 60FPS
                                 time.sleep(update_interval)
                         except Exception as e:
-                            print(f"Error in update loop: {e}")
-                            import traceback
-                            traceback.print_exc()  # Print full error stack trace
+                            errors.record('gui.update_loop', f"Error in update loop: {e}", with_traceback=True)
                             time.sleep(0.5)  # Avoid tight error loop
                 except Exception as e:
                     print(f"Critical error in update thread: {e}")
@@ -2328,6 +2242,230 @@ class TelemetryDashboard:
             print(f"Critical error in main application: {e}")
             import traceback
             traceback.print_exc()  # Print full error stack trace
+###################################################################################
+# Telemetry pipeline: reader -> effects -> serialiser (无副作用，可单独导入做基准/测试)
+###################################################################################
+
+class RBRFrame:
+    """一帧 RBR 遥测；read_rbr_frame() 就地更新，指针无效的部分保留上一帧的值"""
+    __slots__ = (
+        'car_speed', 'rpm', 'water_temp', 'turbo_pressure', 'distance_from_start', 'distance_travelled',
+        'distance_to_finish', 'stage_progress', 'race_time', 'race_ended', 'wrong_way', 'gear_id',
+        'stage_start_countdown', 'false_start', 'split1_done', 'split2_done', 'split1_time', 'split2_time',
+        'x_spin', 'y_spin', 'z_spin', 'x_speed', 'y_speed', 'z_speed', 'x_pos', 'y_pos', 'z_pos',
+        'roll', 'pitch', 'yaw', 'ground_speed', 'steering', 'throttle', 'brake', 'handbrake', 'clutch',
+        'ffb_value', 'wheel_speed_fl', 'wheel_speed_fr', 'wheel_speed_rl', 'wheel_speed_rr',
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.race_ended = self.wrong_way = self.false_start = False
+        self.split1_done = self.split2_done = False
+
+
+def read_rbr_frame(reader, frame):
+    """从 RBR 进程内存读取一帧到 frame (地址同 Read_RBRData.cs)
+
+    返回 (game_state_id, in_race)；in_race 为 False 时 frame 不更新。
+    """
+    # Get base addresses as in Read_RBRData.cs
+    num = reader.read_int(23460968)
+    num2 = reader.read_int(8301640)
+    num3 = reader.read_int(9369184)
+    adress = reader.read_int(8301640) + 3076 if num2 else None
+    num5 = reader.read_int(reader.base_address + 4796472) if reader.base_address else None
+
+    if num5:
+        num5 = reader.read_int(num5 + 1032)
+        if num5:
+            num5 = reader.read_int(num5 + 64)
+
+    # Read game state to check if we're in race
+    game_state_id = reader.read_byte(num2 + 1848 - 16) if num2 else 0
+
+    # Only read telemetry if we're in race state and all addresses are valid
+    if not (game_state_id > 0 and num and num2 and num3):
+        return game_state_id, False
+
+    # Read wheel speeds
+    if num5:
+        frame.wheel_speed_fl = reader.read_float(num5 + 988) * 3.6  # Convert to km/h
+        frame.wheel_speed_fr = reader.read_float(num5 + 1676) * 3.6
+        frame.wheel_speed_rl = reader.read_float(num5 + 2364) * 3.6
+        frame.wheel_speed_rr = reader.read_float(num5 + 3052) * 3.6
+
+    # Read car info
+    frame.car_speed = reader.read_float(num + 12)
+    frame.rpm = reader.read_float(num + 16)
+    frame.water_temp = reader.read_float(num + 20)
+    frame.turbo_pressure = reader.read_float(num + 24) / 1000 / 100  # Convert to bar
+    frame.distance_from_start = reader.read_float(num + 32)
+    frame.distance_travelled = reader.read_float(num + 36)
+    frame.distance_to_finish = reader.read_float(num + 40)
+    frame.stage_progress = reader.read_float(num + 0x13C)
+    frame.race_time = reader.read_float(num + 0x140)
+    frame.wrong_way = reader.read_int(num + 0x150) == 1
+    frame.gear_id = reader.read_int(num + 0x170) - 1  # Adjust gear value
+    frame.stage_start_countdown = reader.read_float(num + 0x244)
+    frame.false_start = reader.read_int(num + 0x248) == 1
+
+    frame.split1_done = reader.read_int(num + 0x254) >= 1
+    frame.split2_done = reader.read_int(num + 0x254) >= 2
+    frame.split1_time = reader.read_float(num + 0x258)
+    frame.split2_time = reader.read_float(num + 0x25C)
+    frame.race_ended = reader.read_int(num + 0x2C4) == 1
+
+    # Read car movement data
+    frame.x_spin = reader.read_float(num3 + 400)
+    frame.y_spin = reader.read_float(num3 + 404)
+    frame.z_spin = reader.read_float(num3 + 408)
+    x_speed = frame.x_speed = reader.read_float(num3 + 448)
+    y_speed = frame.y_speed = reader.read_float(num3 + 452)
+    z_speed = frame.z_speed = reader.read_float(num3 + 456)
+    frame.x_pos = reader.read_float(num3 + 320)
+    frame.y_pos = reader.read_float(num3 + 324)
+    frame.z_pos = reader.read_float(num3 + 328)
+
+    # Calculate angles
+    sin_a = reader.read_float(num3 + 272)
+    cos_a = reader.read_float(num3 + 276)
+    num6 = reader.read_float(num3 + 280)
+    num7 = reader.read_float(num3 + 292)
+
+    # These calculations are approximations of the C# code
+    frame.roll = -(num6 * 180) / 3.14159
+    frame.pitch = -(num7 * 180) / 3.14159
+    # For yaw, we need to implement SinCos2AngleRadian
+    frame.yaw = -(math.atan2(sin_a, cos_a) * 180) / 3.14159
+
+    # Calculate ground speed
+    frame.ground_speed = math.sqrt(x_speed**2 + y_speed**2 + z_speed**2)
+
+    # Read control inputs
+    frame.steering = reader.read_float(num2 + 1848 + 92)
+    frame.throttle = reader.read_float(num2 + 1848 + 96) * 100  # Convert to percentage
+    frame.brake = reader.read_float(num2 + 1848 + 100) * 100
+    frame.handbrake = reader.read_float(num2 + 1848 + 104) * 100
+    frame.clutch = reader.read_float(num2 + 1848 + 108) * 100
+
+    # Read FFB value
+    if adress:
+        frame.ffb_value = reader.read_float(adress)
+    return game_state_id, True
+
+
+class RBRSource(TelemetrySource):
+    """RBR 进程内存 -> InputFrame。reader 为当前的 MemoryReader(重连时由主循环替换)；
+    完整遥测在 frame 中，读取后 game_state_id / in_race 有效"""
+
+    def __init__(self, reader=None):
+        self.reader = reader
+        self.frame = RBRFrame()
+        self.game_state_id = 0
+        self.in_race = False
+
+    def read(self):
+        """读取一帧到 self.frame(主循环单独调用，以便 read/derive 阶段分别计时)"""
+        self.game_state_id, self.in_race = read_rbr_frame(self.reader, self.frame)
+
+    def inputs(self):
+        frame = self.frame
+        return InputFrame(compute_wheel_slips(frame), frame.brake, frame.throttle, frame.rpm)
+
+    def read_frame(self):
+        self.read()
+        return self.inputs()
+
+
+def compute_wheel_slips(frame):
+    """四轮滑移率 % (正=打滑, 负=抱死)；车速不超过 5 km/h 时返回 None"""
+    ground_speed_kmh = frame.ground_speed * 3.6  # Convert ground_speed from m/s to km/h
+    if ground_speed_kmh <= 5:
+        return None
+    return (((frame.wheel_speed_fl / ground_speed_kmh) - 1) * 100,
+            ((frame.wheel_speed_fr / ground_speed_kmh) - 1) * 100,
+            ((frame.wheel_speed_rl / ground_speed_kmh) - 1) * 100,
+            ((frame.wheel_speed_rr / ground_speed_kmh) - 1) * 100)
+
+
+def build_led_instruction(rpm, in_race, max_rpm=7500):
+    """转速灯: 绿 -> 黄 -> 红；不在比赛中或转速无效时熄灭
+
+    max_rpm: Different cars have different redlines, 7500 better matches RBR cars than 7000.
+    """
+    # Only process when in race with valid RPM
+    if not (rpm > 0 and in_race):
+        return Instruction(InstructionType.RGBUpdate, [0, 0, 0, 0])
+
+    rpm_percentage = min(100, (rpm / max_rpm) * 100)
+    r, g, b = rpm_led_color(rpm_percentage, RPM_GREEN_THRESHOLD, RPM_YELLOW_THRESHOLD, RPM_RED_THRESHOLD)
+    return Instruction(InstructionType.RGBUpdate, [0, r, g, b])
+
+
+class HapticEffect:
+    """车轮打滑/抱死时的 rumble 震动 (traction loss feedback)，记录 rumble 是否正在播放"""
+
+    def __init__(self, haptics_path):
+        self.rumble_path = os.path.join(haptics_path, "rumble_mid_4c.wav")
+        self.active = False
+        self.last_rumble_time = 0
+
+    def stop_instruction(self):
+        return Instruction(InstructionType.EditAudio, [self.rumble_path, AudioEditType.Stop, 0])
+
+    def update(self, cfg, slips, current_time):
+        """返回本帧的震动指令列表"""
+        if slips is None:
+            # Stop wheel slip rumble if car is not moving fast enough
+            if self.active:
+                self.active = False
+                return [self.stop_instruction()]
+            return []
+
+        fl_slip, fr_slip, rl_slip, rr_slip = slips
+        slip_threshold = cfg.wheel_slip_threshold
+        # Check for significant wheel slip (either spin or lock)
+        max_spin = max(fl_slip if fl_slip > slip_threshold else 0,
+                       fr_slip if fr_slip > slip_threshold else 0,
+                       rl_slip if rl_slip > slip_threshold else 0,
+                       rr_slip if rr_slip > slip_threshold else 0)
+        max_lock = max(abs(fl_slip) if fl_slip < -slip_threshold else 0,
+                       abs(fr_slip) if fr_slip < -slip_threshold else 0,
+                       abs(rl_slip) if rl_slip < -slip_threshold else 0,
+                       abs(rr_slip) if rr_slip < -slip_threshold else 0)
+
+        # Determine if we have significant traction loss
+        if not (max_spin > slip_threshold or max_lock > slip_threshold):
+            # Stop wheel slip rumble if active
+            if self.active:
+                self.active = False
+                return [self.stop_instruction()]
+            return []
+
+        instructions = []
+        # Calculate the intensity based on the maximum slip or lock
+        max_slip_intensity = max(
+            min(1.0, (max_spin - slip_threshold) * cfg.haptic_slip_scale),
+            min(1.0, (max_lock - slip_threshold) * cfg.haptic_slip_scale)
+        )
+        # Apply the user's haptic strength setting
+        final_intensity = max_slip_intensity * cfg.haptic_strength * 0.5
+
+        # Start wheel slip rumble if not already active
+        if not self.active:
+            instructions.append(Instruction(InstructionType.HapticFeedback, [self.rumble_path, True, True]))
+            self.active = True
+
+        # Use the calculated intensity
+        instructions.append(Instruction(InstructionType.EditAudio, [self.rumble_path, AudioEditType.Volume, final_intensity]))
+
+        # Add extra rumble effect for severe slip conditions
+        if (max_spin > 40 or max_lock > 40) and (current_time - self.last_rumble_time > 0.3):
+            instructions.append(Instruction(InstructionType.HapticFeedback, [self.rumble_path, False, False]))
+            self.last_rumble_time = current_time
+        return instructions
+
 
 # Determine the application path and resource path
 if getattr(sys, 'frozen', False):
@@ -2343,473 +2481,302 @@ else:
 config_path = os.path.join(application_path, 'config.ini')
 haptics_path = os.path.join(resource_path, 'haptics')
 
-# Read configuration
+# Read configuration (load_config() 填充; 导入本模块不读写任何文件)
 config = configparser.ConfigParser()
-
-# Check if external config file exists, if not use the default one
-if os.path.exists(config_path):
-    config.read(config_path, encoding='utf-8')
-else:
-    # Use default configuration
-    config['Features'] = {
-        'adaptive_trigger': 'True',
-        'led_effect': 'True',
-        'haptic_effect': 'True',
-        'print_telemetry': 'True',
-        'use_gui_dashboard': 'True'  
-    }
-    config['Network'] = {
-        'udp_port': '6776'
-    }
-    # 刹车滑移反馈参数 (Brake Slip)
-    config['BrakeSlip'] = {
-        'brake_threshold': '3.0',           # 刹车输入阈值 % (0.1-99)
-        'front_slip_threshold': '5.0',      # 前轮滑移率阈值 (1.0-20.0)
-        'rear_slip_threshold': '5.0',       # 后轮滑移率阈值 (1.0-20.0)
-        'feedback_strength': '5',           # 反馈强度 (1-8)
-        'amplitude': '6',                   # 震动振幅 (1-8)
-        'min_frequency': '20',              # 最小频率 Hz (1-50)
-        'max_frequency': '70',              # 最大频率 Hz (20-150)
-        'reverse_frequency_mode': 'False',  # 反转频率模式：True=轻微滑移高频/严重滑移低频
-    }
-    # 油门滑移反馈参数 (Throttle Slip)
-    config['ThrottleSlip'] = {
-        'throttle_threshold': '3.0',        # 油门输入阈值 % (0.1-99)
-        'front_slip_threshold': '7.0',      # 前轮滑移率阈值 (1.0-20.0)
-        'rear_slip_threshold': '7.0',       # 后轮滑移率阈值 (1.0-20.0)
-        'feedback_strength': '5',           # 反馈强度 (1-8)
-        'amplitude': '6',                   # 震动振幅 (1-8)
-        'min_frequency': '20',              # 最小频率 Hz (1-50)
-        'max_frequency': '70',              # 最大频率 Hz (20-150)
-        'reverse_frequency_mode': 'False',  # 反转频率模式：True=轻微滑移高频/严重滑移低频
-    }
-    # 传统参数(向后兼容)
-    config['Feedback'] = {
-        'trigger_strength': '2.0',      # 自适应扳机强度系数 (0.1-2.0)
-        'haptic_strength': '1.0',       # Haptic震动反馈强度系数 (0-1.0)
-        'wheel_slip_threshold': '5.0'   # 轮胎侧滑检测的灵敏度。值越小，越容易检测到侧滑。 (5.0-30.0)
-    }
-    # 添加GUI设置
-    config['GUI'] = {
-        'fps': '60.0',                  # GUI更新帧率 (10-60)
-        'pause_updates': 'False'        # 是否暂停GUI更新
-    }
-    # 添加UI设置
-    config['UI'] = {
-        'show_overlay': 'False',        # 是否显示游戏内覆盖层
-        'overlay_x': '',                # 悬浮窗X坐标（空表示使用默认位置）
-        'overlay_y': ''                 # 悬浮窗Y坐标（空表示使用默认位置）
-    }
-    # Write the default configuration to an external file with comments
-    with open(config_path, 'w', encoding='utf-8') as configfile:
-        # Write Features section with comments
-        configfile.write("[Features]\n")
-        configfile.write("adaptive_trigger = True\n")
-        configfile.write("led_effect = True\n")
-        configfile.write("haptic_effect = True\n")
-        configfile.write("print_telemetry = True\n")
-        configfile.write("use_gui_dashboard = True\n")
-        configfile.write("\n")
-        
-        # Write Network section with comments
-        configfile.write("[Network]\n")
-        configfile.write("udp_port = 6776\n")
-        configfile.write("\n")
-        
-        # Write Feedback section with detailed comments
-        configfile.write("[Feedback]\n")
-        configfile.write("trigger_strength = 2.0\n")
-        configfile.write("haptic_strength = 1.0\n")
-        configfile.write("wheel_slip_threshold = 5.0\n")
-        configfile.write("\n")
-        
-        # Write GUI section with comments
-        configfile.write("[GUI]\n")
-        configfile.write("fps = 60.0\n")
-        configfile.write("pause_updates = False\n")
-        configfile.write("\n")
-        configfile.write("[GearShift]\n")
-        configfile.write("auto_gear_shift = False\n")
-        configfile.write("gear_up_key = e\n")
-        configfile.write("gear_down_key = q\n")
-        # configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
-        # configfile.write("shift_up_rpm = 6800,6500,6300,6000,5800,5500\n")
-        # configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
-        # configfile.write("shift_down_rpm = 2500,2800,3500,4000,4000,4300\n")
-        configfile.write("shift_up_cooldown = 1.0\n")
-        configfile.write("shift_down_cooldown = 0.5\n")
-        configfile.write("active_preset = 2\n")
-        # configfile.write("preset_switch_key = F9\n")
-        configfile.write("gear_shift_debug = False\n")
-        configfile.write("\n")
-        configfile.write("[GearShift_Rally1]\n")
-        configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
-        configfile.write("shift_up_rpm = 8000,7800,6900,6800,6800,6800\n")
-        configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
-        configfile.write("shift_down_rpm = 3000,3500,4500,4500,5000,5000\n")
-        configfile.write("\n")
-        configfile.write("[GearShift_Rally2]\n")
-        configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
-        configfile.write("shift_up_rpm = 6800,6500,6300,6000,5800,5500\n")
-        configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
-        configfile.write("shift_down_rpm = 2500,2800,3500,4000,4000,4300\n")
-        configfile.write("\n")
-        configfile.write("[GearShift_Rally3]\n")
-        configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
-        configfile.write("shift_up_rpm = 9500,9400,9400,9400,9400,9400\n")
-        configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
-        configfile.write("shift_down_rpm = 6000,6300,6500,6800,7000,7000\n")
-    
-    # 必须将刚写入的默认配置读回 config 对象，否则后续 save_config() 会覆盖掉 GearShift_Rally* 档位转速
-    config.read(config_path, encoding='utf-8')
-    print(f"Created default configuration file at {config_path}")
-
-# 配置文件自动升级：如果配置文件缺少新section，自动添加
-config_updated = False
-if not config.has_section('BrakeSlip'):
-    config['BrakeSlip'] = {
-        'brake_threshold': '3.0',
-        'front_slip_threshold': '5.0',
-        'rear_slip_threshold': '5.0',
-        'feedback_strength': '7',
-        'amplitude': '5',
-        'min_frequency': '25',
-        'max_frequency': '85',
-        'reverse_frequency_mode': 'False',
-    }
-    config_updated = True
-
-if not config.has_section('ThrottleSlip'):
-    config['ThrottleSlip'] = {
-        'throttle_threshold': '3.0',
-        'front_slip_threshold': '5.0',
-        'rear_slip_threshold': '5.0',
-        'feedback_strength': '8',
-        'amplitude': '4',
-        'min_frequency': '30',
-        'max_frequency': '96',
-        'reverse_frequency_mode': 'False',
-    }
-    config_updated = True
-
-# 如果配置文件已更新，保存回文件
-if config_updated:
-    with open(config_path, 'w', encoding='utf-8') as configfile:
-        config.write(configfile)
-    print(f"Configuration file upgraded with new sections")
-
-# Get feature settings
-adaptive_trigger_enabled = config.getboolean('Features', 'adaptive_trigger', fallback=True)
-led_effect_enabled = config.getboolean('Features', 'led_effect', fallback=True)
-haptic_effect_enabled = config.getboolean('Features', 'haptic_effect', fallback=True)
-print_telemetry_enabled = config.getboolean('Features', 'print_telemetry', fallback=True)
-use_gui_dashboard = config.getboolean('Features', 'use_gui_dashboard', fallback=True)
-
-# 获取反馈强度设置（传统参数，向后兼容）
-trigger_strength = config.getfloat('Feedback', 'trigger_strength', fallback=1.0)
-haptic_strength = config.getfloat('Feedback', 'haptic_strength', fallback=1.0)
-wheel_slip_threshold = config.getfloat('Feedback', 'wheel_slip_threshold', fallback=10.0)
-
-# 确保值在合理范围内
-trigger_strength = max(0.1, min(2.0, trigger_strength))
-haptic_strength = max(0.0, min(1.0, haptic_strength))
-wheel_slip_threshold = max(5.0, min(30.0, wheel_slip_threshold))
-
-# 刹车滑移参数（BrakeSlip）
-brake_threshold = config.getfloat('BrakeSlip', 'brake_threshold', fallback=3.0)
-brake_front_slip_threshold = config.getfloat('BrakeSlip', 'front_slip_threshold', fallback=5.0)
-brake_rear_slip_threshold = config.getfloat('BrakeSlip', 'rear_slip_threshold', fallback=5.0)
-brake_feedback_strength = config.getint('BrakeSlip', 'feedback_strength', fallback=5)
-brake_amplitude = config.getint('BrakeSlip', 'amplitude', fallback=6)
-brake_min_frequency = config.getint('BrakeSlip', 'min_frequency', fallback=20)
-brake_max_frequency = config.getint('BrakeSlip', 'max_frequency', fallback=70)
-brake_reverse_frequency_mode = config.getboolean('BrakeSlip', 'reverse_frequency_mode', fallback=False)
-brake_use_automatic_gun = config.getboolean('BrakeSlip', 'use_automatic_gun', fallback=False)
-
-# 油门滑移参数（ThrottleSlip）
-throttle_threshold = config.getfloat('ThrottleSlip', 'throttle_threshold', fallback=3.0)
-throttle_front_slip_threshold = config.getfloat('ThrottleSlip', 'front_slip_threshold', fallback=7.0)
-throttle_rear_slip_threshold = config.getfloat('ThrottleSlip', 'rear_slip_threshold', fallback=7.0)
-throttle_feedback_strength = config.getint('ThrottleSlip', 'feedback_strength', fallback=5)
-throttle_amplitude = config.getint('ThrottleSlip', 'amplitude', fallback=6)
-throttle_min_frequency = config.getint('ThrottleSlip', 'min_frequency', fallback=20)
-throttle_max_frequency = config.getint('ThrottleSlip', 'max_frequency', fallback=70)
-throttle_reverse_frequency_mode = config.getboolean('ThrottleSlip', 'reverse_frequency_mode', fallback=False)
-throttle_use_automatic_gun = config.getboolean('ThrottleSlip', 'use_automatic_gun', fallback=False)
-
-# 确保新参数值在合理范围内
-brake_threshold = max(0.1, min(99.0, brake_threshold))
-brake_front_slip_threshold = max(1.0, min(20.0, brake_front_slip_threshold))
-brake_rear_slip_threshold = max(1.0, min(20.0, brake_rear_slip_threshold))
-brake_feedback_strength = max(1, min(8, brake_feedback_strength))
-brake_amplitude = max(1, min(8, brake_amplitude))
-brake_min_frequency = max(1, min(50, brake_min_frequency))
-brake_max_frequency = max(20, min(150, brake_max_frequency))
-
-throttle_threshold = max(0.1, min(99.0, throttle_threshold))
-throttle_front_slip_threshold = max(1.0, min(20.0, throttle_front_slip_threshold))
-throttle_rear_slip_threshold = max(1.0, min(20.0, throttle_rear_slip_threshold))
-throttle_feedback_strength = max(1, min(8, throttle_feedback_strength))
-throttle_amplitude = max(1, min(8, throttle_amplitude))
-throttle_min_frequency = max(1, min(50, throttle_min_frequency))
-throttle_max_frequency = max(20, min(150, throttle_max_frequency))
-
-# 自动换挡配置 - 支持5/6/7档车
-def _parse_rpm_list(config, section, key, default_list, min_rpm=1000, max_rpm=9000):
-    """解析逗号分隔的转速列表，6个值对应1->2至6->7升档，2->1至7->6降档"""
-    try:
-        s = config.get(section, key, fallback=','.join(map(str, default_list)))
-        values = [float(x.strip()) for x in s.split(',') if x.strip()]
-        if len(values) >= 6:
-            return [max(min_rpm, min(max_rpm, v)) for v in values[:6]]
-        result = values + default_list[len(values):]
-        return [max(min_rpm, min(max_rpm, v)) for v in result[:6]]
-    except (ValueError, configparser.Error):
-        return default_list
-
-_default_shift_up = [6000, 6300, 6500, 6800, 6800, 6500]   # 1->2, 2->3, 3->4, 4->5, 5->6, 6->7
-_default_shift_down = [1500, 1800, 2000, 2200, 2500, 2800]  # 2->1, 3->2, 4->3, 5->4, 6->5, 7->6
-
-# 三组预设: Rally1(低功率), Rally2(中), Rally3(高功率)
-_default_rally1_up = [6200, 6400, 6500, 6500, 6300, 6000]
-_default_rally1_down = [2200, 2500, 2800, 3000, 3200, 3500]
-_default_rally2_up = [6800, 6500, 6300, 6000, 5800, 5500]
-_default_rally2_down = [2500, 2800, 3000, 3500, 3800, 4000]
-_default_rally3_up = [7200, 7300, 7500, 7600, 7500, 7200]
-_default_rally3_down = [1800, 2000, 2200, 2500, 2800, 3000]
-
-def _load_preset(config, section, default_up, default_down):
-    if config.has_section(section):
-        up = _parse_rpm_list(config, section, 'shift_up_rpm', default_up, 3000, 9000)
-        down = _parse_rpm_list(config, section, 'shift_down_rpm', default_down, 1000, 4000)
-    else:
-        up = default_up.copy()
-        down = default_down.copy()
-    return (up, down)
-
-# 加载三组预设
-gear_shift_presets = [
-    _load_preset(config, 'GearShift_Rally1', _default_rally1_up, _default_rally1_down),
-    _load_preset(config, 'GearShift_Rally2', _default_rally2_up, _default_rally2_down),
-    _load_preset(config, 'GearShift_Rally3', _default_rally3_up, _default_rally3_down),
-]
-gear_shift_preset_names = ['Rally1', 'Rally2', 'Rally3']
-
-if config.has_section('GearShift'):
-    auto_gear_shift_enabled = config.getboolean('GearShift', 'auto_gear_shift', fallback=False)
-    gear_up_key = config.get('GearShift', 'gear_up_key', fallback='e')
-    gear_down_key = config.get('GearShift', 'gear_down_key', fallback='q')
-    active_gear_preset = config.getint('GearShift', 'active_preset', fallback=2) - 1  # 1-based to 0-based
-    active_gear_preset = max(0, min(2, active_gear_preset))
-    preset_switch_key = config.get('GearShift', 'preset_switch_key', fallback='F9')
-    shift_up_cooldown = config.getfloat('GearShift', 'shift_up_cooldown', fallback=config.getfloat('GearShift', 'shift_cooldown', fallback=0.25))
-    shift_down_cooldown = config.getfloat('GearShift', 'shift_down_cooldown', fallback=config.getfloat('GearShift', 'shift_cooldown', fallback=0.25))
-else:
-    auto_gear_shift_enabled = False
-    gear_up_key = 'e'
-    gear_down_key = 'q'
-    active_gear_preset = 1  # Rally2
-    preset_switch_key = 'F9'
-    shift_up_cooldown = 0.25
-    shift_down_cooldown = 0.25
-shift_up_cooldown = max(0.1, min(1.0, shift_up_cooldown))
-shift_down_cooldown = max(0.1, min(1.0, shift_down_cooldown))
-gear_shift_debug = config.getboolean('GearShift', 'gear_shift_debug', fallback=False) if config.has_section('GearShift') else False
-
-# 当前使用的换挡转速(从预设加载，热键可切换)
-shift_up_rpm = gear_shift_presets[active_gear_preset][0].copy()
-shift_down_rpm = gear_shift_presets[active_gear_preset][1].copy()
-
-# Get network settings
-UDP_PORT = config.getint('Network', 'udp_port', fallback=6778)
+runtime_config = None
+gear_shift_preset_names = [name for name, _, _, _ in GEAR_SHIFT_PRESETS]
+dashboard = None
 
 # Define UDP port
 UDP_IP = "127.0.0.1"
 UDP_DSX_PORT = 6969
 
+# 主循环分阶段耗时([Features] tick_profiling)；预算为 100Hz 的一个 tick
+TICK_INTERVAL = 0.01
+tick_profiler = TickProfiler(int(TICK_INTERVAL * 1e9))
+loop_metrics = LoopMetrics()  # 主循环计数器, 由 metrics 端点读取
+errors = ErrorLog()  # 各出错位置的计数/采样消息; 控制台输出在后台线程中限流
+
+def print_error_summary():
+    """退出时输出尚未打印的错误与各位置汇总(无错误时不输出)"""
+    if errors.sites:
+        errors.flush()
+        print("[ErrorLog] summary:\n  " + "\n  ".join(errors.summary()))
+
+def load_config():
+    """读取 config.ini (不存在时创建默认配置，缺少的 section 自动补齐) 并设置运行参数"""
+    global use_gui_dashboard, runtime_config, preset_switch_key, initial_shift_latency, shift_worker_hz
+    global key_hold_time, record_sessions, sessions_dir, UDP_PORT, metrics_port
+    global sampling_hotkey, sampling_seconds, sampling_interval, profiles_dir
+
+    # Check if external config file exists, if not use the default one
+    if os.path.exists(config_path):
+        config.read(config_path, encoding='utf-8')
+    else:
+        # Use default configuration
+        config['Features'] = {
+            'adaptive_trigger': 'True',
+            'led_effect': 'True',
+            'haptic_effect': 'True',
+            'print_telemetry': 'True',
+            'use_gui_dashboard': 'True',
+            'startup_report': 'False',
+            'tick_profiling': 'False'
+        }
+        config['Network'] = {
+            'udp_port': '6776',
+            'metrics_port': '0'
+        }
+        # 刹车滑移反馈参数 (Brake Slip)
+        config['BrakeSlip'] = {
+            'brake_threshold': '3.0',           # 刹车输入阈值 % (0.1-99)
+            'front_slip_threshold': '5.0',      # 前轮滑移率阈值 (1.0-20.0)
+            'rear_slip_threshold': '5.0',       # 后轮滑移率阈值 (1.0-20.0)
+            'feedback_strength': '5',           # 反馈强度 (1-8)
+            'amplitude': '6',                   # 震动振幅 (1-8)
+            'min_frequency': '20',              # 最小频率 Hz (1-50)
+            'max_frequency': '70',              # 最大频率 Hz (20-150)
+            'reverse_frequency_mode': 'False',  # 反转频率模式：True=轻微滑移高频/严重滑移低频
+        }
+        # 油门滑移反馈参数 (Throttle Slip)
+        config['ThrottleSlip'] = {
+            'throttle_threshold': '3.0',        # 油门输入阈值 % (0.1-99)
+            'front_slip_threshold': '7.0',      # 前轮滑移率阈值 (1.0-20.0)
+            'rear_slip_threshold': '7.0',       # 后轮滑移率阈值 (1.0-20.0)
+            'feedback_strength': '5',           # 反馈强度 (1-8)
+            'amplitude': '6',                   # 震动振幅 (1-8)
+            'min_frequency': '20',              # 最小频率 Hz (1-50)
+            'max_frequency': '70',              # 最大频率 Hz (20-150)
+            'reverse_frequency_mode': 'False',  # 反转频率模式：True=轻微滑移高频/严重滑移低频
+        }
+        # 传统参数(向后兼容)
+        config['Feedback'] = {
+            'trigger_strength': '2.0',      # 自适应扳机强度系数 (0.1-2.0)
+            'haptic_strength': '1.0',       # Haptic震动反馈强度系数 (0-1.0)
+            'wheel_slip_threshold': '5.0'   # 轮胎侧滑检测的灵敏度。值越小，越容易检测到侧滑。 (5.0-30.0)
+        }
+        # 添加GUI设置
+        config['GUI'] = {
+            'fps': '60.0',                  # GUI更新帧率 (10-60)
+            'pause_updates': 'False'        # 是否暂停GUI更新
+        }
+        # 添加UI设置
+        config['UI'] = {
+            'show_overlay': 'False',        # 是否显示游戏内覆盖层
+            'overlay_x': '',                # 悬浮窗X坐标（空表示使用默认位置）
+            'overlay_y': ''                 # 悬浮窗Y坐标（空表示使用默认位置）
+        }
+        # Write the default configuration to an external file with comments
+        with open(config_path, 'w', encoding='utf-8') as configfile:
+            # Write Features section with comments
+            configfile.write("[Features]\n")
+            configfile.write("adaptive_trigger = True\n")
+            configfile.write("led_effect = True\n")
+            configfile.write("haptic_effect = True\n")
+            configfile.write("print_telemetry = True\n")
+            configfile.write("use_gui_dashboard = True\n")
+            configfile.write("# 首个数据包发送后打印完整的启动耗时表(阶段与延迟导入的模块)\n")
+            configfile.write("startup_report = False\n")
+            configfile.write("# 统计主循环各阶段耗时(p50/p95/p99)，仪表盘 Timing 页显示并每10秒打印一次\n")
+            configfile.write("tick_profiling = False\n")
+            configfile.write("\n")
+        
+            # Write Network section with comments
+            configfile.write("[Network]\n")
+            configfile.write("udp_port = 6776\n")
+            configfile.write("metrics_port = 0\n")
+            configfile.write("\n")
+        
+            # Write Feedback section with detailed comments
+            configfile.write("[Feedback]\n")
+            configfile.write("trigger_strength = 2.0\n")
+            configfile.write("haptic_strength = 1.0\n")
+            configfile.write("wheel_slip_threshold = 5.0\n")
+            configfile.write("\n")
+        
+            # Write GUI section with comments
+            configfile.write("[GUI]\n")
+            configfile.write("fps = 60.0\n")
+            configfile.write("pause_updates = False\n")
+            configfile.write("\n")
+            configfile.write("[GearShift]\n")
+            configfile.write("auto_gear_shift = False\n")
+            configfile.write("gear_up_key = e\n")
+            configfile.write("gear_down_key = q\n")
+            # configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
+            # configfile.write("shift_up_rpm = 6800,6500,6300,6000,5800,5500\n")
+            # configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
+            # configfile.write("shift_down_rpm = 2500,2800,3500,4000,4000,4300\n")
+            configfile.write("shift_up_cooldown = 1.0\n")
+            configfile.write("shift_down_cooldown = 0.5\n")
+            configfile.write("active_preset = 2\n")
+            # configfile.write("preset_switch_key = F9\n")
+            configfile.write("gear_shift_debug = False\n")
+            configfile.write("# 预测换挡: 按转速变化率提前按键，抵消按键/换挡动作延迟(延迟在行驶中自动学习)\n")
+            configfile.write("predictive_shift = False\n")
+            configfile.write("# 换挡线程判定频率(Hz)，独立于遥测主循环\n")
+            configfile.write("shift_worker_hz = 500\n")
+            configfile.write("# 换挡按键按住时间(毫秒)，按键在独立线程执行，不阻塞遥测\n")
+            configfile.write("key_hold_ms = 40\n")
+            configfile.write("shift_latency_ms = 80\n")
+            configfile.write("\n")
+            configfile.write("[GearShift_Rally1]\n")
+            configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
+            configfile.write("shift_up_rpm = 8000,7800,6900,6800,6800,6800\n")
+            configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
+            configfile.write("shift_down_rpm = 3000,3500,4500,4500,5000,5000\n")
+            configfile.write("\n")
+            configfile.write("[GearShift_Rally2]\n")
+            configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
+            configfile.write("shift_up_rpm = 6800,6500,6300,6000,5800,5500\n")
+            configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
+            configfile.write("shift_down_rpm = 2500,2800,3500,4000,4000,4300\n")
+            configfile.write("\n")
+            configfile.write("[GearShift_Rally3]\n")
+            configfile.write("# 每档升档转速(1->2,2->3,3->4,4->5,5->6,6->7)，逗号分隔，5/6/7档车通用\n")
+            configfile.write("shift_up_rpm = 9500,9400,9400,9400,9400,9400\n")
+            configfile.write("# 每档降档转速(2->1,3->2,4->3,5->4,6->5,7->6)，逗号分隔\n")
+            configfile.write("shift_down_rpm = 6000,6300,6500,6800,7000,7000\n")
+    
+        # 必须将刚写入的默认配置读回 config 对象，否则后续 save_config() 会覆盖掉 GearShift_Rally* 档位转速
+        config.read(config_path, encoding='utf-8')
+        print(f"Created default configuration file at {config_path}")
+
+    # 配置文件自动升级：如果配置文件缺少新section，自动添加
+    config_updated = False
+    if not config.has_section('BrakeSlip'):
+        config['BrakeSlip'] = {
+            'brake_threshold': '3.0',
+            'front_slip_threshold': '5.0',
+            'rear_slip_threshold': '5.0',
+            'feedback_strength': '7',
+            'amplitude': '5',
+            'min_frequency': '25',
+            'max_frequency': '85',
+            'reverse_frequency_mode': 'False',
+        }
+        config_updated = True
+
+    if not config.has_section('ThrottleSlip'):
+        config['ThrottleSlip'] = {
+            'throttle_threshold': '3.0',
+            'front_slip_threshold': '5.0',
+            'rear_slip_threshold': '5.0',
+            'feedback_strength': '8',
+            'amplitude': '4',
+            'min_frequency': '30',
+            'max_frequency': '96',
+            'reverse_frequency_mode': 'False',
+        }
+        config_updated = True
+
+    # 如果配置文件已更新，保存回文件
+    if config_updated:
+        with open(config_path, 'w', encoding='utf-8') as configfile:
+            config.write(configfile)
+        print(f"Configuration file upgraded with new sections")
+
+    # Get feature settings
+    use_gui_dashboard = config.getboolean('Features', 'use_gui_dashboard', fallback=True)
+    startup.verbose = config.getboolean('Features', 'startup_report', fallback=False)
+
+    # 主循环每个 tick 读取的参数: 解析/限幅后放入不可变快照，热重载与 GUI 修改时整体替换引用
+    runtime_config = load_runtime_config(config)
+
+    # 仅在启动时读取的换挡参数
+    preset_switch_key = config.get('GearShift', 'preset_switch_key', fallback='F9')
+    initial_shift_latency = max(0, min(400, config.getfloat('GearShift', 'shift_latency_ms', fallback=80))) / 1000
+    shift_worker_hz = max(50, min(2000, config.getint('GearShift', 'shift_worker_hz', fallback=500)))
+    key_hold_time = max(10, min(200, config.getfloat('GearShift', 'key_hold_ms', fallback=40))) / 1000
+
+    # 会话录制(供 param_sweep.py 等离线工具使用)
+    record_sessions = config.getboolean('Recording', 'record_sessions', fallback=False)
+    sessions_dir = os.path.join(application_path, config.get('Recording', 'sessions_dir', fallback='sessions'))
+
+    # Get network settings
+    UDP_PORT = config.getint('Network', 'udp_port', fallback=6778)
+    # 本地监控端点 http://127.0.0.1:<port>/metrics (0 = 关闭，仅启动时读取)
+    metrics_port = max(0, min(65535, config.getint('Network', 'metrics_port', fallback=0)))
+
+    # 按需采样分析: 热键或 [Profiling] stack_sampling = True 开始一个采样窗口(参数仅启动时读取)
+    sampling_hotkey = config.get('Profiling', 'sampling_hotkey', fallback='F10').strip()
+    sampling_seconds = max(1.0, min(120.0, config.getfloat('Profiling', 'sampling_seconds', fallback=10.0)))
+    sampling_interval = max(1.0, min(100.0, config.getfloat('Profiling', 'sampling_interval_ms', fallback=5.0))) / 1000
+    profiles_dir = os.path.join(application_path, config.get('Profiling', 'profiles_dir', fallback='profiles'))
+
+
 # Define is_game_running before dashboard (update_values uses it)
 def is_game_running(process_name="RichardBurnsRally_SSE.exe"):
     return get_process_by_name(process_name) is not None
 
 # Config hot-reload: 检测 config.ini 修改并重新加载
-last_config_mtime = os.path.getmtime(config_path) if os.path.exists(config_path) else 0
-def reload_config_if_changed():
-    """若 config.ini 已修改则重新加载，使运行时修改生效"""
-    global adaptive_trigger_enabled, led_effect_enabled, haptic_effect_enabled, print_telemetry_enabled
-    global trigger_strength, haptic_strength, wheel_slip_threshold
-    global brake_threshold, brake_front_slip_threshold, brake_rear_slip_threshold
-    global brake_feedback_strength, brake_amplitude, brake_min_frequency, brake_max_frequency, brake_reverse_frequency_mode, brake_use_automatic_gun
-    global throttle_threshold, throttle_front_slip_threshold, throttle_rear_slip_threshold
-    global throttle_feedback_strength, throttle_amplitude, throttle_min_frequency, throttle_max_frequency, throttle_reverse_frequency_mode, throttle_use_automatic_gun
-    global auto_gear_shift_enabled, gear_shift_presets, active_gear_preset
-    global shift_up_rpm, shift_down_rpm, shift_up_cooldown, shift_down_cooldown, gear_shift_debug
-    global last_config_mtime
-    try:
-        mtime = os.path.getmtime(config_path)
-        if mtime != last_config_mtime:
-            last_config_mtime = mtime
-            config.read(config_path, encoding='utf-8')
-            adaptive_trigger_enabled = config.getboolean('Features', 'adaptive_trigger', fallback=True)
-            led_effect_enabled = config.getboolean('Features', 'led_effect', fallback=True)
-            haptic_effect_enabled = config.getboolean('Features', 'haptic_effect', fallback=True)
-            print_telemetry_enabled = config.getboolean('Features', 'print_telemetry', fallback=True)
-            trigger_strength = max(0.1, min(2.0, config.getfloat('Feedback', 'trigger_strength', fallback=1.0)))
-            haptic_strength = max(0.0, min(1.0, config.getfloat('Feedback', 'haptic_strength', fallback=1.0)))
-            wheel_slip_threshold = max(5.0, min(30.0, config.getfloat('Feedback', 'wheel_slip_threshold', fallback=10.0)))
-            
-            # 刹车滑移参数
-            brake_threshold = max(0.1, min(99.0, config.getfloat('BrakeSlip', 'brake_threshold', fallback=3.0)))
-            brake_front_slip_threshold = max(1.0, min(20.0, config.getfloat('BrakeSlip', 'front_slip_threshold', fallback=5.0)))
-            brake_rear_slip_threshold = max(1.0, min(20.0, config.getfloat('BrakeSlip', 'rear_slip_threshold', fallback=5.0)))
-            brake_feedback_strength = max(1, min(8, config.getint('BrakeSlip', 'feedback_strength', fallback=7)))
-            brake_amplitude = max(1, min(8, config.getint('BrakeSlip', 'amplitude', fallback=5)))
-            brake_min_frequency = max(1, min(50, config.getint('BrakeSlip', 'min_frequency', fallback=25)))
-            brake_max_frequency = max(20, min(150, config.getint('BrakeSlip', 'max_frequency', fallback=85)))
-            
-            # 油门滑移参数
-            throttle_threshold = max(0.1, min(99.0, config.getfloat('ThrottleSlip', 'throttle_threshold', fallback=3.0)))
-            throttle_front_slip_threshold = max(1.0, min(20.0, config.getfloat('ThrottleSlip', 'front_slip_threshold', fallback=5.0)))
-            throttle_rear_slip_threshold = max(1.0, min(20.0, config.getfloat('ThrottleSlip', 'rear_slip_threshold', fallback=5.0)))
-            throttle_feedback_strength = max(1, min(8, config.getint('ThrottleSlip', 'feedback_strength', fallback=8)))
-            throttle_amplitude = max(1, min(8, config.getint('ThrottleSlip', 'amplitude', fallback=4)))
-            throttle_min_frequency = max(1, min(50, config.getint('ThrottleSlip', 'min_frequency', fallback=30)))
-            throttle_max_frequency = max(20, min(150, config.getint('ThrottleSlip', 'max_frequency', fallback=96)))
-            
-            if config.has_section('GearShift'):
-                auto_gear_shift_enabled = config.getboolean('GearShift', 'auto_gear_shift', fallback=False)
-                active_gear_preset = config.getint('GearShift', 'active_preset', fallback=2) - 1
-                active_gear_preset = max(0, min(2, active_gear_preset))
-                shift_up_cooldown = max(0.1, min(1.0, config.getfloat('GearShift', 'shift_up_cooldown', fallback=0.25)))
-                shift_down_cooldown = max(0.1, min(1.0, config.getfloat('GearShift', 'shift_down_cooldown', fallback=0.25)))
-                gear_shift_debug = config.getboolean('GearShift', 'gear_shift_debug', fallback=False)
-                gear_shift_presets[0] = _load_preset(config, 'GearShift_Rally1', _default_rally1_up, _default_rally1_down)
-                gear_shift_presets[1] = _load_preset(config, 'GearShift_Rally2', _default_rally2_up, _default_rally2_down)
-                gear_shift_presets[2] = _load_preset(config, 'GearShift_Rally3', _default_rally3_up, _default_rally3_down)
-                shift_up_rpm[:] = gear_shift_presets[active_gear_preset][0]
-                shift_down_rpm[:] = gear_shift_presets[active_gear_preset][1]
-            else:
-                auto_gear_shift_enabled = False
-            print("[Config] 已重新加载 config.ini")
-    except Exception as e:
-        pass  # 忽略加载错误，保持当前配置
-
-# Initialize the dashboard if GUI is enabled
-print(f"RBR DualSense Adapter v{__version__}")
-if use_gui_dashboard:
-    # Create a separate thread for the Tkinter GUI
-    def start_dashboard():
-        global dashboard
-        root = tk.Tk()
-        dashboard = TelemetryDashboard(root)
-        
-        # Handle window close event
-        def on_closing():
-            print("Window closing, shutting down application...")
-            try:
-                root.destroy()
-            except:
-                pass
-            print("Application shutdown complete")
-            # 强制退出整个程序(包括主循环)以关闭cmd窗口
-            os._exit(0)
-        
-        root.protocol("WM_DELETE_WINDOW", on_closing)
-        root.mainloop()
+runtime_config_lock = threading.Lock()  # 只串行化写入方(GUI/热重载)；主循环读取快照引用不加锁
+
+def apply_runtime_config(new_config):
+    """原子替换运行时配置快照，并同步依赖它的换挡组件"""
+    with runtime_config_lock:
+        _swap_runtime_config(new_config)
+
+def update_runtime_config(**changes):
+    """GUI 修改部分字段: 读-改-写在锁内完成，不会丢失热重载同时替换的快照"""
+    with runtime_config_lock:
+        _swap_runtime_config(replace_runtime_config(runtime_config, **changes))
+
+def _swap_runtime_config(new_config):
+    global runtime_config
+    old_config, runtime_config = runtime_config, new_config
+    # stack_sampling 由 False 改为 True 时开始一个采样窗口(窗口结束后需再次切换才会重新采样)
+    if new_config.stack_sampling_enabled and not old_config.stack_sampling_enabled:
+        stack_sampler.start()
+    shift_logic.predictive = new_config.predictive_shift_enabled
+    shift_worker.debug = new_config.gear_shift_debug
+    key_injector.debug = new_config.gear_shift_debug
+
+def reload_config():
+    """ConfigWatcher 回调(监视线程): 校验通过才替换快照，无效修改打印原因并保留当前配置"""
+    global config
+    parsed = parse_or_reject(config_path, parse_config_file)
+    if parsed is None:
+        return
+    new_parser, new_config = parsed
+    with runtime_config_lock:
+        # GUI 保存时使用的 ConfigParser 与快照一起按引用替换(不在共享对象上 read()，文件中删除的键不会残留)
+        config = new_parser
+        _swap_runtime_config(new_config)
+    print("[Config] 已重新加载 config.ini")
+
+# Create a separate thread for the Tkinter GUI
+def start_dashboard():
+    global dashboard
+    load_gui_modules()
+    startup.mark('GUI modules imported')
+    root = tk.Tk()
+    dashboard = TelemetryDashboard(root)
     
-    dashboard_thread = threading.Thread(target=start_dashboard, daemon=True)
-    dashboard_thread.start()
-    print("Telemetry dashboard started in GUI mode")
-else:
-    print("Telemetry dashboard running in console mode")
+    # Handle window close event
+    def on_closing():
+        print("Window closing, shutting down application...")
+        try:
+            root.destroy()
+        except:
+            pass
+        print("Application shutdown complete")
+        # 强制退出整个程序(包括主循环)以关闭cmd窗口
+        os._exit(0)
+    
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+    root.mainloop()
 
-if auto_gear_shift_enabled:
-    if PYDIRECTINPUT_AVAILABLE:
-        print(f"Auto gear shift enabled: preset={gear_shift_preset_names[active_gear_preset]}, up={gear_up_key}, down={gear_down_key}")
-        print(f"  shift_up_rpm={shift_up_rpm}, shift_down_rpm={shift_down_rpm}")
-    else:
-        print("Warning: Auto gear shift enabled but pydirectinput not available. Install with: pip install pydirectinput")
-        auto_gear_shift_enabled = False
+# Auto gear shift: ShiftWorker 每次判定时读取当前快照
+def _shift_settings():
+    cfg = runtime_config  # 只取一次快照，热重载/GUI 同时替换时不会混用新旧配置
+    return cfg.auto_gear_shift_enabled, cfg.shift_up_rpm, cfg.shift_down_rpm, cfg.shift_up_cooldown, cfg.shift_down_cooldown
 
-# Initialize memory reader
-rbr_memory_reader = None
-try:
-    rbr_memory_reader = MemoryReader()
-except Exception as e:
-    print(f"Failed to initialize memory reader: {e}")
-    print("Telemetry data will not be available")
-
-# Create UDP socket for DSX controller
-sock_dsx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-# Initialize variables for telemetry data
-car_speed = 0
-rpm = 0
-water_temp = 0
-turbo_pressure = 0
-distance_from_start = 0
-distance_travelled = 0
-distance_to_finish = 0
-race_time = 0
-session_time = 0
-stage_progress = 0
-wrong_way = False
-split1_done = False
-split2_done = False
-race_ended = False
-split1_time = 0
-split2_time = 0
-gear_id = 0
-false_start = False
-stage_start_countdown = 0
-engine_on = False
-x_spin = 0
-y_spin = 0
-z_spin = 0
-x_speed = 0
-y_speed = 0
-z_speed = 0
-x_pos = 0
-y_pos = 0
-z_pos = 0
-roll = 0
-pitch = 0
-yaw = 0
-steering = 0
-throttle = 0
-brake = 0
-handbrake = 0
-clutch = 0
-ffb_value = 0
-wheel_speed_fl = 0
-wheel_speed_fr = 0
-wheel_speed_rl = 0
-wheel_speed_rr = 0
-ground_speed = 0
-
-# Initialize previous RPM and last rumble time
-previous_rpm = 0
-last_rumble_time = 0
-RUMBLE_INTERVAL = 2.79  # Interval in seconds for rumble effect
-
-# Initialize haptic feedback state variables
-wheel_slip_rumble_active = False
-
-# Initialize previous gear
-previous_gear = None
-
-# Auto gear shift: last shift time for cooldown (升档/降档分开)
-last_shift_up_time = 0
-last_shift_down_time = 0
-last_gear_shift_debug_time = 0
-
-# Auto gear shift: 起步辅助 - 记录上一次倒计时状态
-previous_stage_countdown = 0
-countdown_just_ended = False
-countdown_end_time = 0
-COUNTDOWN_END_GRACE_PERIOD = 1.5  # 倒计时结束后的宽限期(秒),在此期间降低N->1的rpm要求
-
-# Add these new functions and variables
+def _shift_keys():
+    cfg = runtime_config
+    return cfg.gear_up_key, cfg.gear_down_key
 
+# Best stage records
 best_records = {}
 current_record = []
 last_record_time = 0
@@ -2845,647 +2812,492 @@ def calculate_time_difference(current_record, best_record):
     
     return None
 
-# Load best records at the start of the script
-best_records = load_best_records()
-
-current_stage = -1
-current_record = []
 
-# Add wheel speed variables
-wheel_speed_fl = 0
-wheel_speed_fr = 0
-wheel_speed_rl = 0
-wheel_speed_rr = 0
+def main():
+    global shift_logic, key_injector, shift_worker, best_records, stack_sampler
+    startup.mark('module imports')
+    load_config()
+    startup.mark('config loaded')
+    # 采样本线程(主循环)的调用栈; 仅在采样窗口内存在采样线程
+    stack_sampler = StackSampler(threading.get_ident(), profiles_dir, sampling_seconds, sampling_interval)
+    atexit.register(print_error_summary)
+
+    # 换挡组件须在仪表盘线程启动前创建: GUI 修改配置时 apply_runtime_config 会同步它们
+    # Auto gear shift: 冷却时间(升档/降档分开)与起步辅助状态
+    shift_logic = AutoShiftLogic(runtime_config.predictive_shift_enabled, initial_shift_latency)
+    last_gear_shift_debug_time = 0
+
+    # 换挡判定在独立线程中运行，主循环只发布最新的 rpm/档位/离合/车速/倒计时; 按键由 KeyInjector 异步执行
+    key_injector = KeyInjector(PyDirectInputBackend(key_hold_time) if PYDIRECTINPUT_AVAILABLE else RecordingBackend(),
+                               runtime_config.gear_shift_debug)
+    shift_worker = ShiftWorker(shift_logic, _shift_settings, _shift_keys, key_injector, shift_worker_hz, runtime_config.gear_shift_debug)
+    if PYDIRECTINPUT_AVAILABLE:
+        shift_worker.start()
+
+    # Initialize the dashboard if GUI is enabled
+    print(f"RBR DualSense Adapter v{__version__}")
+    if use_gui_dashboard:
+        dashboard_thread = threading.Thread(target=start_dashboard, daemon=True)
+        dashboard_thread.start()
+        print("Telemetry dashboard started in GUI mode")
+    else:
+        print("Telemetry dashboard running in console mode")
 
-# Add variables for heartbeat detection
-last_valid_telemetry_time = 0
-telemetry_timeout = 0.5  # seconds - if no valid telemetry for this duration, assume game is paused/loading
-force_stop_vibration = False
+    if runtime_config.auto_gear_shift_enabled:
+        if PYDIRECTINPUT_AVAILABLE:
+            print(f"Auto gear shift enabled: preset={gear_shift_preset_names[runtime_config.active_gear_preset]}, up={runtime_config.gear_up_key}, down={runtime_config.gear_down_key}")
+            print(f"  shift_up_rpm={list(runtime_config.shift_up_rpm)}, shift_down_rpm={list(runtime_config.shift_down_rpm)}")
+        else:
+            print("Warning: Auto gear shift enabled but pydirectinput not available. Install with: pip install pydirectinput")
+            update_runtime_config(auto_gear_shift_enabled=False)
+
+    # Initialize session recorder
+    session_recorder = None
+    if record_sessions:
+        from session_recorder import SessionRecorder
+        session_recorder = SessionRecorder(sessions_dir)
+        print(f"Session recording enabled: {sessions_dir}")
+
+    # Initialize memory reader
+    rbr_memory_reader = None
+    try:
+        rbr_memory_reader = MemoryReader()
+    except Exception as e:
+        print(f"Failed to initialize memory reader: {e}")
+        print("Telemetry data will not be available")
+
+    # UDP client for DSX controller
+    dsx = DSXClient(UDP_IP, UDP_DSX_PORT)
+    startup.mark('memory reader and socket ready')
+
+    # Telemetry data (就地更新) 与震动状态
+    source = RBRSource()
+    frame = source.frame
+    haptic = HapticEffect(haptics_path)
+    game_state_id = 0
+
+    # Load best records at the start of the script
+    best_records = load_best_records()
+
+    # Add variables for heartbeat detection
+    last_valid_telemetry_time = 0
+    telemetry_timeout = 0.5  # seconds - if no valid telemetry for this duration, assume game is paused/loading
+    force_stop_vibration = False
+
+    # Initialize dashboard
+    dashboard_update_interval = 1/60  # 刷新率改成60
+    last_dashboard_update = 0
+    next_profile_report = time.time() + PROFILE_REPORT_INTERVAL
+    # 运行时热重载 config.ini（修改后保存即可生效，无需重启）；监视/解析/校验均在后台线程
+    config_watcher = ConfigWatcher(config_path, reload_config)
+    config_watcher.start()
+
+    if runtime_config.stack_sampling_enabled:
+        stack_sampler.start()
+    if KEYBOARD_AVAILABLE and sampling_hotkey:
+        try:
+            keyboard.add_hotkey(sampling_hotkey, stack_sampler.toggle)
+            print(f"Press {sampling_hotkey} to capture a {sampling_seconds:.0f}s stack profile")
+        except Exception as e:  # 无权限(Linux 需 root)或按键名无效
+            print(f"Stack sampling hotkey unavailable: {e}")
+
+    # 可选的本地监控端点: 快照在服务线程中读取计数器，主循环不加锁
+    if metrics_port:
+        tick_rate = TickRate(loop_metrics.started)
+
+        def metrics_snapshot():
+            counters = loop_metrics.counters()
+            counters['shifts_up'] = shift_worker.shift_counts[SHIFT_UP]
+            counters['shifts_down'] = shift_worker.shift_counts[SHIFT_DOWN]
+            counters['shift_keys_refused'] = key_injector.refused
+            counters['shift_keys_coalesced'] = key_injector.coalesced
+            counters['errors'] = errors.total()
+            cfg = runtime_config
+            stages = {}
+            if cfg.tick_profiling_enabled:
+                # 与 Timing 页/控制台汇总相同，为最近一个汇总区间的数据
+                stages = {name: histogram_quantiles(h) for name, h in tick_profiler.stages.items() if h.count}
+                if tick_profiler.tick.count:
+                    stages['tick'] = histogram_quantiles(tick_profiler.tick)
+            return {
+                'counters': counters,
+                'gauges': {
+                    'tick_rate_hz': round(tick_rate.update(counters['ticks']), 2),
+                    'uptime_seconds': round(time.time() - loop_metrics.started, 1),
+                    'game_connected': int(bool(rbr_memory_reader and rbr_memory_reader.is_connected)),
+                    'tick_profiling': int(cfg.tick_profiling_enabled),
+                },
+                'stages': stages,
+            }
 
-# Initialize dashboard
-dashboard = None
-dashboard_update_interval = 1/60  # 刷新率改成60
-last_dashboard_update = 0
-last_config_check = 0
-config_reload_interval = 1.5  # 每1.5秒检查一次 config.ini 是否修改
-
-# Modify the main loop to handle game exit and restart better
-while True:
-    current_time = time.time()
+        try:
+            port = MetricsServer(metrics_port, metrics_snapshot, prefix='rbr_adapter').start()
+            print(f"Metrics endpoint: http://127.0.0.1:{port}/metrics (JSON: /metrics.json)")
+        except OSError as e:
+            print(f"Failed to start metrics endpoint on port {metrics_port}: {e}")
+
+    # Modify the main loop to handle game exit and restart better
+    while True:
+        current_time = time.time()
     
-    # 运行时热重载 config.ini（修改后保存即可生效，无需重启）
-    if current_time - last_config_check >= config_reload_interval:
-        last_config_check = current_time
-        reload_config_if_changed()
+        # 本 tick 使用的配置快照(热重载/GUI 修改只替换 runtime_config 引用，不影响进行中的 tick)
+        cfg = runtime_config
+        # 分阶段计时; 关闭时 prof 为 None，各阶段只多一次判断
+        prof = tick_profiler if cfg.tick_profiling_enabled else None
+        tick_start = time.perf_counter_ns()
     
-    # Check if game is running
-    game_running = is_game_running()
+        # Check if game is running
+        game_running = is_game_running()
     
-    # If game is not running, reset memory reader and wait
-    if not game_running:
-        if rbr_memory_reader and rbr_memory_reader.is_connected:
-            rbr_memory_reader.show_errors = False  # Suppress error messages during shutdown
-            print("Game has exited. Waiting for restart...")
-            rbr_memory_reader.close()
-            rbr_memory_reader = None  # Completely release the memory reader
-        
-        # Set default values for telemetry data
-        rpm = 0
-        car_speed = 0
-        gear_id = 0
-        # Reset other telemetry variables as needed
-        
-        # Send a packet to reset controller - avoid using ResetToUserSettings
-        reset_packet = Packet([
+        # If game is not running, reset memory reader and wait
+        if not game_running:
+            if session_recorder:
+                session_recorder.flush()
+            if rbr_memory_reader and rbr_memory_reader.is_connected:
+                rbr_memory_reader.show_errors = False  # Suppress error messages during shutdown
+                print("Game has exited. Waiting for restart...")
+                rbr_memory_reader.close()
+                rbr_memory_reader = None  # Completely release the memory reader
+        
+            # Set default values for telemetry data
+            frame.rpm = 0
+            frame.car_speed = 0
+            frame.gear_id = 0
+            # Reset other telemetry variables as needed
+        
+            # Send a packet to reset controller - avoid using ResetToUserSettings
             # Instead of ResetToUserSettings, use individual reset instructions
-            Instruction(InstructionType.TriggerUpdate, [0, Trigger.Left, TriggerMode.Normal, 0, 0, 0]),
-            Instruction(InstructionType.TriggerUpdate, [0, Trigger.Right, TriggerMode.Normal, 0, 0, 0]),
-            Instruction(InstructionType.RGBUpdate, [0, 0, 0, 0])
-        ])
+            reset_packet = Packet(normal_trigger_instructions() + [Instruction(InstructionType.RGBUpdate, [0, 0, 0, 0])])
         
-        try:
-            sock_dsx.sendto(json.dumps(reset_packet.to_dict()).encode(), (UDP_IP, UDP_DSX_PORT))
-        except Exception as e:
-            print(f"Error sending reset data to controller: {e}")
+            try:
+                dsx.send(reset_packet)
+                loop_metrics.packets_sent += 1
+                startup.first_packet()
+            except Exception as e:
+                loop_metrics.send_errors += 1
+                errors.record('dsx.send', f"Error sending reset data to controller: {e}")
         
-        # Wait before checking again
-        time.sleep(2)
-        continue
-    
-    # Try to connect if not connected or if memory reader is None
-    if rbr_memory_reader is None:
-        # Create a new memory reader instance
-        rbr_memory_reader = MemoryReader(process_name="RichardBurnsRally_SSE.exe")
-        print("Game detected. Creating new memory reader...")
-    elif not rbr_memory_reader.is_connected:
-        print("Game detected. Attempting to connect...")
-        rbr_memory_reader.show_errors = True  # Re-enable error messages when reconnecting
-        if rbr_memory_reader.connect():
-            print("Successfully reconnected to the game!")
-        else:
-            print("Failed to connect. Will retry...")
-            time.sleep(1)
+            # Wait before checking again
+            time.sleep(2)
             continue
     
-    # Instead of waiting for UDP data, we'll read directly from memory
-    if rbr_memory_reader and rbr_memory_reader.is_connected:
-        try:
-            # Get base addresses as in Read_RBRData.cs
-            num = rbr_memory_reader.read_int(23460968)
-            num2 = rbr_memory_reader.read_int(8301640)
-            num3 = rbr_memory_reader.read_int(9369184)
-            num4 = rbr_memory_reader.read_int(23433604)
-            adress = rbr_memory_reader.read_int(8301640) + 3076 if num2 else None
-            num5 = rbr_memory_reader.read_int(rbr_memory_reader.base_address + 4796472) if rbr_memory_reader.base_address else None
-            
-            if num5:
-                num5 = rbr_memory_reader.read_int(num5 + 1032)
-                if num5:
-                    num5 = rbr_memory_reader.read_int(num5 + 64)
-            
-            # Read game state to check if we're in race
-            game_state_id = rbr_memory_reader.read_byte(num2 + 1848 - 16) if num2 else 0
-            
-            # Only read telemetry if we're in race state and all addresses are valid
-            if game_state_id > 0 and num and num2 and num3:  # Check that addresses are valid
-                # Read wheel speeds
-                if num5:
-                    wheel_speed_fl = rbr_memory_reader.read_float(num5 + 988) * 3.6  # Convert to km/h
-                    wheel_speed_fr = rbr_memory_reader.read_float(num5 + 1676) * 3.6
-                    wheel_speed_rl = rbr_memory_reader.read_float(num5 + 2364) * 3.6
-                    wheel_speed_rr = rbr_memory_reader.read_float(num5 + 3052) * 3.6
-                
-                # Read car info
-                if num:
-                    car_speed = rbr_memory_reader.read_float(num + 12)
-                    rpm = rbr_memory_reader.read_float(num + 16)
-                    water_temp = rbr_memory_reader.read_float(num + 20)
-                    turbo_pressure = rbr_memory_reader.read_float(num + 24) / 1000 / 100  # Convert to bar
-                    distance_from_start = rbr_memory_reader.read_float(num + 32)
-                    distance_travelled = rbr_memory_reader.read_float(num + 36)
-                    distance_to_finish = rbr_memory_reader.read_float(num + 40)
-                    stage_progress = rbr_memory_reader.read_float(num + 0x13C)
-                    race_time = rbr_memory_reader.read_float(num + 0x140)
-                    race_ended = rbr_memory_reader.read_int(num + 0x144) == 1
-                    wrong_way = rbr_memory_reader.read_int(num + 0x150) == 1
-                    gear_id = rbr_memory_reader.read_int(num + 0x170) - 1  # Adjust gear value
-                    stage_start_countdown = rbr_memory_reader.read_float(num + 0x244)
-                    false_start = rbr_memory_reader.read_int(num + 0x248) == 1
-                    
-                    # 检测倒计时是否刚结束(从>0变为<=0)
-                    if previous_stage_countdown > 0 and stage_start_countdown <= 0:
-                        countdown_just_ended = True
-                        countdown_end_time = current_time
-                        # 重置换档冷却时间,避免起步时被冷却阻挡
-                        last_shift_up_time = 0
-                        last_shift_down_time = 0
-                    previous_stage_countdown = stage_start_countdown
-                    split1_done = rbr_memory_reader.read_int(num + 0x254) >= 1
-                    split2_done = rbr_memory_reader.read_int(num + 0x254) >= 2
-                    split1_time = rbr_memory_reader.read_float(num + 0x258)
-                    split2_time = rbr_memory_reader.read_float(num + 0x25C)
-                    race_ended = rbr_memory_reader.read_int(num + 0x2C4) == 1
-                    
+        # Try to connect if not connected or if memory reader is None
+        if rbr_memory_reader is None:
+            # Create a new memory reader instance
+            rbr_memory_reader = MemoryReader(process_name="RichardBurnsRally_SSE.exe")
+            loop_metrics.reconnects += 1
+            print("Game detected. Creating new memory reader...")
+        elif not rbr_memory_reader.is_connected:
+            print("Game detected. Attempting to connect...")
+            rbr_memory_reader.show_errors = True  # Re-enable error messages when reconnecting
+            if rbr_memory_reader.connect():
+                loop_metrics.reconnects += 1
+                print("Successfully reconnected to the game!")
+            else:
+                print("Failed to connect. Will retry...")
+                time.sleep(1)
+                continue
+    
+        # Instead of waiting for UDP data, we'll read directly from memory
+        if rbr_memory_reader and rbr_memory_reader.is_connected:
+            try:
+                if prof:
+                    stage_start = time.perf_counter_ns()
+                source.reader = rbr_memory_reader
+                source.read()
+                game_state_id, in_race = source.game_state_id, source.in_race
+                if prof:
+                    prof.record('read', time.perf_counter_ns() - stage_start)
+            
+                # Only read telemetry if we're in race state and all addresses are valid
+                if in_race:
                     # Update heartbeat timestamp when valid telemetry data is received
                     last_valid_telemetry_time = current_time
                 
-                # Read car movement data
-                if num3:
-                    x_spin = rbr_memory_reader.read_float(num3 + 400)
-                    y_spin = rbr_memory_reader.read_float(num3 + 404)
-                    z_spin = rbr_memory_reader.read_float(num3 + 408)
-                    x_speed = rbr_memory_reader.read_float(num3 + 448)
-                    y_speed = rbr_memory_reader.read_float(num3 + 452)
-                    z_speed = rbr_memory_reader.read_float(num3 + 456)
-                    x_pos = rbr_memory_reader.read_float(num3 + 320)
-                    y_pos = rbr_memory_reader.read_float(num3 + 324)
-                    z_pos = rbr_memory_reader.read_float(num3 + 328)
-                    
-                    # Calculate angles
-                    sin_a = rbr_memory_reader.read_float(num3 + 272)
-                    cos_a = rbr_memory_reader.read_float(num3 + 276)
-                    num6 = rbr_memory_reader.read_float(num3 + 280)
-                    num7 = rbr_memory_reader.read_float(num3 + 292)
-                    
-                    # These calculations are approximations of the C# code
-                    roll = -(num6 * 180) / 3.14159
-                    pitch = -(num7 * 180) / 3.14159
-                    # For yaw, we need to implement SinCos2AngleRadian
-                    yaw = -(math.atan2(sin_a, cos_a) * 180) / 3.14159
-                    
-                    # Calculate ground speed
-                    ground_speed = math.sqrt(x_speed**2 + y_speed**2 + z_speed**2)
-                
-                # Read control inputs
-                if num2:
-                    steering = rbr_memory_reader.read_float(num2 + 1848 + 92)
-                    throttle = rbr_memory_reader.read_float(num2 + 1848 + 96) * 100  # Convert to percentage
-                    brake = rbr_memory_reader.read_float(num2 + 1848 + 100) * 100
-                    handbrake = rbr_memory_reader.read_float(num2 + 1848 + 104) * 100
-                    clutch = rbr_memory_reader.read_float(num2 + 1848 + 108) * 100
-                
-                # Read FFB value
-                if adress:
-                    ffb_value = rbr_memory_reader.read_float(adress)
-                
-                # Auto gear shift: simulate keyboard when RPM conditions are met
-                # stage_start_countdown > 0 表示倒计时中，不自动换挡避免抢跑
-                # gear_id: -1=倒档, 0=空档, 1-6=前进档。car_speed<0 表示倒车，绝不换挡
-                # 降档时禁止从1档降到空档，避免比赛过程中误入空档
-                # 0=空档也参与，支持静止时 N->1 自动挂1档
-                
-                # 检查是否在倒计时结束后的宽限期内
-                in_countdown_grace_period = countdown_just_ended and (current_time - countdown_end_time) <= COUNTDOWN_END_GRACE_PERIOD
+                    # 录制本帧遥测; 赛段完成后结束当前会话
+                    if session_recorder:
+                        if frame.race_ended:
+                            session_recorder.flush()
+                        else:
+                            session_recorder.record(
+                                current_time, frame.race_time, frame.distance_from_start, frame.car_speed, frame.ground_speed,
+                                frame.rpm, frame.gear_id, frame.throttle, frame.brake, frame.clutch, frame.handbrake,
+                                frame.wheel_speed_fl, frame.wheel_speed_fr, frame.wheel_speed_rl, frame.wheel_speed_rr,
+                                frame.stage_start_countdown)
                 
-                in_forward_or_neutral = 0 <= gear_id <= 6
-                # 起步辅助期间:忽略倒车检测,因为起步时speed可能读取到轻微负值(后溜/读取误差)
-                # 正常行驶时:严格检查倒车状态,避免倒车时误换档
-                not_reversing = car_speed >= 0 if not in_countdown_grace_period else True
+                    # Auto gear shift: simulate keyboard when RPM conditions are met
+                    # stage_start_countdown > 0 表示倒计时中，不自动换挡避免抢跑
+                    # gear_id: -1=倒档, 0=空档, 1-6=前进档。car_speed<0 表示倒车，绝不换挡
+                    # 降档时禁止从1档降到空档，避免比赛过程中误入空档
+                    # 0=空档也参与，支持静止时 N->1 自动挂1档
                 
-                # 提前计算游戏状态,用于调试和换档判断
-                game_has_focus = WINDOWS_API_AVAILABLE and is_game_window_focused()
-                game_not_paused = (current_time - last_valid_telemetry_time) <= telemetry_timeout
+                    if prof:
+                        stage_start = time.perf_counter_ns()
+                    # 提前计算游戏状态,用于调试和换档判断
+                    game_has_focus = WINDOWS_API_AVAILABLE and is_game_window_focused()
+                    game_not_paused = (current_time - last_valid_telemetry_time) <= telemetry_timeout
                 
-                if auto_gear_shift_enabled and in_forward_or_neutral and not_reversing and stage_start_countdown <= 0:
+                    # 换挡状态由 ShiftWorker 线程发布(ShiftDebug 快照)，主循环不调用 shift_logic
+                    shift_debug = shift_worker.debug_state if cfg.gear_shift_debug else None
+                    if cfg.auto_gear_shift_enabled and shift_debug and shift_debug.can_shift:
                     
-                    # Debug: print status every 2 seconds when in race
-                    if gear_shift_debug and (current_time - last_gear_shift_debug_time) >= 2.0:
-                        last_gear_shift_debug_time = current_time
-                        reasons = []
-                        if not PYDIRECTINPUT_AVAILABLE:
-                            reasons.append("pydirectinput模块未安装")
-                        elif not game_has_focus:
-                            reasons.append("游戏窗口未聚焦")
-                        elif not game_not_paused:
-                            reasons.append("游戏已暂停")
-                        elif clutch >= 20:
-                            reasons.append(f"离合踩下{clutch:.0f}%")
-                        elif gear_id == 0 and rpm >= (800 if in_countdown_grace_period else 1500) and (current_time - last_shift_up_time) < shift_up_cooldown:
-                            reasons.append("N->1冷却中")
-                        elif gear_id == 0 and rpm >= (800 if in_countdown_grace_period else 1500):
-                            grace_hint = "(起步辅助)" if in_countdown_grace_period else ""
-                            reasons.append(f"应N->1{grace_hint}")
-                        elif gear_id >= 1 and gear_id < len(shift_up_rpm) and rpm >= shift_up_rpm[gear_id] and (current_time - last_shift_up_time) < shift_up_cooldown:
-                            reasons.append("升档冷却中")
-                        elif gear_id > 1 and gear_id <= len(shift_down_rpm) and rpm <= shift_down_rpm[gear_id - 1] and (current_time - last_shift_down_time) < shift_down_cooldown:
-                            reasons.append("降档冷却中")
-                        elif gear_id >= 1 and gear_id < len(shift_up_rpm) and rpm >= shift_up_rpm[gear_id]:
-                            reasons.append("应升档")
-                        elif gear_id > 1 and gear_id <= len(shift_down_rpm) and rpm <= shift_down_rpm[gear_id - 1]:
-                            reasons.append("应降档")
-                        else:
-                            n1_threshold = 800 if in_countdown_grace_period else 1500
-                            n1 = f"N->1>={n1_threshold}" if gear_id == 0 else ""
-                            up_r = shift_up_rpm[gear_id] if gear_id >= 1 and gear_id < len(shift_up_rpm) else 0
-                            down_r = shift_down_rpm[gear_id - 1] if gear_id > 1 and gear_id <= len(shift_down_rpm) else 0
-                            reasons.append(f"rpm={rpm:.0f} gear={gear_id} {n1} (升档>={up_r}, 降档<={down_r})")
-                        print(f"[AutoGear] game_state={game_state_id} rpm={rpm:.0f} gear={gear_id} clutch={clutch:.0f}% focus={game_has_focus} | {' | '.join(reasons)}")
+                        # Debug: print status every 2 seconds when in race
+                        if (current_time - last_gear_shift_debug_time) >= 2.0:
+                            last_gear_shift_debug_time = current_time
+                            reasons = []
+                            wanted, cooling = shift_debug.wanted, shift_debug.cooling
+                            if not PYDIRECTINPUT_AVAILABLE:
+                                reasons.append("pydirectinput模块未安装")
+                            elif not game_has_focus:
+                                reasons.append("游戏窗口未聚焦")
+                            elif not game_not_paused:
+                                reasons.append("游戏已暂停")
+                            elif frame.clutch >= MAX_SHIFT_CLUTCH:
+                                reasons.append(f"离合踩下{frame.clutch:.0f}%")
+                            elif frame.gear_id == 0 and wanted and cooling:
+                                reasons.append("N->1冷却中")
+                            elif frame.gear_id == 0 and wanted:
+                                grace_hint = "(起步辅助)" if shift_debug.grace else ""
+                                reasons.append(f"应N->1{grace_hint}")
+                            elif wanted == SHIFT_UP and cooling:
+                                reasons.append("升档冷却中")
+                            elif wanted == SHIFT_DOWN and cooling:
+                                reasons.append("降档冷却中")
+                            elif wanted == SHIFT_UP:
+                                reasons.append("应升档")
+                            elif wanted == SHIFT_DOWN:
+                                reasons.append("应降档")
+                            else:
+                                n1 = f"N->1>={shift_debug.n1_threshold}" if frame.gear_id == 0 else ""
+                                up_r = cfg.shift_up_rpm[frame.gear_id] if frame.gear_id >= 1 and frame.gear_id < len(cfg.shift_up_rpm) else 0
+                                down_r = cfg.shift_down_rpm[frame.gear_id - 1] if frame.gear_id > 1 and frame.gear_id <= len(cfg.shift_down_rpm) else 0
+                                reasons.append(f"rpm={frame.rpm:.0f} gear={frame.gear_id} {n1} (升档>={up_r}, 降档<={down_r})")
+                            if shift_debug.rpm_rate is not None:
+                                reasons.append(f"dRPM/dt={shift_debug.rpm_rate:.0f}/s 延迟={shift_debug.latency * 1000:.0f}ms({shift_debug.latency_samples}次)")
+                            print(f"[AutoGear] game_state={game_state_id} rpm={frame.rpm:.0f} gear={frame.gear_id} clutch={frame.clutch:.0f}% focus={game_has_focus} | {' | '.join(reasons)}")
                     
-                    if PYDIRECTINPUT_AVAILABLE and game_has_focus and game_not_paused and clutch < 20:
-                        # N->1: 空档时转速>1500自动挂1档（静止起步）
-                        # 起步辅助: 倒计时结束后1.5秒内,降低rpm要求到800,帮助上坡/低转速起步
-                        n_to_1_rpm_threshold = 800 if in_countdown_grace_period else 1500
-                        
-                        if (gear_id == 0 and rpm >= n_to_1_rpm_threshold and
-                            (current_time - last_shift_up_time) >= shift_up_cooldown):
-                            try:
-                                pydirectinput.press(gear_up_key)
-                                last_shift_up_time = current_time
-                                # 挂上1档后,清除宽限期标志,避免立即跳2档
-                                if in_countdown_grace_period:
-                                    countdown_just_ended = False
-                            except Exception as e:
-                                print(f"Auto gear shift up error: {e}")
-                        # Shift up: gear_id 1-5 可升档 (1->2, 2->3, ...)
-                        elif (gear_id >= 1 and gear_id < len(shift_up_rpm) and rpm >= shift_up_rpm[gear_id] and
-                            (current_time - last_shift_up_time) >= shift_up_cooldown):
-                            try:
-                                pydirectinput.press(gear_up_key)
-                                last_shift_up_time = current_time
-                            except Exception as e:
-                                print(f"Auto gear shift up error: {e}")
-                        # Shift down: gear_id 2-6 可降档，禁止1档降到空档
-                        elif (gear_id > 1 and gear_id <= len(shift_down_rpm) and rpm <= shift_down_rpm[gear_id - 1] and
-                              (current_time - last_shift_down_time) >= shift_down_cooldown):
-                            try:
-                                pydirectinput.press(gear_down_key)
-                                last_shift_down_time = current_time
-                            except Exception as e:
-                                print(f"Auto gear shift down error: {e}")
+
+                    # 发布换挡线程所需的最新帧; 倒计时检测/起步辅助/N->1/升降档判定均在 ShiftWorker 中完成
+                    shift_worker.publish(ShiftFrame(current_time, frame.rpm, frame.gear_id, frame.clutch, frame.car_speed, frame.stage_start_countdown,
+                                                    game_has_focus and game_not_paused))
+                    if prof:
+                        prof.record('shift', time.perf_counter_ns() - stage_start)
                 
-                # Print debug info or update dashboard
-                current_time = time.time()
+                    # Print debug info or update dashboard
+                    current_time = time.time()
+                    if prof:
+                        stage_start = time.perf_counter_ns()
                 
-                if use_gui_dashboard and dashboard and current_time - last_dashboard_update >= dashboard_update_interval:
-                    # Update the dashboard with current telemetry data
-                    if ground_speed * 3.6 > 5:  # Convert to km/h for comparison
-                        # Calculate wheel slip percentages if car is moving
-                        ground_speed_kmh = ground_speed * 3.6
-                        fl_slip = ((wheel_speed_fl / ground_speed_kmh) - 1) * 100
-                        fr_slip = ((wheel_speed_fr / ground_speed_kmh) - 1) * 100
-                        rl_slip = ((wheel_speed_rl / ground_speed_kmh) - 1) * 100
-                        rr_slip = ((wheel_speed_rr / ground_speed_kmh) - 1) * 100
-                    else:
-                        fl_slip = fr_slip = rl_slip = rr_slip = 0
+                    if use_gui_dashboard and dashboard and current_time - last_dashboard_update >= dashboard_update_interval:
+                        # Update the dashboard with current telemetry data
+                        dash_slips = compute_wheel_slips(frame)
+                        fl_slip, fr_slip, rl_slip, rr_slip = dash_slips or (0, 0, 0, 0)
                     
-                    # Calculate vibration intensities
-                    throttle_vibration = 0
-                    brake_vibration = 0
+                        # Calculate vibration intensities
+                        throttle_vibration = 0
+                        brake_vibration = 0
                     
-                    if ground_speed * 3.6 > 5:  # Only calculate when moving faster than 5 km/h
-                        # Calculate throttle vibration based on wheel spin
-                        if throttle > 50:
-                            # Calculate maximum wheel spin
-                            max_spin = max(fl_slip, fr_slip, rl_slip, rr_slip)
+                        if dash_slips is not None:  # Only calculate when moving faster than 5 km/h
+                            # Calculate throttle vibration based on wheel spin
+                            if frame.throttle > 50:
+                                # Calculate maximum wheel spin
+                                max_spin = max(fl_slip, fr_slip, rl_slip, rr_slip)
                             
-                            # Apply vibration if spin exceeds threshold
-                            if max_spin > wheel_slip_threshold:
-                                # Calculate intensity: (滑移率 - 阈值) / 50，归一化到0-1
-                                slip_intensity = min(1.0, (max_spin - wheel_slip_threshold) / 50.0)
-                                # Apply user's haptic strength setting
-                                throttle_vibration = slip_intensity * haptic_strength
+                                # Apply vibration if spin exceeds threshold
+                                if max_spin > cfg.wheel_slip_threshold:
+                                    # Calculate intensity: (滑移率 - 阈值) / 50，归一化到0-1
+                                    slip_intensity = min(1.0, (max_spin - cfg.wheel_slip_threshold) * cfg.haptic_slip_scale)
+                                    # Apply user's haptic strength setting
+                                    throttle_vibration = slip_intensity * cfg.haptic_strength
                         
-                        # Calculate brake vibration based on wheel lock
-                        if brake > 30:
-                            # Calculate maximum wheel lock (负值取绝对值)
-                            max_lock = max(abs(fl_slip), abs(fr_slip), abs(rl_slip), abs(rr_slip))
+                            # Calculate brake vibration based on wheel lock
+                            if frame.brake > 30:
+                                # Calculate maximum wheel lock (负值取绝对值)
+                                max_lock = max(abs(fl_slip), abs(fr_slip), abs(rl_slip), abs(rr_slip))
                             
-                            # Apply vibration if lock exceeds threshold
-                            if max_lock > wheel_slip_threshold:
-                                # Calculate intensity: (锁死率 - 阈值) / 50，归一化到0-1
-                                lock_intensity = min(1.0, (max_lock - wheel_slip_threshold) / 50.0)
-                                # Apply user's haptic strength setting
-                                brake_vibration = lock_intensity * haptic_strength
+                                # Apply vibration if lock exceeds threshold
+                                if max_lock > cfg.wheel_slip_threshold:
+                                    # Calculate intensity: (锁死率 - 阈值) / 50，归一化到0-1
+                                    lock_intensity = min(1.0, (max_lock - cfg.wheel_slip_threshold) * cfg.haptic_slip_scale)
+                                    # Apply user's haptic strength setting
+                                    brake_vibration = lock_intensity * cfg.haptic_strength
                     
-                    # Update dashboard with all telemetry data
-                    dashboard.update_values({
-                        'car_speed': car_speed,
-                        'ground_speed': ground_speed * 3.6,
-                        'rpm': rpm,
-                        'gear': gear_id,
-                        'water_temp': water_temp,
-                        'turbo_pressure': turbo_pressure,
-                        'race_time': race_time,
-                        'wheel_fl': wheel_speed_fl,
-                        'wheel_fr': wheel_speed_fr,
-                        'wheel_rl': wheel_speed_rl,
-                        'wheel_rr': wheel_speed_rr,
-                        'slip_fl': fl_slip,
-                        'slip_fr': fr_slip,
-                        'slip_rl': rl_slip,
-                        'slip_rr': rr_slip,
-                        'throttle': throttle,
-                        'brake': brake,
-                        'handbrake': handbrake,
-                        'clutch': clutch,
-                        'steering': steering,
-                        'throttle_vibration': throttle_vibration,  # Add vibration data
-                        'brake_vibration': brake_vibration  # Add vibration data
-                    })
-                    last_dashboard_update = current_time
+                        # Update dashboard with all telemetry data
+                        dashboard.update_values({
+                            'car_speed': frame.car_speed,
+                            'ground_speed': frame.ground_speed * 3.6,
+                            'rpm': frame.rpm,
+                            'gear': frame.gear_id,
+                            'water_temp': frame.water_temp,
+                            'turbo_pressure': frame.turbo_pressure,
+                            'race_time': frame.race_time,
+                            'wheel_fl': frame.wheel_speed_fl,
+                            'wheel_fr': frame.wheel_speed_fr,
+                            'wheel_rl': frame.wheel_speed_rl,
+                            'wheel_rr': frame.wheel_speed_rr,
+                            'slip_fl': fl_slip,
+                            'slip_fr': fr_slip,
+                            'slip_rl': rl_slip,
+                            'slip_rr': rr_slip,
+                            'throttle': frame.throttle,
+                            'brake': frame.brake,
+                            'handbrake': frame.handbrake,
+                            'clutch': frame.clutch,
+                            'steering': frame.steering,
+                            'throttle_vibration': throttle_vibration,  # Add vibration data
+                            'brake_vibration': brake_vibration  # Add vibration data
+                        })
+                        last_dashboard_update = current_time
                 
-                elif print_telemetry_enabled and not use_gui_dashboard:
-                    # Only print to console if GUI dashboard is disabled
-                    print(chr(27) + "[2J")  # clear screen
-                    print(chr(27) + "[H")   # return to home
-                    print(f"Car Speed: {car_speed:.2f} km/h")
-                    print(f"Ground Speed: {ground_speed*3.6:.2f} km/h")
-                    print(f"RPM: {rpm:.0f}")
-                    print(f"Gear: {gear_id}")
-                    print(f"Water Temp: {water_temp:.1f}°C")
-                    print(f"Turbo Pressure: {turbo_pressure:.2f} bar")
-                    print(f"Race Time: {race_time:.2f} s")
-                    print(f"Throttle: {throttle:.1f}%")
-                    print(f"Brake: {brake:.1f}%")
-                    print(f"Handbrake: {handbrake:.1f}%")
-                    print(f"Clutch: {clutch:.1f}%")
-                    print(f"Steering: {steering:.2f}")
+                    elif cfg.print_telemetry_enabled and not use_gui_dashboard:
+                        # Only print to console if GUI dashboard is disabled
+                        print(chr(27) + "[2J")  # clear screen
+                        print(chr(27) + "[H")   # return to home
+                        print(f"Car Speed: {frame.car_speed:.2f} km/h")
+                        print(f"Ground Speed: {frame.ground_speed*3.6:.2f} km/h")
+                        print(f"RPM: {frame.rpm:.0f}")
+                        print(f"Gear: {frame.gear_id}")
+                        print(f"Water Temp: {frame.water_temp:.1f}°C")
+                        print(f"Turbo Pressure: {frame.turbo_pressure:.2f} bar")
+                        print(f"Race Time: {frame.race_time:.2f} s")
+                        print(f"Throttle: {frame.throttle:.1f}%")
+                        print(f"Brake: {frame.brake:.1f}%")
+                        print(f"Handbrake: {frame.handbrake:.1f}%")
+                        print(f"Clutch: {frame.clutch:.1f}%")
+                        print(f"Steering: {frame.steering:.2f}")
                     
-                    print(f"\nWheel Speeds:")
-                    print(f"Front Left: {wheel_speed_fl:.2f} km/h")
-                    print(f"Front Right: {wheel_speed_fr:.2f} km/h")
-                    print(f"Rear Left: {wheel_speed_rl:.2f} km/h")
-                    print(f"Rear Right: {wheel_speed_rr:.2f} km/h")
+                        print(f"\nWheel Speeds:")
+                        print(f"Front Left: {frame.wheel_speed_fl:.2f} km/h")
+                        print(f"Front Right: {frame.wheel_speed_fr:.2f} km/h")
+                        print(f"Rear Left: {frame.wheel_speed_rl:.2f} km/h")
+                        print(f"Rear Right: {frame.wheel_speed_rr:.2f} km/h")
+                    if prof:
+                        prof.record('gui', time.perf_counter_ns() - stage_start)
             
-        except Exception as e:
-            print(f"Error reading memory: {e}")
-            # If we encounter an error, check if the game is still running
-            if not is_game_running():
-                print("Game has exited.")
-                if rbr_memory_reader:
-                    rbr_memory_reader.show_errors = False  # Suppress errors during shutdown
-                    rbr_memory_reader.close()
-                    rbr_memory_reader = None  # Completely release the memory reader
-            else:
-                # Try to reconnect if we lost connection but game is still running
-                print("Lost connection to game. Attempting to reconnect...")
-                if rbr_memory_reader:
-                    rbr_memory_reader.connect()
-            
-            # Set default values for telemetry
-            rpm = 0
-            car_speed = 0
-            # Reset other telemetry variables as needed
-            time.sleep(1)  # Add a small delay to avoid spamming errors
-            continue  # Skip the rest of the loop
-    else:
-        # Try to connect to RBR process
-        if rbr_memory_reader is None:
-            # Create a new memory reader instance
-            rbr_memory_reader = MemoryReader(process_name="RichardBurnsRally_SSE.exe")
+            except Exception as e:
+                loop_metrics.read_failures += 1
+                errors.record('loop.read', f"Error reading memory: {e}", with_traceback=True)
+                # If we encounter an error, check if the game is still running
+                if not is_game_running():
+                    print("Game has exited.")
+                    if rbr_memory_reader:
+                        rbr_memory_reader.show_errors = False  # Suppress errors during shutdown
+                        rbr_memory_reader.close()
+                        rbr_memory_reader = None  # Completely release the memory reader
+                else:
+                    # Try to reconnect if we lost connection but game is still running
+                    print("Lost connection to game. Attempting to reconnect...")
+                    if rbr_memory_reader:
+                        rbr_memory_reader.connect()
+            
+                # Set default values for telemetry
+                frame.rpm = 0
+                frame.car_speed = 0
+                # Reset other telemetry variables as needed
+                time.sleep(1)  # Add a small delay to avoid spamming errors
+                continue  # Skip the rest of the loop
         else:
-            rbr_memory_reader.connect()
-        time.sleep(1)  # Don't spam reconnection attempts
-        continue  # Skip the rest of the loop if not connected
+            # Try to connect to RBR process
+            if rbr_memory_reader is None:
+                # Create a new memory reader instance
+                rbr_memory_reader = MemoryReader(process_name="RichardBurnsRally_SSE.exe")
+            else:
+                rbr_memory_reader.connect()
+            time.sleep(1)  # Don't spam reconnection attempts
+            continue  # Skip the rest of the loop if not connected
     
-    # define packet for DualSense controller
-    packet = Packet([])
-
-    ###################################################################################
-    # Adaptive Trigger - 基于 Race-Element 优化算法
-    ###################################################################################
+        # define packet for DualSense controller
+        packet = Packet([])
+        if prof:
+            stage_start = time.perf_counter_ns()
+        inputs = source.inputs()
+        if prof:
+            now_ns = time.perf_counter_ns()
+            prof.record('derive', now_ns - stage_start)
+            stage_start = now_ns
+
+        ###################################################################################
+        # Adaptive Trigger - 基于 Race-Element 优化算法
+        ###################################################################################
     
-    if adaptive_trigger_enabled:
-        # 只在车辆运动时应用效果
-        if ground_speed * 3.6 > 5:  # Convert to km/h for comparison
-            # Convert ground_speed from m/s to km/h for consistent units
-            ground_speed_kmh = ground_speed * 3.6
-            
-            # Calculate wheel slip percentages - same as in telemetry display
-            fl_slip = ((wheel_speed_fl / ground_speed_kmh) - 1) * 100
-            fr_slip = ((wheel_speed_fr / ground_speed_kmh) - 1) * 100
-            rl_slip = ((wheel_speed_rl / ground_speed_kmh) - 1) * 100
-            rr_slip = ((wheel_speed_rr / ground_speed_kmh) - 1) * 100
-            
-            # === 刹车滑移反馈 (左扳机 L2) ===
-            # 刹车抱死：车轮转速 < 车速，滑移率为负
-            if brake > brake_threshold:
-                # 只检测负滑移（车轮抱死）
-                front_lock = max(abs(fl_slip) if fl_slip < 0 else 0, abs(fr_slip) if fr_slip < 0 else 0)
-                rear_lock = max(abs(rl_slip) if rl_slip < 0 else 0, abs(rr_slip) if rr_slip < 0 else 0)
-                
-                # 检查前后轮是否超过阈值
-                if front_lock > brake_front_slip_threshold or rear_lock > brake_rear_slip_threshold:
-                    # 计算滑移系数 (RBR适配版本)
-                    # 使用更大的除数让percentage分布更合理，支持低频到高频的完整范围
-                    front_slip_coef = front_lock / 25.0   # 调整归一化系数
-                    rear_slip_coef = rear_lock / 25.0
-                    
-                    # 计算总百分比 (0-1)
-                    percentage = (front_slip_coef + rear_slip_coef) / 2.0
-                    percentage = max(0.0, min(1.0, percentage))
-                    
-                    if percentage >= 0.01:  # 最小触发阈值（降低以支持更低频率震动）
-                        # 根据反转频率模式计算频率
-                        if brake_reverse_frequency_mode:
-                            # 反转模式：轻微滑移→高频，严重滑移→低频
-                            freq = int(brake_max_frequency - (brake_max_frequency - brake_min_frequency) * percentage)
-                        else:
-                            # 正常模式：轻微滑移→低频，严重滑移→高频
-                            freq = int(brake_min_frequency + (brake_max_frequency - brake_min_frequency) * percentage)
-                        freq = max(brake_min_frequency, min(brake_max_frequency, freq))
-                        
-                        # 根据用户选择使用不同的扳机模式
-                        if brake_use_automatic_gun:
-                            # AutomaticGun 模式 (mode=17)
-                            packet.instructions.append(
-                                Instruction(InstructionType.TriggerUpdate,
-                                           [0, Trigger.Left, TriggerMode.AutomaticGun, 0, brake_amplitude, freq])
-                            )
-                        else:
-                            # VIBRATION 模式 (mode=23)
-                            packet.instructions.append(
-                                Instruction(InstructionType.TriggerUpdate,
-                                           [0, Trigger.Left, 23, 0, brake_amplitude, freq])
-                            )
-            
-            # === 油门滑移反馈 (右扳机 R2) ===
-            # 油门打滑：车轮转速 > 车速，滑移率为正
-            if throttle > throttle_threshold:
-                # 只检测正滑移（车轮打滑）
-                front_spin = max(fl_slip if fl_slip > 0 else 0, fr_slip if fr_slip > 0 else 0)
-                rear_spin = max(rl_slip if rl_slip > 0 else 0, rr_slip if rr_slip > 0 else 0)
-                
-                # 检查前后轮是否超过阈值
-                if front_spin > throttle_front_slip_threshold or rear_spin > throttle_rear_slip_threshold:
-                    # 计算滑移系数 (RBR适配版本)
-                    # 使用更大的除数让percentage分布更合理，支持低频到高频的完整范围
-                    front_slip_coef = front_spin / 25.0   # 调整归一化系数
-                    rear_slip_coef = rear_spin / 25.0
-                    
-                    # 计算总百分比 (0-1)
-                    percentage = (front_slip_coef + rear_slip_coef) / 2.0
-                    percentage = max(0.0, min(1.0, percentage))
-                    
-                    if percentage >= 0.01:  # 最小触发阈值（降低以支持更低频率震动）
-                        # 根据反转频率模式计算频率
-                        if throttle_reverse_frequency_mode:
-                            # 反转模式：轻微滑移→高频，严重滑移→低频
-                            freq = int(throttle_max_frequency - (throttle_max_frequency - throttle_min_frequency) * percentage)
-                        else:
-                            # 正常模式：轻微滑移→低频，严重滑移→高频
-                            freq = int(throttle_min_frequency + (throttle_max_frequency - throttle_min_frequency) * percentage)
-                        freq = max(throttle_min_frequency, min(throttle_max_frequency, freq))
-                        
-                        # 根据用户选择使用不同的扳机模式
-                        if throttle_use_automatic_gun:
-                            # AutomaticGun 模式 (mode=17)
-                            packet.instructions.append(
-                                Instruction(InstructionType.TriggerUpdate,
-                                           [0, Trigger.Right, TriggerMode.AutomaticGun, 0, throttle_amplitude, freq])
-                            )
-                        else:
-                            # VIBRATION 模式 (mode=23)
-                            packet.instructions.append(
-                                Instruction(InstructionType.TriggerUpdate,
-                                           [0, Trigger.Right, 23, 0, throttle_amplitude, freq])
-                            )
-        
-        # 如果没有触发任何效果，恢复正常模式
-        if not packet.instructions:
-            packet.instructions.append(
-                Instruction(InstructionType.TriggerUpdate,
-                           [0, Trigger.Left, TriggerMode.Normal, 0, 0, 0])
-            )
-            packet.instructions.append(
-                Instruction(InstructionType.TriggerUpdate,
-                           [0, Trigger.Right, TriggerMode.Normal, 0, 0, 0])
-            )
+        if cfg.adaptive_trigger_enabled:
+            packet.instructions.extend(build_slip_triggers(cfg.brake_trigger, cfg.throttle_trigger, inputs))
 
-    ###################################################################################
-    # LED Effect
-    ###################################################################################
+        ###################################################################################
+        # LED Effect
+        ###################################################################################
     
-    if led_effect_enabled:
-        # Calculate RPM percentage - use car-specific max RPM
-        # Different cars have different redlines, so adjust this value based on the car
-        max_rpm = 7500  # Increased from 7000 to better match RBR cars
-        
-        # Ensure RPM is valid before calculating percentage
-        if rpm > 0 and game_running and game_state_id > 0:  # Only process when in race with valid RPM
-            rpm_percentage = min(100, (rpm / max_rpm) * 100)
-            
-            # Determine LED color based on RPM
-            if rpm_percentage < RPM_GREEN_THRESHOLD:
-                # Green
-                r, g, b = 0, 255, 0
-            elif rpm_percentage < RPM_YELLOW_THRESHOLD:
-                # Green to Yellow transition
-                factor = (rpm_percentage - RPM_GREEN_THRESHOLD) / (RPM_YELLOW_THRESHOLD - RPM_GREEN_THRESHOLD)
-                r, g, b = interpolate_color([0, 255, 0], [255, 255, 0], factor)
-            elif rpm_percentage < RPM_RED_THRESHOLD:
-                # Yellow to Red transition
-                factor = (rpm_percentage - RPM_YELLOW_THRESHOLD) / (RPM_RED_THRESHOLD - RPM_YELLOW_THRESHOLD)
-                r, g, b = interpolate_color([255, 255, 0], [255, 0, 0], factor)
-            else:
-                # Red - at or near redline
-                r, g, b = 255, 0, 0
-            
-            # Send RGB update instruction
-            packet.instructions.append(Instruction(InstructionType.RGBUpdate, [0, r, g, b]))
-        else:
-            # If RPM is invalid or not in race, set LED to off/dim
-            packet.instructions.append(Instruction(InstructionType.RGBUpdate, [0, 0, 0, 0]))
+        if cfg.led_effect_enabled:
+            packet.instructions.append(build_led_instruction(inputs.rpm, game_running and game_state_id > 0))
 
-    ###################################################################################
-    # Haptic Effect
-    ###################################################################################
+        ###################################################################################
+        # Haptic Effect
+        ###################################################################################
     
-    if haptic_effect_enabled:
-        # Add traction loss feedback based on wheel slip
-        if ground_speed * 3.6 > 5:  # Only when car is moving at a reasonable speed
-            # Calculate wheel slip percentages - same as in telemetry display
-            if 'fl_slip' in locals() and 'fr_slip' in locals() and 'rl_slip' in locals() and 'rr_slip' in locals():
-                # Check for significant wheel slip (either spin or lock)
-                max_spin = max(fl_slip if fl_slip > wheel_slip_threshold else 0,
-                              fr_slip if fr_slip > wheel_slip_threshold else 0, 
-                              rl_slip if rl_slip > wheel_slip_threshold else 0, 
-                              rr_slip if rr_slip > wheel_slip_threshold else 0)
-                
-                max_lock = max(abs(fl_slip) if fl_slip < -wheel_slip_threshold else 0,
-                              abs(fr_slip) if fr_slip < -wheel_slip_threshold else 0, 
-                              abs(rl_slip) if rl_slip < -wheel_slip_threshold else 0, 
-                              abs(rr_slip) if rr_slip < -wheel_slip_threshold else 0)
-                
-                # Determine if we have significant traction loss
-                if max_spin > wheel_slip_threshold or max_lock > wheel_slip_threshold:
-                    # Calculate the intensity based on the maximum slip or lock
-                    max_slip_intensity = max(
-                        min(1.0, (max_spin - wheel_slip_threshold) / 50),
-                        min(1.0, (max_lock - wheel_slip_threshold) / 50)
-                    )
-                    # Apply the user's haptic strength setting
-                    final_intensity = max_slip_intensity * haptic_strength * 0.5
-                    
-                    # Start wheel slip rumble if not already active
-                    if not wheel_slip_rumble_active:
-                        packet.instructions.append(Instruction(InstructionType.HapticFeedback, [
-                            os.path.join(haptics_path, "rumble_mid_4c.wav"), True, True
-                        ]))
-                        wheel_slip_rumble_active = True
-                    
-                    # Use the calculated intensity
-                    packet.instructions.append(Instruction(InstructionType.EditAudio, [
-                        os.path.join(haptics_path, "rumble_mid_4c.wav"), AudioEditType.Volume, final_intensity
-                    ]))
-                    
-                    # Add extra rumble effect for severe slip conditions
-                    if (max_spin > 40 or max_lock > 40) and (current_time - last_rumble_time > 0.3):
-                        packet.instructions.append(Instruction(InstructionType.HapticFeedback, [
-                            os.path.join(haptics_path, "rumble_mid_4c.wav"), False, False
-                        ]))
-                        last_rumble_time = current_time
-                else:
-                    # Stop wheel slip rumble if active
-                    if wheel_slip_rumble_active:
-                        packet.instructions.append(Instruction(InstructionType.EditAudio, [
-                            os.path.join(haptics_path, "rumble_mid_4c.wav"), AudioEditType.Stop, 0
-                        ]))
-                        wheel_slip_rumble_active = False
-        elif wheel_slip_rumble_active:
-            # Stop wheel slip rumble if car is not moving fast enough
-            packet.instructions.append(Instruction(InstructionType.EditAudio, [
-                os.path.join(haptics_path, "rumble_mid_4c.wav"), AudioEditType.Stop, 0
-            ]))
-            wheel_slip_rumble_active = False
-
-    # Update previous values for next iteration
-    previous_gear = gear_id
-    previous_rpm = rpm
+        if cfg.haptic_effect_enabled:
+            # Add traction loss feedback based on wheel slip
+            packet.instructions.extend(haptic.update(cfg, inputs.slips, current_time))
+        if prof:
+            prof.record('effects', time.perf_counter_ns() - stage_start)
     
-    # Check if we need to force stop vibration due to timeout (game paused or loading)
-    if current_time - last_valid_telemetry_time > telemetry_timeout:
-        if wheel_slip_rumble_active and not force_stop_vibration:
-            # Game might be paused or in loading screen, stop all vibrations
-            force_stop_packet = Packet([
-                Instruction(InstructionType.EditAudio, [
-                    os.path.join(haptics_path, "rumble_mid_4c.wav"), AudioEditType.Stop, 0
-                ]),
+        # Check if we need to force stop vibration due to timeout (game paused or loading)
+        if current_time - last_valid_telemetry_time > telemetry_timeout:
+            if haptic.active and not force_stop_vibration:
+                # Game might be paused or in loading screen, stop all vibrations
                 # Also reset triggers to normal mode
-                Instruction(InstructionType.TriggerUpdate, [0, Trigger.Left, TriggerMode.Normal, 0, 0, 0]),
-                Instruction(InstructionType.TriggerUpdate, [0, Trigger.Right, TriggerMode.Normal, 0, 0, 0])
-            ])
+                force_stop_packet = Packet([haptic.stop_instruction()] + normal_trigger_instructions())
+                try:
+                    dsx.send(force_stop_packet)
+                    loop_metrics.packets_sent += 1
+                    haptic.active = False
+                    force_stop_vibration = True
+                    print("Game paused or loading detected - stopping vibration")
+                except Exception as e:
+                    loop_metrics.send_errors += 1
+                    errors.record('dsx.send', f"Error sending stop vibration command: {e}")
+        else:
+            # Reset force stop flag when valid telemetry is received again
+            force_stop_vibration = False
+    
+        # Send packet to DualSense controller (only if not in force stop mode)
+        if not force_stop_vibration:
             try:
-                sock_dsx.sendto(json.dumps(force_stop_packet.to_dict()).encode(), (UDP_IP, UDP_DSX_PORT))
-                wheel_slip_rumble_active = False
-                force_stop_vibration = True
-                print("Game paused or loading detected - stopping vibration")
+                if prof:
+                    stage_start = time.perf_counter_ns()
+                payload = encode_packet(packet)
+                if prof:
+                    now_ns = time.perf_counter_ns()
+                    prof.record('serialise', now_ns - stage_start)
+                    stage_start = now_ns
+                dsx.send_payload(payload)
+                if prof:
+                    prof.record('send', time.perf_counter_ns() - stage_start)
+                loop_metrics.packets_sent += 1
+                startup.first_packet()
             except Exception as e:
-                print(f"Error sending stop vibration command: {e}")
-    else:
-        # Reset force stop flag when valid telemetry is received again
-        force_stop_vibration = False
+                loop_metrics.send_errors += 1
+                errors.record('dsx.send', f"Error sending data to controller: {e}")
+        else:
+            loop_metrics.packets_suppressed += 1
     
-    # Send packet to DualSense controller (only if not in force stop mode)
-    if not force_stop_vibration:
-        try:
-            sock_dsx.sendto(json.dumps(packet.to_dict()).encode(), (UDP_IP, UDP_DSX_PORT))
-        except Exception as e:
-            print(f"Error sending data to controller: {e}")
+        tick_ns = time.perf_counter_ns() - tick_start
+        loop_metrics.ticks += 1
+        if tick_ns > tick_profiler.budget_ns:
+            loop_metrics.overruns += 1
+        if prof:
+            prof.end_tick(tick_ns)
+            if current_time >= next_profile_report:
+                next_profile_report = current_time + PROFILE_REPORT_INTERVAL
+                print("[TickProfiler] last %.0fs:\n  " % PROFILE_REPORT_INTERVAL + "\n  ".join(prof.table()))
+                prof.reset()
     
-    # Sleep to maintain update rate
-    try:
-        time.sleep(max(0, 0.01 - (time.time() - current_time)))  # Target 100Hz update rate
-    except ValueError:
-        # Handle case where sleep time calculation is negative
-        pass
\ No newline at end of file
+        # Sleep to maintain update rate
+        try:
+            time.sleep(max(0, TICK_INTERVAL - (time.time() - current_time)))  # Target 100Hz update rate
+        except ValueError:
+            # Handle case where sleep time calculation is negative
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,12 @@ a = Analysis(
     datas=[
         ('haptics', 'haptics'),
     ] + ([('icon.ico', '.')] if os.path.exists('icon.ico') else []),
-    hiddenimports=['pydirectinput', 'keyboard', 'psutil', 'win32gui', 'win32con', 'win32api', 'win32process'],
+    hiddenimports=[
+        'pydirectinput', 'keyboard', 'psutil', 'win32gui', 'win32con', 'win32api', 'win32process',
+        # 仪表盘模块由 load_gui_modules() 按名称导入，分析阶段看不到
+        'tkinter', 'tkinter.ttk', 'tkinter.font', 'numpy',
+        'matplotlib.figure', 'matplotlib.backends.backend_tkagg',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,132 @@
+"""
+AC Runtime Config - AC 适配器的运行时配置快照
+Everything the AC telemetry loop and dashboard read while running, parsed and clamped once into an
+immutable RuntimeConfig. The GUI and the config_ac.ini watcher build a new snapshot and swap the
+module-level reference, so a slider change is picked up on the next tick and the loop never sees a
+half-updated set of values.
+"""
+from collections import namedtuple
+
+from config_common import ConfigError, clamp, validate_keys, validate_frequency_ranges, read_config_file
+from adapter_core import SlipTrigger, Trigger, TRIGGER_VIBRATION
+
+# 从 config_ac.ini 读取的字段
+CONFIG_FIELDS = (
+    'adaptive_trigger_enabled', 'led_effect_enabled', 'haptic_effect_enabled',
+    'brake_threshold', 'brake_front_slip_threshold', 'brake_rear_slip_threshold',
+    'brake_feedback_strength', 'brake_amplitude', 'brake_min_frequency', 'brake_max_frequency',
+    'throttle_threshold', 'throttle_front_slip_threshold', 'throttle_rear_slip_threshold',
+    'throttle_feedback_strength', 'throttle_amplitude', 'throttle_min_frequency', 'throttle_max_frequency',
+    'rpm_green', 'rpm_yellow', 'rpm_red',
+    'ghost_hint', 'ghost_behind_ms', 'ghost_full_scale_ms',
+)
+# 由上面字段推导、build_ac_packet 直接使用的扳机参数
+DERIVED_FIELDS = ('brake_trigger', 'throttle_trigger')
+
+RuntimeConfig = namedtuple('RuntimeConfig', CONFIG_FIELDS + DERIVED_FIELDS)
+
+# 前/后轴滑移权重(参考 Race-Element 算法): percentage = 前轴 * 前权重 + 后轴 * 后权重
+BRAKE_SLIP_WEIGHTS = (4.0 / 17.5, 2.0 / 17.5)
+THROTTLE_SLIP_WEIGHTS = (3.0 / 12.5, 5.0 / 12.5)
+GHOST_HINTS = ('off', 'player_led', 'lightbar')  # 落后于参考圈时的提示方式
+
+
+def _slip_trigger(values, prefix, trigger, weights):
+    """AC 的滑移反馈: 滑移取绝对值，阻力 + 震动两条指令"""
+    return SlipTrigger(
+        trigger=trigger, slip_sign=0,
+        input_threshold=values[prefix + '_threshold'],
+        front_threshold=values[prefix + '_front_slip_threshold'],
+        rear_threshold=values[prefix + '_rear_slip_threshold'],
+        front_weight=weights[0], rear_weight=weights[1],
+        min_percentage=0.05,
+        feedback_strength=values[prefix + '_feedback_strength'],
+        mode=TRIGGER_VIBRATION,
+        amplitude=values[prefix + '_amplitude'],
+        min_frequency=values[prefix + '_min_frequency'],
+        max_frequency=values[prefix + '_max_frequency'],
+        reverse_frequency=False,
+    )
+
+
+def build_runtime_config(**values):
+    """由 CONFIG_FIELDS 构造快照并计算派生的扳机参数"""
+    values.update(
+        brake_trigger=_slip_trigger(values, 'brake', Trigger.Left, BRAKE_SLIP_WEIGHTS),
+        throttle_trigger=_slip_trigger(values, 'throttle', Trigger.Right, THROTTLE_SLIP_WEIGHTS),
+    )
+    return RuntimeConfig(**values)
+
+
+def replace_runtime_config(runtime_config, **changes):
+    """返回修改了部分字段的新快照(派生参数重新计算)"""
+    values = {name: getattr(runtime_config, name) for name in CONFIG_FIELDS}
+    values.update(changes)
+    return build_runtime_config(**values)
+
+
+def load_runtime_config(config):
+    """从 ConfigParser 解析全部运行时参数并限制在合理范围内"""
+    getint, getfloat, getboolean = config.getint, config.getfloat, config.getboolean
+    ghost_hint = config.get('Ghost', 'hint', fallback='player_led')
+    ghost_behind_ms = clamp(getint('Ghost', 'behind_threshold_ms', fallback=100), 0, 10000)
+    return build_runtime_config(
+        adaptive_trigger_enabled=getboolean('Features', 'adaptive_trigger', fallback=True),
+        led_effect_enabled=getboolean('Features', 'led_effect', fallback=True),
+        haptic_effect_enabled=getboolean('Features', 'haptic_effect', fallback=False),
+
+        brake_threshold=clamp(getfloat('BrakeSlip', 'brake_threshold', fallback=3.0), 0.1, 99.0),
+        brake_front_slip_threshold=clamp(getfloat('BrakeSlip', 'front_slip_threshold', fallback=0.250), 0.05, 6.0),
+        brake_rear_slip_threshold=clamp(getfloat('BrakeSlip', 'rear_slip_threshold', fallback=0.250), 0.05, 6.0),
+        brake_feedback_strength=clamp(getint('BrakeSlip', 'feedback_strength', fallback=7), 1, 8),
+        brake_amplitude=clamp(getint('BrakeSlip', 'amplitude', fallback=5), 1, 8),
+        brake_min_frequency=clamp(getint('BrakeSlip', 'min_frequency', fallback=25), 1, 50),
+        brake_max_frequency=clamp(getint('BrakeSlip', 'max_frequency', fallback=85), 20, 150),
+
+        throttle_threshold=clamp(getfloat('ThrottleSlip', 'throttle_threshold', fallback=3.0), 0.1, 99.0),
+        throttle_front_slip_threshold=clamp(getfloat('ThrottleSlip', 'front_slip_threshold', fallback=0.350), 0.05, 6.0),
+        throttle_rear_slip_threshold=clamp(getfloat('ThrottleSlip', 'rear_slip_threshold', fallback=0.250), 0.05, 10.0),
+        throttle_feedback_strength=clamp(getint('ThrottleSlip', 'feedback_strength', fallback=8), 1, 8),
+        throttle_amplitude=clamp(getint('ThrottleSlip', 'amplitude', fallback=4), 1, 8),
+        throttle_min_frequency=clamp(getint('ThrottleSlip', 'min_frequency', fallback=30), 1, 50),
+        throttle_max_frequency=clamp(getint('ThrottleSlip', 'max_frequency', fallback=96), 20, 150),
+
+        rpm_green=getfloat('LED', 'rpm_green', fallback=70.0),
+        rpm_yellow=getfloat('LED', 'rpm_yellow', fallback=85.0),
+        rpm_red=getfloat('LED', 'rpm_red', fallback=95.0),
+
+        ghost_hint=ghost_hint if ghost_hint in GHOST_HINTS else 'off',
+        ghost_behind_ms=ghost_behind_ms,
+        ghost_full_scale_ms=max(ghost_behind_ms + 1, getint('Ghost', 'full_scale_ms', fallback=1000)),
+    )
+
+
+# 热重载时逐项校验的键: (section, key, 类型)；缺失的键使用默认值，不算错误
+VALIDATED_KEYS = (
+    ('Features', 'adaptive_trigger', bool), ('Features', 'led_effect', bool), ('Features', 'haptic_effect', bool),
+    ('BrakeSlip', 'brake_threshold', float), ('BrakeSlip', 'front_slip_threshold', float),
+    ('BrakeSlip', 'rear_slip_threshold', float), ('BrakeSlip', 'feedback_strength', int),
+    ('BrakeSlip', 'amplitude', int), ('BrakeSlip', 'min_frequency', int), ('BrakeSlip', 'max_frequency', int),
+    ('ThrottleSlip', 'throttle_threshold', float), ('ThrottleSlip', 'front_slip_threshold', float),
+    ('ThrottleSlip', 'rear_slip_threshold', float), ('ThrottleSlip', 'feedback_strength', int),
+    ('ThrottleSlip', 'amplitude', int), ('ThrottleSlip', 'min_frequency', int), ('ThrottleSlip', 'max_frequency', int),
+    ('LED', 'rpm_green', float), ('LED', 'rpm_yellow', float), ('LED', 'rpm_red', float),
+    ('Ghost', 'enabled', bool), ('Ghost', 'behind_threshold_ms', int), ('Ghost', 'full_scale_ms', int),
+)
+
+
+def validate_config(config):
+    """检查类型错误与互相矛盾的取值，发现问题时抛出 ConfigError"""
+    validate_keys(config, VALIDATED_KEYS)
+    validate_frequency_ranges(config)
+    hint = config.get('Ghost', 'hint', fallback='off')
+    if hint not in GHOST_HINTS:
+        raise ConfigError(f"[Ghost] hint = {hint!r} must be one of {', '.join(GHOST_HINTS)}")
+    green, yellow, red = (config.getfloat('LED', key, fallback=None) for key in ('rpm_green', 'rpm_yellow', 'rpm_red'))
+    if None not in (green, yellow, red) and not green < yellow < red:
+        raise ConfigError(f"[LED] rpm_green < rpm_yellow < rpm_red is required (got {green:g}, {yellow:g}, {red:g})")
+
+
+def parse_config_file(path):
+    """读取并校验 config_ac.ini，返回 (ConfigParser, RuntimeConfig)；文件无效时抛出 ConfigError"""
+    return read_config_file(path, validate_config, load_runtime_config)
@@ -0,0 +1,282 @@
+"""
+Adapter Core - RBR 与 AC 适配器共用的 DSX 协议与效果计算
+DSX instruction types and enums, the Instruction/Packet wire format, the UDP client and the effect
+helpers (slip -> vibration frequency, RPM -> LED colour) that both adapters used to carry their own
+copies of. Each adapter supplies a TelemetrySource that normalises its game data into an
+InputFrame, and a pair of SlipTrigger parameter sets; the trigger effect itself is built here.
+
+The enums are IntEnums: members are plain ints, so json serialises them directly and the old
+`.value` spelling used by the AC adapter keeps working.
+"""
+import json
+import socket
+from collections import namedtuple
+from enum import IntEnum
+
+import psutil
+
+
+###################################################################################
+# DSX 协议
+###################################################################################
+
+class InstructionType(IntEnum):
+    Invalid = 0
+    TriggerUpdate = 1
+    RGBUpdate = 2
+    PlayerLED = 3
+    TriggerThreshold = 4
+    MicLED = 5
+    PlayerLEDNewRevision = 6
+    ResetToUserSettings = 7
+    HapticFeedback = 20
+    EditAudio = 21
+
+
+class Trigger(IntEnum):
+    Invalid = 0
+    Left = 1       # L2 - 刹车
+    Right = 2      # R2 - 油门
+
+
+class TriggerMode(IntEnum):
+    Normal = 0
+    GameCube = 1
+    VerySoft = 2
+    Soft = 3
+    Hard = 4
+    VeryHard = 5
+    Hardest = 6
+    Rigid = 7
+    VibrateTrigger = 8
+    Choppy = 9
+    Medium = 10
+    VibrateTriggerPulse = 11      # 脉冲振动 - 用于打滑反馈
+    CustomTriggerValue = 12
+    Resistance = 13
+    Bow = 14
+    Galloping = 15
+    SemiAutomaticGun = 16
+    AutomaticGun = 17
+    Machine = 18
+
+
+# DSX v3 的扩展扳机模式(不在 TriggerMode 中)
+TRIGGER_FEEDBACK = 21   # 阻力: [.., 21, 起点, 强度, 0]
+TRIGGER_VIBRATION = 23  # 震动: [.., 23, 起点, 幅度, 频率]
+
+
+class CustomTriggerValueMode(IntEnum):
+    OFF = 0
+    Rigid = 1
+    RigidA = 2
+    RigidB = 3
+    RigidAB = 4
+    Pulse = 5
+    PulseA = 6
+    PulseB = 7
+    PulseAB = 8
+    VibrateResistance = 9
+    VibrateResistanceA = 10
+    VibrateResistanceB = 11
+    VibrateResistanceAB = 12
+    VibratePulse = 13
+    VibratePulseA = 14
+    VibratePulseB = 15
+    VibratePulseAB = 16
+
+
+class PlayerLEDNewRevision(IntEnum):
+    One = 0
+    Two = 1
+    Three = 2
+    Four = 3
+    Five = 4  # Five is Also All On
+    AllOff = 5
+
+
+class MicLEDMode(IntEnum):
+    On = 0
+    Pulse = 1
+    Off = 2
+
+
+class AudioEditType(IntEnum):
+    Pitch = 0
+    Volume = 1
+    Stop = 2
+    StopAll = 3
+
+
+class Instruction:
+    """DSX指令; instruction_type 可以是 InstructionType 或整数"""
+    __slots__ = ('type', 'parameters')
+
+    def __init__(self, instruction_type, parameters):
+        self.type = int(instruction_type)
+        self.parameters = parameters
+
+    def to_dict(self):
+        return {"type": self.type, "parameters": self.parameters}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(InstructionType(data["type"]), data["parameters"])
+
+
+class Packet:
+    """DSX数据包"""
+    __slots__ = ('instructions',)
+
+    def __init__(self, instructions):
+        self.instructions = instructions
+
+    def to_dict(self):
+        return {"instructions": [instr.to_dict() for instr in self.instructions]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([Instruction.from_dict(instr) for instr in data["instructions"]])
+
+
+def encode_packet(packet):
+    """序列化为 DSX UDP 负载"""
+    return json.dumps(packet.to_dict()).encode()
+
+
+class DSXClient:
+    """DSX UDP 客户端: 整个运行期间只创建一个 socket (以前 AC 适配器每个包都新建/关闭一次)"""
+
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, packet):
+        """序列化并发送；失败时抛出 OSError，由调用方计数/记录"""
+        self.sock.sendto(encode_packet(packet), self.address)
+
+    def send_payload(self, payload):
+        """发送已序列化的负载(分别统计序列化与发送耗时时使用)"""
+        self.sock.sendto(payload, self.address)
+
+    def close(self):
+        self.sock.close()
+
+
+###################################################################################
+# 游戏数据源
+###################################################################################
+
+# 一帧归一化后的输入: slips 为四轮 (FL, FR, RL, RR) 滑移(各游戏自己的单位，车速过低时为 None)，
+# brake/throttle 为踏板 0-100 %
+InputFrame = namedtuple('InputFrame', 'slips brake throttle rpm')
+
+
+class TelemetrySource:
+    """游戏数据源接口: read_frame() 读取一帧并返回 InputFrame，没有可用数据时返回 None。
+    游戏特有的完整数据(RBRFrame、ACPhysics)留在各自的数据源上，供换挡、仪表盘等使用"""
+
+    def read_frame(self):
+        raise NotImplementedError
+
+
+###################################################################################
+# 效果计算
+###################################################################################
+
+def normal_trigger_instructions():
+    """两个扳机恢复正常模式(没有效果时、复位/暂停时发送)"""
+    return [Instruction(InstructionType.TriggerUpdate, [0, Trigger.Left, TriggerMode.Normal, 0, 0, 0]),
+            Instruction(InstructionType.TriggerUpdate, [0, Trigger.Right, TriggerMode.Normal, 0, 0, 0])]
+
+
+def slip_frequency(min_freq, max_freq, percentage, reverse=False):
+    """滑移程度 percentage (0-1) -> 震动频率; reverse: 轻微滑移→高频，严重滑移→低频"""
+    span = max_freq - min_freq
+    if reverse:
+        freq = int(max_freq - span * percentage)
+    else:
+        freq = int(min_freq + span * percentage)
+    return max(min_freq, min(max_freq, freq))
+
+
+# 一个扳机的滑移反馈参数; 两个适配器的差异都在这里，计算只有 slip_trigger_instructions() 一份
+SlipTrigger = namedtuple('SlipTrigger', (
+    'trigger',          # Trigger.Left(刹车) / Trigger.Right(油门)
+    'slip_sign',        # -1 只取抱死(负滑移), 1 只取打滑(正滑移), 0 取绝对值
+    'input_threshold',  # 踏板超过此值(%)才检测
+    'front_threshold', 'rear_threshold',  # 任一轴超过阈值才触发
+    'front_weight', 'rear_weight',        # percentage = 前轴 * front_weight + 后轴 * rear_weight, 限制在 0-1
+    'min_percentage',   # 低于此值不触发
+    'feedback_strength',  # > 0 时先加一条阻力指令，强度 = feedback_strength * percentage (1-8)
+    'mode', 'amplitude', 'min_frequency', 'max_frequency', 'reverse_frequency',
+))
+
+
+def axle_slips(slips, sign):
+    """四轮滑移 -> (前轴, 后轴) 最大值; sign 含义同 SlipTrigger.slip_sign"""
+    fl, fr, rl, rr = slips
+    if sign:
+        return max(fl * sign, fr * sign, 0.0), max(rl * sign, rr * sign, 0.0)
+    return max(abs(fl), abs(fr)), max(abs(rl), abs(rr))
+
+
+def slip_trigger_instructions(spec, pedal, slips):
+    """一个扳机的滑移反馈指令；未触发时返回空列表"""
+    if pedal <= spec.input_threshold:
+        return []
+    front, rear = axle_slips(slips, spec.slip_sign)
+    if front <= spec.front_threshold and rear <= spec.rear_threshold:
+        return []
+    percentage = max(0.0, min(1.0, front * spec.front_weight + rear * spec.rear_weight))
+    if percentage < spec.min_percentage:
+        return []
+    instructions = []
+    if spec.feedback_strength:
+        strength = max(1, min(8, int(spec.feedback_strength * percentage)))
+        instructions.append(Instruction(InstructionType.TriggerUpdate,
+                                        [0, spec.trigger, TRIGGER_FEEDBACK, 1, strength, 0]))
+    freq = slip_frequency(spec.min_frequency, spec.max_frequency, percentage, spec.reverse_frequency)
+    instructions.append(Instruction(InstructionType.TriggerUpdate,
+                                    [0, spec.trigger, spec.mode, 0, spec.amplitude, freq]))
+    return instructions
+
+
+def build_slip_triggers(brake_spec, throttle_spec, inputs):
+    """两个扳机的滑移反馈; inputs 为 InputFrame。车速过低或没有触发任何效果时两个扳机恢复正常"""
+    if inputs.slips is None:
+        return normal_trigger_instructions()
+    instructions = (slip_trigger_instructions(brake_spec, inputs.brake, inputs.slips)
+                    + slip_trigger_instructions(throttle_spec, inputs.throttle, inputs.slips))
+    return instructions or normal_trigger_instructions()
+
+
+def interpolate_color(color1, color2, factor):
+    """在两种颜色之间进行线性插值"""
+    r1, g1, b1 = color1
+    r2, g2, b2 = color2
+    return (int(r1 + (r2 - r1) * factor), int(g1 + (g2 - g1) * factor), int(b1 + (b2 - b1) * factor))
+
+
+def rpm_led_color(rpm_percentage, green, yellow, red):
+    """转速百分比 -> LED 颜色: 绿 -> 黄 -> 红; green/yellow/red 为各段的上限(%)"""
+    if rpm_percentage < green:
+        return (0, 255, 0)
+    if rpm_percentage < yellow:
+        return interpolate_color((0, 255, 0), (255, 255, 0), (rpm_percentage - green) / (yellow - green))
+    if rpm_percentage < red:
+        return interpolate_color((255, 255, 0), (255, 0, 0), (rpm_percentage - yellow) / (red - yellow))
+    return (255, 0, 0)  # Red - at or near redline
+
+
+###################################################################################
+# 进程
+###################################################################################
+
+def get_process_by_name(name):
+    """通过进程名查找进程，返回 PID 或 None"""
+    name = name.lower()
+    for proc in psutil.process_iter(['pid', 'name']):
+        if (proc.info['name'] or '').lower() == name:
+            return proc.info['pid']
+    return None
@@ -0,0 +1,61 @@
+"""
+Config Common - RBR 与 AC 运行时配置共用的校验/解析工具
+The generic half of rbr_config and ac_config: clamping, per-key type checks, the min/max frequency
+check both slip sections need, reading a file into a validated (ConfigParser, RuntimeConfig) pair,
+and the ConfigWatcher callback's reject-and-keep handling. Each adapter's config module keeps only
+its key tables, its RuntimeConfig and its own consistency checks.
+"""
+import os
+import configparser
+
+GETTERS = {bool: 'getboolean', int: 'getint', float: 'getfloat'}
+
+
+class ConfigError(Exception):
+    """配置文件内容无效；消息说明具体原因，热重载时打印并保留旧配置"""
+
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def validate_keys(config, validated_keys):
+    """validated_keys: (section, key, 类型) 序列；缺失的键使用默认值，不算错误"""
+    for section, key, kind in validated_keys:
+        if not config.has_option(section, key):
+            continue
+        try:
+            getattr(config, GETTERS[kind])(section, key)
+        except ValueError:
+            raise ConfigError(f"[{section}] {key} = {config.get(section, key)!r} is not a valid {kind.__name__}")
+
+
+def validate_frequency_ranges(config, sections=('BrakeSlip', 'ThrottleSlip')):
+    """各滑移段的 min_frequency 不能大于 max_frequency"""
+    for section in sections:
+        low = config.getint(section, 'min_frequency', fallback=None)
+        high = config.getint(section, 'max_frequency', fallback=None)
+        if low is not None and high is not None and low > high:
+            raise ConfigError(f"[{section}] min_frequency ({low}) is greater than max_frequency ({high})")
+
+
+def read_config_file(path, validate, load):
+    """读取并校验配置文件，返回 (ConfigParser, load(config))；文件无效时抛出 ConfigError"""
+    config = configparser.ConfigParser()
+    try:
+        with open(path, encoding='utf-8') as f:
+            config.read_file(f)
+    except (OSError, UnicodeDecodeError, configparser.Error) as e:
+        raise ConfigError(f"cannot parse {os.path.basename(path)}: {e}")
+    validate(config)
+    return config, load(config)
+
+
+def parse_or_reject(path, parse):
+    """ConfigWatcher 回调(监视线程)的公共部分: 返回 parse(path)；文件无效时打印原因并返回 None，
+    调用方保留当前配置"""
+    try:
+        return parse(path)
+    except ConfigError as e:
+        print(f"[Config] {os.path.basename(path)} 修改被拒绝，保留当前配置: {e}")
+        return None
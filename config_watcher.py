@@ -0,0 +1,172 @@
+"""
+Config File Watcher - 配置文件监视
+Background thread that waits for changes to a single file using the OS change notification
+(inotify on Linux, FindFirstChangeNotification on Windows, slow stat polling elsewhere),
+debounces bursts of writes from editors and then calls on_change() once. The caller's loop does
+no filesystem work at all.
+"""
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+DEBOUNCE_TIME = 0.3   # 最后一次写入后静默该时间才触发重载(编辑器保存常分多次写)
+POLL_INTERVAL = 1.0   # 无系统通知可用时的轮询间隔
+WAIT_SLICE = 1.0      # 阻塞等待的最长时间，便于 stop() 及时生效
+
+
+def _signature(path):
+    """文件内容是否变化的判据: (mtime_ns, size)；文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class _InotifyBackend:
+    """Linux inotify: 监视所在目录，兼容"写临时文件再改名"的保存方式"""
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.name = os.path.basename(path).encode()
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.path.dirname(path).encode() or b'.', mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def wait(self, timeout):
+        """等待 timeout 秒，目标文件有事件时返回 True"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return False
+        offset, hit = 0, False
+        while offset + self._EVENT.size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b'\0')
+            hit = hit or name == self.name
+            offset += self._EVENT.size + length
+        return hit
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _WindowsBackend:
+    """Windows: FindFirstChangeNotificationW 监视所在目录(不区分文件，由签名比较过滤)"""
+    FILE_NOTIFY_CHANGE_FILE_NAME = 0x01
+    FILE_NOTIFY_CHANGE_SIZE = 0x08
+    FILE_NOTIFY_CHANGE_LAST_WRITE = 0x10
+    INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+    def __init__(self, path):
+        self.kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self.kernel32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+        self.kernel32.FindNextChangeNotification.argtypes = [ctypes.c_void_p]
+        self.kernel32.FindCloseChangeNotification.argtypes = [ctypes.c_void_p]
+        self.kernel32.WaitForSingleObject.argtypes = [ctypes.c_void_p, ctypes.c_uint32]
+        flags = self.FILE_NOTIFY_CHANGE_FILE_NAME | self.FILE_NOTIFY_CHANGE_SIZE | self.FILE_NOTIFY_CHANGE_LAST_WRITE
+        directory = os.path.dirname(os.path.abspath(path))
+        self.handle = self.kernel32.FindFirstChangeNotificationW(directory, False, flags)
+        if self.handle in (None, self.INVALID_HANDLE_VALUE):
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    def wait(self, timeout):
+        if self.kernel32.WaitForSingleObject(self.handle, int(timeout * 1000)) != 0:  # WAIT_OBJECT_0
+            return False
+        self.kernel32.FindNextChangeNotification(self.handle)
+        return True
+
+    def close(self):
+        self.kernel32.FindCloseChangeNotification(self.handle)
+
+
+class _PollBackend:
+    """兜底: 定期比较文件签名"""
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.last = _signature(path)
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        sig = _signature(self.path)
+        if sig != self.last:
+            self.last = sig
+            return True
+        return False
+
+    def close(self):
+        pass
+
+
+def _make_backend(path):
+    try:
+        if sys.platform.startswith('linux'):
+            return _InotifyBackend(path)
+        if sys.platform == 'win32':
+            return _WindowsBackend(path)
+    except OSError as e:
+        print(f"[ConfigWatcher] change notification unavailable ({e}), falling back to polling")
+    return _PollBackend(path)
+
+
+class ConfigWatcher:
+    """在后台线程监视 path，内容变化(去抖后)调用 on_change()；on_change 在监视线程中执行"""
+
+    def __init__(self, path, on_change, debounce=DEBOUNCE_TIME):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.debounce = debounce
+        self._running = False
+        self._last_signature = _signature(self.path)
+        self.backend_name = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        threading.Thread(target=self._run, name="ConfigWatcher", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        backend = _make_backend(self.path)
+        self.backend_name = type(backend).__name__.strip('_').replace('Backend', '').lower()
+        try:
+            while self._running:
+                if not backend.wait(WAIT_SLICE):
+                    continue
+                # 去抖: 持续有写入时继续等待，直到静默 debounce 秒
+                while self._running and backend.wait(self.debounce):
+                    pass
+                signature = _signature(self.path)
+                if signature is None or signature == self._last_signature:
+                    continue
+                self._last_signature = signature
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"[ConfigWatcher] reload callback failed: {e}")
+        finally:
+            backend.close()
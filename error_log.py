@@ -0,0 +1,105 @@
+"""
+Error Log - 限流的结构化错误统计
+Replaces print-on-failure in the hot paths. record() only updates a per-site entry (count, first and
+last seen, a few sampled messages, the first traceback) under a short lock; a background thread does
+all console output once per flush interval: the first occurrence of a site in full, afterwards one
+line per site with how many more occurred. Error storms therefore cost a dict update per error
+instead of slow console writes inside the 10 ms tick.
+"""
+import sys
+import time
+import traceback
+import threading
+from collections import deque
+
+FLUSH_INTERVAL = 2.0   # 后台输出间隔(秒)
+SAMPLED_MESSAGES = 5   # 每个位置保留的最近消息数
+
+
+class ErrorSite:
+    __slots__ = ('site', 'count', 'first_seen', 'last_seen', 'messages', 'first_message', 'first_traceback', 'reported')
+
+    def __init__(self, site, now):
+        self.site = site
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.messages = deque(maxlen=SAMPLED_MESSAGES)
+        self.first_message = None
+        self.first_traceback = None
+        self.reported = 0  # 已在控制台报告过的次数
+
+
+class ErrorLog:
+    """site: 出错位置的短名称(如 'memory.read')；stream 默认为 sys.stdout"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, stream=None):
+        self.flush_interval = flush_interval
+        self.stream = stream
+        self.sites = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, site, message, with_traceback=False):
+        """记录一次错误; 在 except 块中调用且 with_traceback=True 时保存该位置首次出现的 traceback"""
+        now = time.time()
+        with self._lock:
+            entry = self.sites.get(site)
+            if entry is None:
+                entry = self.sites[site] = ErrorSite(site, now)
+                entry.first_message = message
+                if with_traceback:
+                    entry.first_traceback = traceback.format_exc()
+            entry.count += 1
+            entry.last_seen = now
+            entry.messages.append((now, message))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ErrorLog", daemon=True)
+                self._thread.start()
+
+    def total(self):
+        return sum(entry.count for entry in list(self.sites.values()))
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def pending_lines(self):
+        """自上次输出以来的新错误: 新位置输出消息与 traceback，已报告过的位置只输出新增次数"""
+        lines = []
+        with self._lock:
+            for entry in self.sites.values():
+                new = entry.count - entry.reported
+                if new <= 0:
+                    continue
+                if entry.reported == 0:
+                    lines.append(f"[Error] {entry.site}: {entry.first_message}")
+                    if entry.first_traceback:
+                        lines.append(entry.first_traceback.rstrip())
+                    new -= 1
+                if new:
+                    lines.append(f"[Error] {entry.site}: {new} more in the last {self.flush_interval:g}s "
+                                 f"(last: {entry.messages[-1][1]})")
+                entry.reported = entry.count
+        return lines
+
+    def flush(self):
+        lines = self.pending_lines()
+        if lines:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+    def summary(self):
+        """对齐的文本表: 每个位置一行，按次数降序"""
+        with self._lock:
+            entries = sorted(self.sites.values(), key=lambda e: e.count, reverse=True)
+            rows = [(e.site, e.count, e.first_seen, e.last_seen, e.messages[-1][1]) for e in entries]
+        if not rows:
+            return ["no errors recorded"]
+        lines = [f"{'site':<20}{'count':>8}  {'first':<9}{'last':<9}last message"]
+        for site, count, first, last, message in rows:
+            lines.append(f"{site:<20}{count:>8}  {time.strftime('%H:%M:%S', time.localtime(first)):<9}"
+                         f"{time.strftime('%H:%M:%S', time.localtime(last)):<9}{message[:80]}")
+        return lines
@@ -0,0 +1,222 @@
+"""
+Auto Gear Shift Logic - 自动换挡判定
+Side-effect free shift decision shared by the RBR main loop and the offline tools
+(shift_optimizer.py). The caller is responsible for focus/pause checks and key presses.
+"""
+import configparser
+from collections import deque
+
+SHIFT_UP = 'up'
+SHIFT_DOWN = 'down'
+
+N_TO_1_RPM = 1500              # 空档时转速超过该值自动挂1档(静止起步)
+N_TO_1_GRACE_RPM = 800         # 起步辅助期间降低 N->1 的转速要求
+MAX_SHIFT_CLUTCH = 20          # 离合踩下超过该百分比时不换挡
+COUNTDOWN_END_GRACE_PERIOD = 1.5  # 倒计时结束后的宽限期(秒),在此期间降低N->1的rpm要求
+
+# 预测换挡: 用最近一段转速变化率提前按键，抵消按键注入 + 游戏换挡动作的延迟
+RPM_RATE_WINDOW = 0.15         # 估算 dRPM/dt 使用的时间窗口(秒)
+RPM_RATE_SAMPLES = 64          # 环形缓冲区容量
+MAX_PREDICT_RPM = 1500         # 单次预测最多提前的转速，防止读数跳变导致过早换挡
+SHIFT_LATENCY_RANGE = (0.0, 0.4)   # 学习到的换挡延迟上下限(秒)
+LATENCY_SMOOTHING = 0.2        # 延迟指数平滑系数
+PENDING_SHIFT_TIMEOUT = 1.0    # 按键后超过该时间档位仍未变化则放弃这次测量
+
+UP_RPM_RANGE = (3000, 9000)
+DOWN_RPM_RANGE = (1000, 4000)
+
+# 三组预设: Rally1(低功率), Rally2(中), Rally3(高功率) - (名称, config section, 默认升档, 默认降档)
+GEAR_SHIFT_PRESETS = (
+    ('Rally1', 'GearShift_Rally1', [6200, 6400, 6500, 6500, 6300, 6000], [2200, 2500, 2800, 3000, 3200, 3500]),
+    ('Rally2', 'GearShift_Rally2', [6800, 6500, 6300, 6000, 5800, 5500], [2500, 2800, 3000, 3500, 3800, 4000]),
+    ('Rally3', 'GearShift_Rally3', [7200, 7300, 7500, 7600, 7500, 7200], [1800, 2000, 2200, 2500, 2800, 3000]),
+)
+
+
+def parse_rpm_list(config, section, key, default_list, min_rpm=1000, max_rpm=9000):
+    """解析逗号分隔的转速列表，6个值对应1->2至6->7升档，2->1至7->6降档"""
+    try:
+        s = config.get(section, key, fallback=','.join(map(str, default_list)))
+        values = [float(x.strip()) for x in s.split(',') if x.strip()]
+        if len(values) >= 6:
+            return [max(min_rpm, min(max_rpm, v)) for v in values[:6]]
+        result = values + default_list[len(values):]
+        return [max(min_rpm, min(max_rpm, v)) for v in result[:6]]
+    except (ValueError, configparser.Error):
+        return default_list
+
+
+def load_preset(config, section, default_up, default_down):
+    if config.has_section(section):
+        up = parse_rpm_list(config, section, 'shift_up_rpm', default_up, *UP_RPM_RANGE)
+        down = parse_rpm_list(config, section, 'shift_down_rpm', default_down, *DOWN_RPM_RANGE)
+    else:
+        up = default_up.copy()
+        down = default_down.copy()
+    return (up, down)
+
+
+def load_presets(config):
+    """按 GEAR_SHIFT_PRESETS 顺序加载全部预设，返回 [(up, down), ...]"""
+    return [load_preset(config, section, up, down) for _, section, up, down in GEAR_SHIFT_PRESETS]
+
+
+class RpmRateEstimator:
+    """转速环形缓冲区，对最近 RPM_RATE_WINDOW 秒的样本做最小二乘求 dRPM/dt"""
+
+    def __init__(self, window=RPM_RATE_WINDOW, max_samples=RPM_RATE_SAMPLES):
+        self.window = window
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, t, rpm):
+        self.samples.append((t, rpm))
+
+    def reset(self):
+        self.samples.clear()
+
+    def rate(self):
+        """返回 rpm/s；样本不足时返回 0"""
+        if len(self.samples) < 3:
+            return 0.0
+        latest = self.samples[-1][0]
+        points = [(t, r) for t, r in self.samples if latest - t <= self.window]
+        if len(points) < 3:
+            return 0.0
+        n = len(points)
+        mean_t = sum(t for t, _ in points) / n
+        mean_r = sum(r for _, r in points) / n
+        var_t = sum((t - mean_t) ** 2 for t, _ in points)
+        if var_t <= 0:
+            return 0.0
+        return sum((t - mean_t) * (r - mean_r) for t, r in points) / var_t
+
+
+class ShiftLatencyEstimator:
+    """在线学习换挡延迟: 从按键到遥测 gear_id 实际变化的时间，指数平滑"""
+
+    def __init__(self, initial_latency=0.08):
+        self.latency = initial_latency
+        self.samples = 0
+        self._pending = None  # (direction, gear_id, press_time)
+
+    def on_press(self, direction, gear_id, press_time):
+        self._pending = (direction, gear_id, press_time)
+
+    def observe(self, gear_id, current_time):
+        """每帧调用；档位按预期方向变化时记录一次延迟样本"""
+        if self._pending is None:
+            return
+        direction, from_gear, press_time = self._pending
+        elapsed = current_time - press_time
+        if elapsed > PENDING_SHIFT_TIMEOUT:
+            self._pending = None
+            return
+        if gear_id == from_gear:
+            return
+        self._pending = None
+        if (gear_id > from_gear) != (direction == SHIFT_UP):
+            return
+        sample = max(SHIFT_LATENCY_RANGE[0], min(SHIFT_LATENCY_RANGE[1], elapsed))
+        if self.samples == 0:
+            self.latency = sample
+        else:
+            self.latency += LATENCY_SMOOTHING * (sample - self.latency)
+        self.samples += 1
+
+
+class AutoShiftLogic:
+    """换挡判定与冷却/起步辅助状态
+
+    shift_up_rpm / shift_down_rpm 以 gear_id 为下标:
+    gear_id 档升档看 shift_up_rpm[gear_id]，降档看 shift_down_rpm[gear_id - 1]。
+    predictive=True 时按 dRPM/dt × 学习到的换挡延迟提前触发。
+    """
+
+    def __init__(self, predictive=False, initial_latency=0.08):
+        self.predictive = predictive
+        self.rpm_rate = RpmRateEstimator()
+        self.shift_latency = ShiftLatencyEstimator(initial_latency)
+        self._last_gear = None
+        self.last_shift_up_time = 0
+        self.last_shift_down_time = 0
+        self.previous_countdown = 0
+        self.countdown_just_ended = False
+        self.countdown_end_time = 0
+
+    def update_countdown(self, countdown, current_time):
+        """检测倒计时是否刚结束(从>0变为<=0)，开启起步辅助并重置冷却"""
+        if self.previous_countdown > 0 and countdown <= 0:
+            self.countdown_just_ended = True
+            self.countdown_end_time = current_time
+            # 重置换档冷却时间,避免起步时被冷却阻挡
+            self.last_shift_up_time = 0
+            self.last_shift_down_time = 0
+        self.previous_countdown = countdown
+
+    def observe(self, gear_id, rpm, current_time):
+        """每帧调用: 更新转速缓冲区并检测按键后的档位变化(学习换挡延迟)"""
+        if gear_id != self._last_gear:
+            # 换挡瞬间转速跳变，不能参与斜率估算
+            self.rpm_rate.reset()
+            self._last_gear = gear_id
+        self.rpm_rate.add(current_time, rpm)
+        self.shift_latency.observe(gear_id, current_time)
+
+    def predicted_rpm(self, rpm):
+        """预测换挡真正生效时的转速，返回 (升档判定用, 降档判定用)"""
+        if not self.predictive:
+            return rpm, rpm
+        delta = self.rpm_rate.rate() * self.shift_latency.latency
+        delta = max(-MAX_PREDICT_RPM, min(MAX_PREDICT_RPM, delta))
+        return rpm + max(0.0, delta), rpm + min(0.0, delta)
+
+    def in_grace_period(self, current_time):
+        return self.countdown_just_ended and (current_time - self.countdown_end_time) <= COUNTDOWN_END_GRACE_PERIOD
+
+    def can_shift(self, gear_id, car_speed, countdown, current_time):
+        """倒计时中、倒档、倒车时不自动换挡"""
+        in_forward_or_neutral = 0 <= gear_id <= 6
+        # 起步辅助期间:忽略倒车检测,因为起步时speed可能读取到轻微负值(后溜/读取误差)
+        not_reversing = car_speed >= 0 or self.in_grace_period(current_time)
+        return in_forward_or_neutral and not_reversing and countdown <= 0
+
+    def n_to_1_threshold(self, current_time):
+        return N_TO_1_GRACE_RPM if self.in_grace_period(current_time) else N_TO_1_RPM
+
+    def wanted_shift(self, gear_id, rpm, shift_up_rpm, shift_down_rpm, current_time):
+        """只按转速判断应升/降档(不考虑冷却)"""
+        if gear_id == 0 and rpm >= self.n_to_1_threshold(current_time):
+            return SHIFT_UP
+        up_rpm, down_rpm = self.predicted_rpm(rpm)
+        if 1 <= gear_id < len(shift_up_rpm) and up_rpm >= shift_up_rpm[gear_id]:
+            return SHIFT_UP
+        # 禁止1档降到空档，避免比赛过程中误入空档
+        if 1 < gear_id <= len(shift_down_rpm) and down_rpm <= shift_down_rpm[gear_id - 1]:
+            return SHIFT_DOWN
+        return None
+
+    def cooling_down(self, direction, current_time, shift_up_cooldown, shift_down_cooldown):
+        if direction == SHIFT_UP:
+            return (current_time - self.last_shift_up_time) < shift_up_cooldown
+        return (current_time - self.last_shift_down_time) < shift_down_cooldown
+
+    def decide(self, current_time, gear_id, rpm, clutch, shift_up_rpm, shift_down_rpm,
+               shift_up_cooldown, shift_down_cooldown):
+        """返回 SHIFT_UP / SHIFT_DOWN / None；调用前需先确认 can_shift()"""
+        if clutch >= MAX_SHIFT_CLUTCH:
+            return None
+        direction = self.wanted_shift(gear_id, rpm, shift_up_rpm, shift_down_rpm, current_time)
+        if direction and self.cooling_down(direction, current_time, shift_up_cooldown, shift_down_cooldown):
+            return None
+        return direction
+
+    def commit(self, direction, gear_id, current_time):
+        """按键成功后记录换挡时间"""
+        self.shift_latency.on_press(direction, gear_id, current_time)
+        if direction == SHIFT_UP:
+            self.last_shift_up_time = current_time
+            # 挂上1档后,清除宽限期标志,避免立即跳2档
+            if gear_id == 0 and self.in_grace_period(current_time):
+                self.countdown_just_ended = False
+        elif direction == SHIFT_DOWN:
+            self.last_shift_down_time = current_time
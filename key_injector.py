@@ -0,0 +1,128 @@
+"""
+Key Injector - 异步按键注入
+Owns a queue and a worker thread that performs key presses through a swappable backend, so callers
+(ShiftWorker, ...) never block on the press itself. Duplicate requests still waiting in the queue are
+coalesced and requests conflicting with a recent/pending press are refused.
+
+Backends: PyDirectInputBackend (Windows, game input) and RecordingBackend (any platform, records
+presses in memory for tests and dry runs).
+"""
+import time
+import threading
+from collections import deque
+
+from latency_stats import LatencyHistogram
+
+ACCEPTED = 'accepted'
+COALESCED = 'coalesced'   # 同一按键已在队列中，合并为一次
+REFUSED = 'refused'       # 与冲突按键(如升/降档)在窗口期内相撞，拒绝
+
+
+class PyDirectInputBackend:
+    """通过 pydirectinput 发送 DirectInput 扫描码
+
+    pydirectinput.press() 在按下/松开后各有默认 PAUSE(0.1s)；这里用 _pause=False 并自行保持
+    hold 秒，使一次按键只占用注入线程约 hold 秒。
+    """
+
+    def __init__(self, hold=0.04):
+        import pydirectinput
+        self._pdi = pydirectinput
+        self.hold = hold
+
+    def press(self, key):
+        self._pdi.keyDown(key, _pause=False)
+        try:
+            time.sleep(self.hold)
+        finally:
+            self._pdi.keyUp(key, _pause=False)
+
+
+class RecordingBackend:
+    """不发送任何按键，只记录 (perf_counter 时间, key)；可模拟按键耗时"""
+
+    def __init__(self, press_duration=0.0):
+        self.press_duration = press_duration
+        self.presses = []
+
+    def press(self, key):
+        if self.press_duration:
+            time.sleep(self.press_duration)
+        self.presses.append((time.perf_counter(), key))
+
+
+class KeyInjector:
+    """单线程按键执行器: submit() 立即返回，按键在后台线程按提交顺序执行"""
+
+    def __init__(self, backend, debug=False):
+        self.backend = backend
+        self.debug = debug
+        self._queue = deque()  # (key, submit_ns)
+        self._cond = threading.Condition()
+        self._last_press = {}  # key -> 最近一次执行的 perf_counter
+        self._running = False
+        self.queue_delay = LatencyHistogram("submit->keypress")
+        self.press_duration = LatencyHistogram("keypress duration")
+        self.coalesced = 0
+        self.refused = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        threading.Thread(target=self._run, name="KeyInjector", daemon=True).start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def submit(self, key, conflicts_with=(), window=0.0):
+        """提交一次按键，返回 ACCEPTED / COALESCED / REFUSED
+
+        conflicts_with 中的按键若仍在队列中、或在 window 秒内刚执行过，则拒绝本次请求。
+        """
+        now = time.perf_counter()
+        with self._cond:
+            pending = [k for k, _ in self._queue]
+            for other in conflicts_with:
+                if other in pending or now - self._last_press.get(other, float('-inf')) < window:
+                    self.refused += 1
+                    return REFUSED
+            if key in pending:
+                self.coalesced += 1
+                return COALESCED
+            self._queue.append((key, time.perf_counter_ns()))
+            self._cond.notify()
+        return ACCEPTED
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        return [self.queue_delay.summary(), self.press_duration.summary(),
+                f"coalesced={self.coalesced} refused={self.refused}"]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # 执行期间按键保持在队列头部，使 submit() 能把重复请求合并进来
+                key, submit_ns = self._queue[0]
+            start_ns = time.perf_counter_ns()
+            self.queue_delay.record_ns(start_ns - submit_ns)
+            try:
+                self.backend.press(key)
+            except Exception as e:
+                print(f"[KeyInjector] press '{key}' failed: {e}")
+            end_ns = time.perf_counter_ns()
+            self.press_duration.record_ns(end_ns - start_ns)
+            with self._cond:
+                self._queue.popleft()
+                self._last_press[key] = end_ns / 1e9
+            if self.debug:
+                print(f"[KeyInjector] '{key}' pressed {(start_ns - submit_ns) / 1000:.0f}us after submit")
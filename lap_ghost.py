@@ -0,0 +1,179 @@
+"""
+Lap Ghost - 按赛道位置索引的最佳圈参考
+Stores the best lap per track and car as the lap time (ms) at each of GHOST_BUCKETS equal steps of
+normalised track position (0-1), so the live delta to the reference is a single array index. The
+current lap is traced into the same grid (gaps between samples are interpolated); a completed lap
+that started at the line, never entered the pits and beats the reference replaces it. Reference
+files are written by a background thread that batches pending writes, the telemetry loop only
+hands over a copy.
+"""
+import os
+import re
+import json
+import time
+import threading
+from array import array
+
+GHOST_BUCKETS = 4096
+UNSET = -1
+START_WINDOW = 0.02      # 圈开始时的位置需小于该值(从起点线开始，排除出站圈)
+WRITE_DELAY = 1.0        # 写入合并: 第一个待写入项出现后等待该时间再统一写盘
+
+
+def ghost_path(directory, track, car_model):
+    """每个 赛道/车辆 组合一个文件"""
+    name = re.sub(r'[^\w.-]+', '_', f"{track}__{car_model}")
+    return os.path.join(directory, f"{name}.json")
+
+
+class GhostWriter:
+    """后台写盘线程: 同一路径只保留最新内容，每 WRITE_DELAY 秒批量写一次"""
+
+    def __init__(self, delay=WRITE_DELAY):
+        self.delay = delay
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def submit(self, path, payload):
+        with self._lock:
+            self._pending[path] = payload
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="GhostWriter", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.delay)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for path, payload in pending.items():
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                temp = path + '.tmp'
+                with open(temp, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, separators=(',', ':'))
+                os.replace(temp, path)  # 写完再改名，崩溃时不会留下半个文件
+            except OSError as e:
+                print(f"[Ghost] failed to save {path}: {e}")
+
+
+class LapGhost:
+    """update() 按 graphics 采样调用 (赛道位置 0-1, 当前圈用时 ms, 完成圈数, 上一圈用时 ms, 是否在维修区)；
+    delta_ms 为当前圈相对参考圈的时间差(正 = 落后)，没有参考圈时为 None"""
+
+    def __init__(self, directory, buckets=GHOST_BUCKETS, writer=None):
+        self.directory = directory
+        self.buckets = buckets
+        self.writer = writer or GhostWriter()
+        self.path = None
+        self.best = None        # 参考圈: array('i')，每格为到达该位置时的圈内用时 ms
+        self.best_lap_ms = 0
+        self.delta_ms = None
+        self._reset_lap()
+        self._laps = None
+        self._seen_last_lap_ms = 0
+
+    def _reset_lap(self):
+        self.trace = array('i', [UNSET]) * self.buckets
+        self._last_bucket = None
+        self._last_ms = 0
+        self._lap_valid = False
+        self._finished = None   # 已完成、等待 iLastTime 更新的一圈
+        self._finished_last_ms = None  # 完成时之前的 iLastTime; 变化后即为这一圈的用时
+
+    def start_session(self, track, car_model):
+        """车辆/赛道确定后调用一次: 读取该组合的参考圈(文件很小，只在会话开始时读取)"""
+        self.path = ghost_path(self.directory, track, car_model)
+        self.best, self.best_lap_ms, self.delta_ms = None, 0, None
+        self._reset_lap()
+        self._laps = None
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if len(data['times']) == self.buckets:
+                self.best = array('i', data['times'])
+                self.best_lap_ms = data['lap_ms']
+                print(f"[Ghost] reference lap {self.best_lap_ms / 1000:.3f}s for {car_model} @ {track}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[Ghost] ignoring unreadable reference {self.path}: {e}")
+
+    def end_session(self):
+        self.path = None
+        self.best, self.delta_ms = None, None
+        self._reset_lap()
+        self._laps = None
+
+    def update(self, position, current_ms, completed_laps, last_lap_ms, in_pit):
+        """记录当前圈并更新 delta_ms"""
+        if self.path is None:
+            return None
+        if self._laps is None:
+            self._laps = completed_laps
+        elif completed_laps != self._laps:
+            if completed_laps == self._laps + 1 and self._lap_valid:
+                self._finished, self._finished_last_ms = self.trace, self._seen_last_lap_ms
+            else:
+                self._finished = None
+            self._laps = completed_laps
+            self.trace = array('i', [UNSET]) * self.buckets
+            self._last_bucket = None
+        # 上一圈用时可能与圈数同时更新，也可能晚几次采样
+        self._seen_last_lap_ms = last_lap_ms
+        if self._finished is not None and last_lap_ms != self._finished_last_ms and last_lap_ms > 0:
+            self._commit(self._finished, last_lap_ms)
+            self._finished = None
+
+        bucket = min(self.buckets - 1, max(0, int(position * self.buckets)))
+        if self._last_bucket is None:
+            self._lap_valid = position < START_WINDOW and not in_pit
+            if self._lap_valid:
+                # 圈从起点线开始: 位置 0 处用时为 0，之前的格子由下面的插值补齐
+                self.trace[0] = 0
+                self._last_bucket, self._last_ms = 0, 0
+            else:
+                self.trace[bucket] = current_ms
+        last = self._last_bucket
+        if last is not None and bucket > last:
+            # 两次采样之间跨过的格子按线性插值填充
+            span = bucket - last
+            step = (current_ms - self._last_ms) / span
+            for i in range(1, span + 1):
+                self.trace[last + i] = int(self._last_ms + step * i)
+        elif last is not None and bucket < last:
+            return self.delta_ms  # 倒车或位置抖动: 保持上次结果
+        if in_pit:
+            self._lap_valid = False
+        self._last_bucket, self._last_ms = bucket, current_ms
+
+        reference = self.best[bucket] if self.best is not None else UNSET
+        self.delta_ms = current_ms - reference if reference != UNSET else None
+        return self.delta_ms
+
+    def _commit(self, trace, lap_ms):
+        """一圈结束: 补齐终点前的格子，比参考圈快时替换并交给写盘线程"""
+        if self.best is not None and lap_ms >= self.best_lap_ms:
+            return
+        last = max((i for i in range(self.buckets) if trace[i] != UNSET), default=None)
+        if last is None:
+            return
+        span = self.buckets - last
+        step = (lap_ms - trace[last]) / span
+        for i in range(1, span):
+            trace[last + i] = int(trace[last] + step * i)
+        if UNSET in trace:
+            return  # 中途有未覆盖的位置(如重新开始)，不作为参考
+        previous = self.best_lap_ms
+        self.best, self.best_lap_ms = trace, lap_ms
+        print(f"[Ghost] new reference lap {lap_ms / 1000:.3f}s"
+              + (f" ({(lap_ms - previous) / 1000:+.3f}s)" if previous else ""))
+        self.writer.submit(self.path, {'lap_ms': lap_ms, 'buckets': self.buckets, 'times': trace.tolist()})
@@ -0,0 +1,355 @@
+"""
+Telemetry -> Controller Latency Probe - 端到端延迟探针
+Runs the adapters against a synthetic telemetry source and a local stand-in for DSX (a UDP server in
+a separate process that parses every packet and timestamps its receipt), entirely on Linux without
+the game, DSX or a controller.
+
+events: 在合成遥测中让车轮抱死越过阈值，测量"内存中越过阈值" -> "DSX 收到非 Normal 扳机指令"
+        (engage) 以及恢复抓地 -> 收到 Normal (release) 的延迟。RBR 使用与主循环相同的读取/效果/
+        序列化函数并按 100Hz 节拍运行；AC 直接运行 Adaptive_Trigger_AC.main_telemetry_loop()(控制台模式)。
+soak:   以 RBR 流水线连续发送大量 tick，每个包附带序号与写入时间(type=0 的 Invalid 指令，DSX 会忽略)，
+        统计丢包、乱序、重复与延迟分位数。
+
+用法示例:
+    python latency_probe.py events --adapter both --events 200
+    python latency_probe.py soak --ticks 2000000
+    python latency_probe.py soak --ticks 360000 --rate 100
+
+perf_counter_ns() 在 Linux 上是系统级单调时钟，两个进程的时间戳可以直接相减。
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import configparser
+import multiprocessing
+from array import array
+from bisect import bisect_left
+
+from latency_stats import LatencyHistogram
+
+PROBE_TYPE = 0          # Instruction type Invalid: 携带 [seq, 写入时间ns]
+LEFT_TRIGGER = 1
+NORMAL_MODE = 0
+RECV_BUFFER = 8 << 20   # 压测时避免接收缓冲溢出被误计为丢包
+RESULT_COLUMNS = ('recv_ns', 'left_mode', 'seq', 'sent_ns')
+
+
+###################################################################################
+# DSX stand-in (独立进程，避免与发送端争用 GIL)
+###################################################################################
+
+def _serve(conn, stop):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(0.2)
+    conn.send(sock.getsockname()[1])
+    columns = {name: array('q') for name in RESULT_COLUMNS}
+    recv_ns, left_mode, seq, sent_ns = (columns[name] for name in RESULT_COLUMNS)
+    malformed = 0
+    while not stop.is_set():
+        try:
+            payload = sock.recv(65536)
+        except socket.timeout:
+            continue
+        now = time.perf_counter_ns()
+        try:
+            instructions = json.loads(payload)['instructions']
+        except (ValueError, KeyError, TypeError):
+            malformed += 1
+            continue
+        left, probe = -1, (-1, 0)
+        for instruction in instructions:
+            params = instruction['parameters']
+            if instruction['type'] == 1 and params[1] == LEFT_TRIGGER:
+                left = params[2]
+            elif instruction['type'] == PROBE_TYPE:
+                probe = params
+        recv_ns.append(now)
+        left_mode.append(left)
+        seq.append(probe[0])
+        sent_ns.append(probe[1])
+    sock.close()
+    conn.send(malformed)
+    for name in RESULT_COLUMNS:
+        conn.send_bytes(columns[name].tobytes())
+
+
+class DSXStandIn:
+    """本地 DSX 替身: start() 返回 UDP 端口，stop() 返回 {列名: array('q')} 与格式错误包数"""
+
+    def __init__(self):
+        self._stop = multiprocessing.Event()
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child, self._stop), daemon=True)
+
+    def start(self):
+        self._process.start()
+        return self._conn.recv()
+
+    def stop(self, drain=0.3):
+        time.sleep(drain)  # 等待最后的包被接收
+        self._stop.set()
+        malformed = self._conn.recv()
+        columns = {}
+        for name in RESULT_COLUMNS:
+            columns[name] = array('q')
+            columns[name].frombytes(self._conn.recv_bytes())
+        self._process.join()
+        return columns, malformed
+
+
+###################################################################################
+# Synthetic telemetry sources
+###################################################################################
+
+class SyntheticRBRMemory:
+    """提供 read_rbr_frame() 使用的 MemoryReader 接口(read_int/read_float/read_byte/base_address)
+
+    指针链与偏移与 Read_RBRData.cs 一致；车辆以 72km/h 行驶并踩 80% 刹车，set_lock() 改变四轮转速。
+    """
+    CAR, CONTROL, MOTION, WHEELS = 0x100000, 0x200000, 0x300000, 0x500000
+
+    def __init__(self, speed=20.0, brake=0.8, rpm=5500.0):
+        self.base_address = 0x400000
+        self.speed = speed
+        self.values = {
+            23460968: self.CAR, 8301640: self.CONTROL, 9369184: self.MOTION,
+            self.base_address + 4796472: 0x600000, 0x600000 + 1032: 0x700000, 0x700000 + 64: self.WHEELS,
+            self.CONTROL + 1848 - 16: 1,                 # game state: in race
+            self.CAR + 16: rpm, self.CAR + 0x170: 4,      # rpm, gear 3
+            self.MOTION + 448: speed,                     # x_speed (m/s)
+            self.CONTROL + 1848 + 100: brake,             # brake 0-1
+        }
+        self.set_lock(0.0)
+
+    def set_lock(self, lock):
+        """lock: 车轮转速低于车速的比例(0.2 = 抱死 20%)"""
+        wheel = self.speed * (1.0 - lock)
+        for offset in (988, 1676, 2364, 3052):
+            self.values[self.WHEELS + offset] = wheel
+
+    def read_int(self, address):
+        return self.values.get(address, 0)
+
+    read_float = read_byte = read_int
+
+
+def make_synthetic_ac_reader(ac):
+    """返回替代 ACSharedMemoryReader 的合成数据源(需要已导入的 Adaptive_Trigger_AC 模块)"""
+
+    class SyntheticACReader(ac.ACSharedMemoryReader):
+        """只替换数据来源；packetId 去重等逻辑沿用真实读取器"""
+
+        def __init__(self):
+            super().__init__()
+            self.physics = ac.ACPhysics()
+            self.physics.speedKmh = 100.0
+            self.physics.brake = 0.8
+            self.physics.rpms = 6000
+            self.static = ac.ACStaticInfo()
+            self.static.maxRpm = 8000
+
+        def set_lock(self, lock):
+            for i in range(4):
+                self.physics.wheelSlip[i] = lock * 5.0  # AC 的 wheelSlip 不是百分比，0.2 -> 1.0 远超默认阈值
+
+        def read_physics(self):
+            self.physics.packetId += 1
+            return ac.ACPhysics.from_buffer_copy(self.physics)
+
+        def read_static(self):
+            return self.static
+
+        def close(self):
+            pass
+
+    return SyntheticACReader()
+
+
+###################################################################################
+# Adapters under test
+###################################################################################
+
+def load_rbr_config(path):
+    from rbr_config import load_runtime_config
+    config = configparser.ConfigParser()
+    if path and os.path.exists(path):
+        config.read(path, encoding='utf-8')
+    return load_runtime_config(config)
+
+
+def rbr_tick(rbr, source, cfg, sock, address, probe=None):
+    """与 Adaptive_Trigger_RBR.main() 每个 tick 相同的 读取 -> 效果 -> 序列化 -> 发送 路径"""
+    inputs = source.read_frame()
+    packet = rbr.Packet(rbr.build_slip_triggers(cfg.brake_trigger, cfg.throttle_trigger, inputs))
+    packet.instructions.append(rbr.build_led_instruction(inputs.rpm, True))
+    if probe is not None:
+        packet.instructions.append(rbr.Instruction(rbr.InstructionType.Invalid, probe))
+    sock.sendto(rbr.encode_packet(packet), address)
+
+
+def start_rbr(port, args):
+    """在后台线程以 100Hz 运行 RBR 流水线，返回 (set_lock, stop)"""
+    import Adaptive_Trigger_RBR as rbr
+    memory = SyntheticRBRMemory()
+    source = rbr.RBRSource(memory)
+    cfg = load_rbr_config(args.config)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    running = threading.Event()
+    running.set()
+
+    def loop():
+        while running.is_set():
+            tick_start = time.time()
+            rbr_tick(rbr, source, cfg, sock, ('127.0.0.1', port))
+            time.sleep(max(0, rbr.TICK_INTERVAL - (time.time() - tick_start)))
+
+    threading.Thread(target=loop, name="RBRProbe", daemon=True).start()
+    return memory.set_lock, running.clear
+
+
+def start_ac(port, args):
+    """以控制台模式运行 AC 的 main_telemetry_loop()，数据源与 DSX 地址替换为合成/本地替身"""
+    import Adaptive_Trigger_AC as ac
+    reader = make_synthetic_ac_reader(ac)
+    running = [True]
+    ac.ACSharedMemoryReader = lambda *args: reader
+    ac.find_game_process = lambda: (os.getpid(), "Latency probe") if running[0] else (None, None)
+    ac.game_process_alive = lambda pid: running[0]   # 返回 False 后会话结束，循环进入 1s 等待，相当于停止
+    ac.DSX_IP, ac.DSX_PORT = '127.0.0.1', port
+    threading.Thread(target=ac.main_telemetry_loop, name="ACProbe", daemon=True).start()
+    return reader.set_lock, lambda: running.__setitem__(0, False)
+
+
+ADAPTERS = {'rbr': start_rbr, 'ac': start_ac}
+
+
+###################################################################################
+# Measurements
+###################################################################################
+
+def _first_after(recv_ns, left_mode, t_ns, engaged):
+    """t_ns 之后第一个扳机状态符合的包的接收时间；没有则返回 None"""
+    for i in range(bisect_left(recv_ns, t_ns), len(recv_ns)):
+        mode = left_mode[i]
+        if mode >= 0 and (mode != NORMAL_MODE) == engaged:
+            return recv_ns[i]
+    return None
+
+
+def run_events(adapter, args):
+    standin = DSXStandIn()
+    port = standin.start()
+    set_lock, stop = ADAPTERS[adapter](port, args)
+    time.sleep(0.5)  # 等待适配器稳定发送
+    edges = []  # (perf_counter_ns, engaged)
+    for _ in range(args.events):
+        for engaged in (True, False):
+            time.sleep(args.hold * (1 + random.random()))  # 随机相位，不与 tick 对齐
+            set_lock(args.lock if engaged else 0.0)
+            edges.append((time.perf_counter_ns(), engaged))
+    time.sleep(args.hold)
+    stop()
+    columns, malformed = standin.stop()
+
+    engage, release = LatencyHistogram(f"{adapter} engage"), LatencyHistogram(f"{adapter} release")
+    missed = 0
+    for t_ns, engaged in edges:
+        received = _first_after(columns['recv_ns'], columns['left_mode'], t_ns, engaged)
+        if received is None:
+            missed += 1
+        else:
+            (engage if engaged else release).record_ns(received - t_ns)
+    print(f"[{adapter}] {len(columns['recv_ns'])} packets received, {malformed} malformed, "
+          f"{missed}/{len(edges)} edges without a matching packet")
+    print("  " + engage.summary())
+    print("  " + release.summary())
+    return missed == 0
+
+
+def run_soak(args):
+    import Adaptive_Trigger_RBR as rbr
+    standin = DSXStandIn()
+    address = ('127.0.0.1', standin.start())
+    memory = SyntheticRBRMemory()
+    source = rbr.RBRSource(memory)
+    cfg = load_rbr_config(args.config)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    period = 1.0 / args.rate if args.rate else 0.0
+    send_errors = 0
+
+    start = time.perf_counter()
+    next_tick = start
+    for seq in range(args.ticks):
+        memory.set_lock(args.lock if (seq // 50) % 2 else 0.0)  # 每 0.5s(100Hz) 切换抱死/正常
+        try:
+            rbr_tick(rbr, source, cfg, sock, address, probe=[seq, time.perf_counter_ns()])
+        except OSError:
+            send_errors += 1
+        if period:
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if args.progress and seq and seq % args.progress == 0:
+            print(f"  {seq} ticks, {seq / (time.perf_counter() - start):.0f} ticks/s")
+    elapsed = time.perf_counter() - start
+    columns, malformed = standin.stop()
+
+    latency = LatencyHistogram("soak send->receive")
+    seen = bytearray(args.ticks)
+    duplicates = reordered = 0
+    highest = -1
+    for seq, sent_ns, recv_ns in zip(columns['seq'], columns['sent_ns'], columns['recv_ns']):
+        if seq < 0 or seq >= args.ticks:
+            continue
+        if seen[seq]:
+            duplicates += 1
+            continue
+        seen[seq] = 1
+        if seq < highest:
+            reordered += 1
+        highest = max(highest, seq)
+        latency.record_ns(recv_ns - sent_ns)
+    received = sum(seen)
+    dropped = args.ticks - received
+    print(f"[soak] {args.ticks} ticks in {elapsed:.1f}s ({args.ticks / elapsed:.0f} ticks/s), "
+          f"received={received} dropped={dropped} ({dropped / args.ticks * 100:.4f}%) "
+          f"reordered={reordered} duplicates={duplicates} malformed={malformed} send_errors={send_errors}")
+    print("  " + latency.summary())
+    return dropped <= args.max_drop_ratio * args.ticks and reordered == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure telemetry-to-DSX latency against a local DSX stand-in")
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'),
+                        help="RBR config.ini (defaults are used if it does not exist)")
+    parser.add_argument('--lock', type=float, default=0.2, help="Wheel lock ratio used to cross the slip threshold")
+    commands = parser.add_subparsers(dest='command', required=True)
+    events = commands.add_parser('events', help="Threshold-crossing to trigger-instruction latency")
+    events.add_argument('--adapter', choices=('rbr', 'ac', 'both'), default='both')
+    events.add_argument('--events', type=int, default=100, help="Lock/release cycles per adapter")
+    events.add_argument('--hold', type=float, default=0.05, help="Minimum seconds between edges")
+    soak = commands.add_parser('soak', help="Long run with per-packet sequence numbers")
+    soak.add_argument('--ticks', type=int, default=1_000_000)
+    soak.add_argument('--rate', type=float, default=0, help="Ticks per second (0 = as fast as possible)")
+    soak.add_argument('--max-drop-ratio', type=float, default=0.0, help="Exit non-zero above this drop ratio")
+    soak.add_argument('--progress', type=int, default=0, help="Print progress every N ticks")
+    args = parser.parse_args(argv)
+
+    if args.command == 'soak':
+        ok = run_soak(args)
+    else:
+        adapters = ('rbr', 'ac') if args.adapter == 'both' else (args.adapter,)
+        ok = all([run_events(adapter, args) for adapter in adapters])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Latency Histogram - 延迟直方图
+Fixed log-spaced buckets fed with perf_counter_ns() deltas; cheap enough to record from the
+hot loops (one bisect + increment) and summarised as p50/p95/p99 for debug output.
+"""
+import bisect
+
+# 桶上界(微秒): 1us ~ 1s，按 1-2-5 递增，最后一个桶收纳所有更大的值
+BUCKET_BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000,
+                    10000, 20000, 50000, 100000, 200000, 500000, 1000000)
+BUCKET_BOUNDS_NS = tuple(b * 1000 for b in BUCKET_BOUNDS_US)  # record_ns 直接比较整数，不产生临时 float
+
+
+class LatencyHistogram:
+    """单写者直方图: 写入线程只做整数自增，其他线程读取时可能差一两个样本，不加锁"""
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_US) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record_ns(self, ns):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_NS, ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile_us(self, p):
+        """返回第 p 百分位所在桶的上界(微秒)，不超过观测到的最大值"""
+        if self.count == 0:
+            return 0
+        target = self.count * p / 100
+        max_us = self.max_ns / 1000
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return min(BUCKET_BOUNDS_US[i], max_us) if i < len(BUCKET_BOUNDS_US) else max_us
+        return max_us
+
+    def summary(self):
+        if self.count == 0:
+            return f"{self.name}: no samples"
+        mean_us = self.total_ns / self.count / 1000
+        return (f"{self.name}: n={self.count} mean={mean_us:.0f}us p50<={self.percentile_us(50):.0f}us "
+                f"p95<={self.percentile_us(95):.0f}us p99<={self.percentile_us(99):.0f}us max={self.max_ns / 1000:.0f}us")
@@ -0,0 +1,119 @@
+"""
+Metrics Server - 本地监控端点
+Optional HTTP server bound to 127.0.0.1 that exposes the adapter's health for another screen or a
+Prometheus scraper: GET /metrics (Prometheus text format) or GET /metrics.json (compact JSON).
+
+The telemetry loop only increments plain integer attributes on LoopMetrics; the server thread builds
+a snapshot by reading them when a request arrives, so the hot loop never takes a lock.
+"""
+import json
+import time
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+# 主循环计数器名(均为单调递增，Prometheus 中以 _total 结尾)
+LOOP_COUNTERS = ('ticks', 'overruns', 'read_failures', 'reconnects',
+                 'packets_sent', 'packets_suppressed', 'send_errors')
+
+
+class LoopMetrics:
+    """主循环计数器: 只由主循环线程自增，其他线程只读，不加锁"""
+
+    def __init__(self):
+        for name in LOOP_COUNTERS:
+            setattr(self, name, 0)
+        self.started = time.time()
+
+    def counters(self):
+        return {name: getattr(self, name) for name in LOOP_COUNTERS}
+
+
+class TickRate:
+    """由相邻两次快照(间隔至少 0.5s)的 ticks 差值计算 tick 频率(Hz)；首次为启动以来的平均值"""
+
+    def __init__(self, started):
+        self._last = (started, 0)
+        self.rate = 0.0
+
+    def update(self, ticks, now=None):
+        now = time.time() if now is None else now
+        if now - self._last[0] >= 0.5:
+            self.rate = (ticks - self._last[1]) / (now - self._last[0])
+            self._last = (now, ticks)
+        return self.rate
+
+
+def prometheus_text(snapshot, prefix):
+    """snapshot: {'counters': {名: 值}, 'gauges': {名: 值}, 'stages': {阶段: {p50/p95/p99/count}}}"""
+    lines = []
+    for name, value in snapshot.get('counters', {}).items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    for name, value in snapshot.get('gauges', {}).items():
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {value:g}" if isinstance(value, float) else f"{prefix}_{name} {value}")
+    stages = snapshot.get('stages', {})
+    if stages:
+        metric = f"{prefix}_stage_latency_microseconds"
+        lines.append(f"# TYPE {metric} summary")
+        for stage, values in stages.items():
+            for key, quantile in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+                lines.append(f'{metric}{{stage="{stage}",quantile="{quantile}"}} {values[key]:g}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {values["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def histogram_quantiles(histogram):
+    return {'p50': histogram.percentile_us(50), 'p95': histogram.percentile_us(95),
+            'p99': histogram.percentile_us(99), 'count': histogram.count}
+
+
+class MetricsServer:
+    """snapshot: 无参函数，返回 prometheus_text() 所用的字典；在服务线程中调用"""
+
+    def __init__(self, port, snapshot, prefix='adapter'):
+        self.port = port
+        self.snapshot = snapshot
+        self.prefix = prefix
+        self._server = None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path not in ('/metrics', '/metrics.json'):
+                    self.send_error(404)
+                    return
+                try:
+                    data = server.snapshot()
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                if path == '/metrics.json':
+                    body = json.dumps(data, separators=(',', ':')).encode()
+                    content_type = 'application/json'
+                else:
+                    body = prometheus_text(data, server.prefix).encode()
+                    content_type = 'text/plain; version=0.0.4'
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不在控制台打印每次请求
+
+        # 单线程 HTTPServer: 请求依次处理，快照函数无需考虑并发
+        self._server = HTTPServer(('127.0.0.1', self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+        return self.port
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
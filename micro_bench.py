@@ -0,0 +1,251 @@
+"""
+Micro-benchmarks - 热点函数基准测试
+Times the per-tick hot functions of both adapters without the game (Linux is fine) and compares
+them with a JSON baseline; any benchmark slower than baseline * (1 + tolerance) fails the run.
+
+用法示例:
+    python micro_bench.py                    # 与 bench_baseline.json 比较(不存在时创建)
+    python micro_bench.py --update           # 重新记录基线
+    python micro_bench.py --only packet --tolerance 0.5
+
+基线与机器/解释器相关；在哪台机器上比较，就在哪台机器上记录基线。
+"""
+import os
+import sys
+import json
+import time
+import types
+import timeit
+import platform
+import argparse
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+DEFAULT_TOLERANCE = 0.25
+REPEAT = 5
+
+
+class Skip(Exception):
+    """基准依赖的模块不可用(如未安装 matplotlib)"""
+
+
+###################################################################################
+# Benchmarks: 每个函数完成准备工作并返回被计时的无参函数
+###################################################################################
+
+def _rbr():
+    import Adaptive_Trigger_RBR as rbr
+    return rbr
+
+
+def _ac():
+    import Adaptive_Trigger_AC as ac
+    return ac
+
+
+def _rbr_cfg():
+    import configparser
+    from rbr_config import load_runtime_config
+    return load_runtime_config(configparser.ConfigParser())
+
+
+def _slipping_frame(rbr):
+    frame = rbr.RBRFrame()
+    frame.ground_speed = 25.0                       # m/s
+    frame.wheel_speed_fl = frame.wheel_speed_fr = 72.0  # km/h, 前轮抱死 20%
+    frame.wheel_speed_rl = frame.wheel_speed_rr = 85.0
+    frame.brake, frame.throttle, frame.rpm = 80.0, 0.0, 6200.0
+    return frame
+
+
+def bench_packet_serialise_rbr():
+    rbr = _rbr()
+    from adapter_core import Trigger, TriggerMode
+    packet = rbr.Packet([
+        rbr.Instruction(rbr.InstructionType.TriggerUpdate, [0, Trigger.Left, 23, 0, 6, 45]),
+        rbr.Instruction(rbr.InstructionType.TriggerUpdate, [0, Trigger.Right, TriggerMode.Normal, 0, 0, 0]),
+        rbr.Instruction(rbr.InstructionType.RGBUpdate, [0, 255, 128, 0]),
+        rbr.Instruction(rbr.InstructionType.EditAudio, ['haptics/rumble_mid_4c.wav', rbr.AudioEditType.Volume, 0.4]),
+    ])
+    return lambda: rbr.encode_packet(packet)
+
+
+def bench_packet_serialise_ac():
+    ac = _ac()
+    from adapter_core import Trigger
+    packet = ac.Packet([
+        ac.Instruction(ac.InstructionType.TriggerUpdate.value, [0, Trigger.Left.value, 21, 1, 5, 0]),
+        ac.Instruction(ac.InstructionType.TriggerUpdate.value, [0, Trigger.Left.value, 23, 0, 5, 60]),
+        ac.Instruction(ac.InstructionType.TriggerUpdate.value, [0, Trigger.Right.value, 0, 0, 0, 0]),
+        ac.Instruction(ac.InstructionType.RGBUpdate.value, [0, 255, 128, 0]),
+    ])
+    from adapter_core import encode_packet  # send_to_dsx() 的序列化部分(DSXClient.send)
+    return lambda: encode_packet(packet)
+
+
+def bench_slip_and_trigger_maths():
+    rbr = _rbr()
+    frame, cfg = _slipping_frame(rbr), _rbr_cfg()
+    source = rbr.RBRSource()
+    source.frame = frame
+    return lambda: rbr.build_slip_triggers(cfg.brake_trigger, cfg.throttle_trigger, source.inputs())
+
+
+def bench_led_mapping():
+    rbr = _rbr()
+    rpms = [2000 + i * 60 for i in range(100)]  # 覆盖绿/黄/红各段
+    build = rbr.build_led_instruction
+
+    def run():
+        for rpm in rpms:
+            build(rpm, True)
+    return run
+
+
+def bench_haptic_update():
+    rbr = _rbr()
+    frame, cfg = _slipping_frame(rbr), _rbr_cfg()
+    slips = rbr.compute_wheel_slips(frame)
+    haptic = rbr.HapticEffect('haptics')
+    return lambda: haptic.update(cfg, slips, 0.0)
+
+
+def bench_parse_rpm_list():
+    import configparser
+    from gear_shift import parse_rpm_list
+    config = configparser.ConfigParser()
+    config['GearShift_Rally1'] = {'shift_up_rpm': '6800, 6900, 7000, 7000, 7100, 7200'}
+    default = [6500] * 6
+    return lambda: parse_rpm_list(config, 'GearShift_Rally1', 'shift_up_rpm', default)
+
+
+def bench_calculate_time_difference():
+    rbr = _rbr()
+    best = [[d * 5.0, d * 0.2] for d in range(2000)]   # 10km 赛段, 200ms 一个点
+    current = [[d * 5.0 + 2.5, d * 0.2 + 0.05] for d in range(1500)]
+    return lambda: rbr.calculate_time_difference(current, best)
+
+
+def bench_decode_telemetry_data():
+    rbr = _rbr()
+    raw = bytes(rbr.sizeof(rbr.TelemetryData))
+    return lambda: rbr.TelemetryData.from_buffer_copy(raw)
+
+
+def bench_decode_ac_physics():
+    ac = _ac()
+    raw = bytes(ac.sizeof(ac.ACPhysics))
+    return lambda: ac.ACPhysics.from_buffer_copy(raw)
+
+
+def bench_decode_ac_graphics_fields():
+    """graphics 页: 只解包 GRAPHICS_FIELDS 中的数值字段(不复制整页，不解码 c_wchar)"""
+    ac = _ac()
+    raw = bytes(ac.sizeof(ac.ACGraphics))
+    start, _, layout = ac.GRAPHICS_LAYOUT
+    return lambda: layout.unpack_from(raw, start)
+
+
+def bench_read_rbr_frame():
+    rbr = _rbr()
+    from latency_probe import SyntheticRBRMemory
+    memory, frame = SyntheticRBRMemory(), rbr.RBRFrame()
+    return lambda: rbr.read_rbr_frame(memory, frame)
+
+
+def bench_dashboard_graph_update():
+    """TelemetryDashboard.update_vibration_graphs(): 数据转换 + set_data + 坐标轴; 画布重绘不计入"""
+    rbr = _rbr()
+    try:
+        rbr.load_gui_modules()
+    except ImportError as e:
+        raise Skip(str(e))
+    from collections import deque
+    dash = types.SimpleNamespace(start_time=time.time(), current_fl_slip=1.0, current_fr_slip=2.0,
+                                 current_rl_slip=-3.0, current_rr_slip=4.0)
+    for name in ('time_data', 'throttle_data', 'brake_data', 'slip_time_data',
+                 'fl_slip_data', 'fr_slip_data', 'rl_slip_data', 'rr_slip_data'):
+        setattr(dash, name, deque([0.0] * 1000, maxlen=1000))  # 与仪表盘相同的 1000 点窗口
+    fig = rbr.Figure()
+    dash.ax_vibration, dash.ax_slip = fig.add_subplot(211), fig.add_subplot(212)
+    dash.throttle_line, = dash.ax_vibration.plot([], [])
+    dash.brake_line, = dash.ax_vibration.plot([], [])
+    dash.fl_line, dash.fr_line, dash.rl_line, dash.rr_line = (dash.ax_slip.plot([], [])[0] for _ in range(4))
+    dash.canvas_vibration = dash.canvas_slip = types.SimpleNamespace(draw_idle=lambda: None)
+    update = rbr.TelemetryDashboard.update_vibration_graphs
+    return lambda: update(dash, 0.3, 0.6)
+
+
+BENCHMARKS = {name[len('bench_'):]: fn for name, fn in sorted(globals().items()) if name.startswith('bench_')}
+
+
+###################################################################################
+# Runner
+###################################################################################
+
+def measure(fn):
+    """返回单次调用耗时(ns): autorange 决定循环次数，取 REPEAT 轮中的最小值"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(REPEAT, number)) / number * 1e9
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'system': platform.system(), 'processor': platform.processor()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the adapters' per-tick hot functions")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--update', action='store_true', help="Record a new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown as a fraction of the baseline (0.25 = 25%%)")
+    parser.add_argument('--only', help="Run only benchmarks whose name contains this text")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.update and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != machine_info():
+            print(f"Warning: baseline was recorded on {baseline.get('machine')}, comparisons may be meaningless")
+
+    results, regressions = {}, []
+    print(f"{'benchmark':<28}{'ns/call':>12}{'baseline':>12}{'change':>9}")
+    for name, setup in BENCHMARKS.items():
+        if args.only and args.only not in name:
+            continue
+        try:
+            ns = measure(setup())
+        except Skip as e:
+            print(f"{name:<28}{'skipped':>12}  ({e})")
+            continue
+        results[name] = ns
+        reference = baseline and baseline['results'].get(name)
+        if reference:
+            change = ns / reference - 1
+            flag = "  REGRESSION" if change > args.tolerance else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<28}{ns:>12.0f}{reference:>12.0f}{change * 100:>+8.1f}%{flag}")
+        else:
+            print(f"{name:<28}{ns:>12.0f}{'-':>12}")
+
+    if baseline is None:
+        if args.only and os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                results = dict(json.load(f)['results'], **results)  # --only 只更新选中的条目
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine_info(), 'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'results': results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance * 100:.0f}%: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
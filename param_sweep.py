@@ -0,0 +1,283 @@
+"""
+RBR Adaptive Trigger Parameter Sweep - 离线扳机参数扫描工具
+Evaluates many [BrakeSlip]/[ThrottleSlip] parameter combinations against recorded
+sessions (see session_recorder.py) using NumPy broadcasting over the whole frame array.
+
+用法示例:
+    python param_sweep.py sessions/ --brake-threshold 1:10:1 --brake-front-slip 2:12:1 \\
+        --brake-min-freq 10,20,30 --brake-max-freq 60,85,110 --top 20 --output sweep.csv
+
+未指定的参数沿用 config.ini 中的当前值。刹车与油门扳机没有共享参数，因此两组网格分别扫描。
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import configparser
+
+import numpy as np
+
+from session_recorder import FIELD_INDEX, load_sessions, frame_durations
+
+# 与 Adaptive_Trigger_RBR.py 自适应扳机部分保持一致的常量
+MIN_MOVING_SPEED_KMH = 5.0
+SLIP_NORMALISATION = 25.0
+MIN_TRIGGER_PERCENTAGE = 0.01
+
+# 每个扳机可扫描的参数: (参数名, config键, 类型, 下限, 上限) - 上下限与主程序加载配置时的限制相同
+TRIGGER_PARAMS = (
+    ('threshold', None, float, 0.1, 99.0),
+    ('front_slip', 'front_slip_threshold', float, 1.0, 20.0),
+    ('rear_slip', 'rear_slip_threshold', float, 1.0, 20.0),
+    ('min_freq', 'min_frequency', int, 1, 50),
+    ('max_freq', 'max_frequency', int, 20, 150),
+    ('reverse', 'reverse_frequency_mode', bool, 0, 1),
+)
+TRIGGERS = {
+    # trigger: (config section, threshold key, pedal field, slip sign)
+    'brake': ('BrakeSlip', 'brake_threshold', 'brake', -1),
+    'throttle': ('ThrottleSlip', 'throttle_threshold', 'throttle', 1),
+}
+PARAM_NAMES = tuple(name for name, *_ in TRIGGER_PARAMS)
+ACTIVATION_PARAMS = ('threshold', 'front_slip', 'rear_slip')
+FREQUENCY_PARAMS = ('min_freq', 'max_freq', 'reverse')
+RESULT_COLUMNS = ('active_frac', 'churn_per_s', 'freq_mean', 'freq_p10', 'freq_p50', 'freq_p90')
+
+
+def _parse_axis(text, kind):
+    """解析 '1:10:0.5' (start:stop:step, 含 stop) 或 '1,3,5' 形式的参数轴"""
+    if kind is bool:
+        return np.array([v.strip().lower() in ('1', 'true', 'yes', 'on') for v in text.split(',')])
+    if ':' in text:
+        start, stop, step = (float(x) for x in text.split(':'))
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = np.array([float(x) for x in text.split(',') if x.strip()])
+    return values.astype(int) if kind is int else values
+
+
+def prepare_channels(frames):
+    """从录制帧计算与参数无关的逐帧量: 是否行驶、前后轮锁死/打滑率和滑移百分比"""
+    ground_speed_kmh = frames[:, FIELD_INDEX['ground_speed']] * 3.6
+    moving = ground_speed_kmh > MIN_MOVING_SPEED_KMH
+    safe_speed = np.where(moving, ground_speed_kmh, 1.0)
+    wheels = frames[:, [FIELD_INDEX['wheel_fl'], FIELD_INDEX['wheel_fr'],
+                        FIELD_INDEX['wheel_rl'], FIELD_INDEX['wheel_rr']]]
+    slips = (wheels / safe_speed[:, None] - 1) * 100
+    slips[~moving] = 0.0
+
+    channels = {'moving': moving}
+    for trigger, (_, _, pedal_field, sign) in TRIGGERS.items():
+        directed = np.maximum(slips * sign, 0.0)  # 刹车只看负滑移(锁死)，油门只看正滑移(打滑)
+        front = directed[:, :2].max(axis=1)
+        rear = directed[:, 2:].max(axis=1)
+        percentage = np.clip((front / SLIP_NORMALISATION + rear / SLIP_NORMALISATION) / 2.0, 0.0, 1.0)
+        channels[trigger] = (frames[:, FIELD_INDEX[pedal_field]], front, rear, percentage)
+    return channels
+
+
+def _frequencies(percentage, min_f, max_f, reverse):
+    """与主程序相同的滑移百分比 -> 频率映射，min_f/max_f/reverse 为长度 Q 的数组，返回 (Q, N)"""
+    min_f = min_f[:, None]
+    max_f = max_f[:, None]
+    span = max_f - min_f
+    freq = np.where(reverse[:, None], max_f - span * percentage, min_f + span * percentage)
+    return np.maximum(min_f, np.minimum(max_f, freq.astype(np.int64)))
+
+
+def build_grid(axes, names):
+    """把若干参数轴做笛卡尔积(最后一个轴变化最快)，返回 {参数名: 长度 C 的数组}"""
+    mesh = np.meshgrid(*[axes[name] for name in names], indexing='ij')
+    return {name: m.ravel() for name, m in zip(names, mesh)}
+
+
+def _gated_sums(kp, kf, kr, weights, shape, extra=None):
+    """G[i, j, l, ...] = Σ weights · [kp > i] · [kf <= j] · [kr <= l]
+
+    kp/kf/kr 为每帧超过的阈值个数(np.searchsorted 结果)，先按它们做加权直方图，
+    再沿 p 轴取后缀和、沿 f/r 轴取前缀和，复杂度 O(N + 网格大小)，与配置数量无关。
+    extra=(索引, 长度) 时附加一个不参与累积的维度(例如频率分组)。
+    """
+    n_p, n_f, n_r = shape
+    dims = (n_p + 1, n_f + 1, n_r + 1) + ((extra[1],) if extra else ())
+    index = (kp, kf, kr) + ((extra[0],) if extra else ())
+    flat = np.ravel_multi_index(index, dims)
+    hist = np.bincount(flat, weights=weights, minlength=int(np.prod(dims))).reshape(dims)
+    gated = np.cumsum(hist[::-1], axis=0)[::-1][1:]
+    gated = np.cumsum(np.cumsum(gated, axis=1), axis=2)
+    return gated[:, :n_f, :n_r], gated[:, n_f, n_r]
+
+
+def _active_sums(kp, kf, kr, weights, shape, extra=None):
+    """Σ weights · active(i, j, l)，active = pedal > thr_i 且 (front > f_j 或 rear > r_l)"""
+    gated, pedal_only = _gated_sums(kp, kf, kr, weights, shape, extra)
+    return pedal_only[:, None, None] - gated
+
+
+def _both_active_sums(kp, kf, kr, weights, shape):
+    """Σ_相邻帧对 weights · active_prev · active_cur (网格上每个激活配置)
+
+    active = P·(1 - Fn·Rn)，展开 (1 - Fn_p·Rn_p)(1 - Fn_c·Rn_c) 后每一项都只依赖
+    min(kp_prev, kp_cur) 和 kf/kr 的某个组合，因此仍可用 _gated_sums 求得。
+    """
+    kp_both = np.minimum(kp[:-1], kp[1:])
+    gated_prev, pedal_only = _gated_sums(kp_both, kf[:-1], kr[:-1], weights, shape)
+    gated_cur, _ = _gated_sums(kp_both, kf[1:], kr[1:], weights, shape)
+    gated_joint, _ = _gated_sums(kp_both, np.maximum(kf[:-1], kf[1:]), np.maximum(kr[:-1], kr[1:]), weights, shape)
+    return pedal_only[:, None, None] - gated_prev - gated_cur + gated_joint
+
+
+def sweep(channels, dt, same_session, trigger, axes):
+    """扫描完整参数网格，返回按 build_grid(axes, PARAM_NAMES) 顺序排列的统计结果
+
+    激活条件只依赖 (threshold, front_slip, rear_slip)，频率只依赖 (min_freq, max_freq, reverse)。
+    激活部分不逐配置广播，而是统计每帧超过了各轴上多少个阈值，再用累积和一次得到所有组合；
+    频率部分对每组 (min, max, reverse) 广播整段帧数组 (Q, N)。
+    """
+    pedal, front, rear, percentage = channels[trigger]
+    candidate = channels['moving'] & (percentage >= MIN_TRIGGER_PERCENTAGE)
+    thr_axis, front_axis, rear_axis = (axes[name] for name in ACTIVATION_PARAMS)
+    shape = (len(thr_axis), len(front_axis), len(rear_axis))
+
+    # 每帧超过的阈值个数: pedal > thr_i <=> i < kp；非候选帧 kp=0 表示任何配置都不激活
+    kp = np.where(candidate, np.searchsorted(thr_axis, pedal, side='left'), 0)
+    kf = np.searchsorted(front_axis, front, side='left')
+    kr = np.searchsorted(rear_axis, rear, side='left')
+
+    frq = build_grid(axes, FREQUENCY_PARAMS)
+    freq = _frequencies(percentage, frq['min_freq'], frq['max_freq'], frq['reverse'])
+    n_freq = len(freq)
+
+    total_time = dt.sum() if dt.sum() > 0 else 1.0
+    active_time = _active_sums(kp, kf, kr, dt, shape)
+
+    # 指令变化次数 = 激活状态切换次数 + 持续激活期间频率变化次数
+    pair_weights = same_session.astype(np.float64)
+    active_prev = _active_sums(kp[:-1], kf[:-1], kr[:-1], pair_weights, shape)
+    active_cur = _active_sums(kp[1:], kf[1:], kr[1:], pair_weights, shape)
+    toggles = active_prev + active_cur - 2 * _both_active_sums(kp, kf, kr, pair_weights, shape)
+
+    churn = np.empty(shape + (n_freq,))
+    stats = {col: np.empty(shape + (n_freq,)) for col in ('freq_mean', 'freq_p10', 'freq_p50', 'freq_p90')}
+    has_time = active_time > 0
+    safe_time = np.where(has_time, active_time, 1.0)
+    for q in range(n_freq):
+        changed = (freq[q, 1:] != freq[q, :-1]) & same_session
+        churn[..., q] = toggles + _both_active_sums(kp, kf, kr, changed.astype(np.float64), shape)
+
+        # 时间加权的频率直方图: 以频率取值分组作为附加维度
+        values, groups = np.unique(freq[q], return_inverse=True)
+        hist = _active_sums(kp, kf, kr, dt, shape, extra=(groups, len(values)))
+        stats['freq_mean'][..., q] = (hist * values).sum(axis=-1) / safe_time
+        cumulative = np.cumsum(hist, axis=-1) / safe_time[..., None]
+        for col, level in (('freq_p10', 0.10), ('freq_p50', 0.50), ('freq_p90', 0.90)):
+            stats[col][..., q] = np.where(has_time, values[(cumulative >= level - 1e-9).argmax(axis=-1)], 0)
+
+    results = {'active_frac': np.repeat((active_time / total_time).ravel(), n_freq),
+               'churn_per_s': churn.ravel() / total_time}
+    results.update({col: v.ravel() for col, v in stats.items()})
+    return results
+
+
+def _current_axes(config, trigger):
+    """从 config.ini 读取某个扳机当前的参数值作为默认单值轴"""
+    section, threshold_key, _, _ = TRIGGERS[trigger]
+    axes = {}
+    for name, key, kind, _, _ in TRIGGER_PARAMS:
+        key = key or threshold_key
+        if kind is bool:
+            value = config.getboolean(section, key, fallback=False)
+        elif kind is int:
+            value = config.getint(section, key, fallback=20 if name == 'min_freq' else 70)
+        else:
+            value = config.getfloat(section, key, fallback=3.0 if name == 'threshold' else 5.0)
+        axes[name] = np.array([value])
+    return axes
+
+
+def _clamp_axes(axes):
+    """按主程序加载配置时的范围限制参数值，使结果与实际运行一致"""
+    for name, _, kind, low, high in TRIGGER_PARAMS:
+        if kind is not bool:
+            axes[name] = np.unique(np.clip(axes[name], low, high))
+    return axes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep adaptive trigger parameters over recorded RBR sessions")
+    parser.add_argument('sessions', nargs='+', help="Session .npz files, globs or directories")
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'),
+                        help="config.ini providing default values for axes not swept")
+    parser.add_argument('--trigger', choices=('brake', 'throttle', 'both'), default='both')
+    for trigger in TRIGGERS:
+        for name, _, kind, low, high in TRIGGER_PARAMS:
+            parser.add_argument(f"--{trigger}-{name.replace('_', '-')}", dest=f"{trigger}_{name}",
+                                help=f"{trigger} {name} axis ({low}-{high}), 'start:stop:step' or 'a,b,c'")
+    parser.add_argument('--sort', choices=RESULT_COLUMNS, default='churn_per_s')
+    parser.add_argument('--descending', action='store_true')
+    parser.add_argument('--top', type=int, default=20, help="Rows to print per trigger")
+    parser.add_argument('--output', help="Write all results to this CSV file")
+    args = parser.parse_args(argv)
+
+    sessions = load_sessions(args.sessions)
+    if not sessions:
+        print("No session files found")
+        return 1
+    frames = np.concatenate([f for _, f in sessions])
+    session_ids = np.concatenate([np.full(len(f), i) for i, (_, f) in enumerate(sessions)])
+    dt = np.concatenate([frame_durations(f) for _, f in sessions])
+    same_session = session_ids[1:] == session_ids[:-1]
+    print(f"Loaded {len(sessions)} session(s), {len(frames)} frames, {dt.sum():.1f} s of telemetry")
+
+    config = configparser.ConfigParser()
+    if os.path.exists(args.config):
+        config.read(args.config, encoding='utf-8')
+
+    channels = prepare_channels(frames)
+    triggers = list(TRIGGERS) if args.trigger == 'both' else [args.trigger]
+    rows = []
+    for trigger in triggers:
+        axes = _current_axes(config, trigger)
+        for name, _, kind, _, _ in TRIGGER_PARAMS:
+            text = getattr(args, f"{trigger}_{name}")
+            if text:
+                axes[name] = _parse_axis(text, kind)
+        axes = _clamp_axes(axes)
+        grid = build_grid(axes, PARAM_NAMES)
+
+        start = time.perf_counter()
+        results = sweep(channels, dt, same_session, trigger, axes)
+        elapsed = time.perf_counter() - start
+        n_configs = len(grid['threshold'])
+        print(f"\n[{trigger}] {n_configs} configs evaluated in {elapsed:.2f} s")
+
+        order = np.argsort(results[args.sort])
+        if args.descending:
+            order = order[::-1]
+        header = ['threshold', 'front', 'rear', 'min_f', 'max_f', 'rev', 'active%', 'churn/s', 'f_mean', 'f_p10', 'f_p50', 'f_p90']
+        print(' '.join(f"{h:>9}" for h in header))
+        for i in order[:args.top]:
+            print(f"{grid['threshold'][i]:>9.1f} {grid['front_slip'][i]:>9.1f} {grid['rear_slip'][i]:>9.1f} "
+                  f"{int(grid['min_freq'][i]):>9d} {int(grid['max_freq'][i]):>9d} {str(bool(grid['reverse'][i])):>9} "
+                  f"{results['active_frac'][i] * 100:>9.2f} {results['churn_per_s'][i]:>9.2f} "
+                  f"{results['freq_mean'][i]:>9.1f} {int(results['freq_p10'][i]):>9d} "
+                  f"{int(results['freq_p50'][i]):>9d} {int(results['freq_p90'][i]):>9d}")
+
+        for i in range(n_configs):
+            row = {'trigger': trigger}
+            row.update({name: grid[name][i] for name in PARAM_NAMES})
+            row.update({col: results[col][i] for col in RESULT_COLUMNS})
+            rows.append(row)
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['trigger'] + list(PARAM_NAMES) + list(RESULT_COLUMNS))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nWrote {len(rows)} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+RBR Runtime Config - 运行时配置快照
+All settings the telemetry loop reads every tick, parsed and clamped once into an immutable
+RuntimeConfig. Reloads and GUI edits build a new snapshot and swap the module-level reference, so
+the loop always sees one consistent set of values and never a half-updated config.
+"""
+from collections import namedtuple
+
+from config_common import ConfigError, clamp, validate_keys, validate_frequency_ranges, read_config_file
+from gear_shift import GEAR_SHIFT_PRESETS, load_presets
+from adapter_core import SlipTrigger, Trigger, TriggerMode, TRIGGER_VIBRATION
+
+# 从 config.ini 读取的字段
+CONFIG_FIELDS = (
+    'adaptive_trigger_enabled', 'led_effect_enabled', 'haptic_effect_enabled', 'print_telemetry_enabled',
+    'trigger_strength', 'haptic_strength', 'wheel_slip_threshold',
+    'brake_threshold', 'brake_front_slip_threshold', 'brake_rear_slip_threshold',
+    'brake_feedback_strength', 'brake_amplitude', 'brake_min_frequency', 'brake_max_frequency',
+    'brake_reverse_frequency_mode', 'brake_use_automatic_gun',
+    'throttle_threshold', 'throttle_front_slip_threshold', 'throttle_rear_slip_threshold',
+    'throttle_feedback_strength', 'throttle_amplitude', 'throttle_min_frequency', 'throttle_max_frequency',
+    'throttle_reverse_frequency_mode', 'throttle_use_automatic_gun',
+    'auto_gear_shift_enabled', 'gear_up_key', 'gear_down_key', 'active_gear_preset', 'gear_shift_presets',
+    'shift_up_cooldown', 'shift_down_cooldown', 'gear_shift_debug', 'predictive_shift_enabled',
+    'tick_profiling_enabled', 'stack_sampling_enabled',
+)
+# 由上面字段推导、热路径直接使用的常量
+DERIVED_FIELDS = (
+    'brake_trigger',              # 刹车/油门扳机的 SlipTrigger 参数
+    'throttle_trigger',
+    'haptic_slip_scale',          # (滑移 - 阈值) * scale = 0-1 震动强度
+    'shift_up_rpm',               # 当前预设的升/降档转速(tuple)
+    'shift_down_rpm',
+)
+
+RuntimeConfig = namedtuple('RuntimeConfig', CONFIG_FIELDS + DERIVED_FIELDS)
+
+SLIP_NORMALISATION = 25.0   # 单轴滑移率归一化除数(RBR适配)
+HAPTIC_SLIP_RANGE = 50.0    # 超出阈值多少滑移率时震动达到最大
+
+
+def _slip_trigger(values, prefix, trigger, slip_sign):
+    """RBR 的滑移反馈: 只取抱死/打滑方向，(前轴 + 后轴) / (2 * SLIP_NORMALISATION)，单一震动指令"""
+    slip_scale = 1.0 / (SLIP_NORMALISATION * 2)
+    return SlipTrigger(
+        trigger=trigger, slip_sign=slip_sign,
+        input_threshold=values[prefix + '_threshold'],
+        front_threshold=values[prefix + '_front_slip_threshold'],
+        rear_threshold=values[prefix + '_rear_slip_threshold'],
+        front_weight=slip_scale, rear_weight=slip_scale,
+        min_percentage=0.01,  # 降低最小触发阈值以支持更低频率震动
+        feedback_strength=0,
+        # AutomaticGun (mode=17) 或 VIBRATION (mode=23)
+        mode=TriggerMode.AutomaticGun if values[prefix + '_use_automatic_gun'] else TRIGGER_VIBRATION,
+        amplitude=values[prefix + '_amplitude'],
+        min_frequency=values[prefix + '_min_frequency'],
+        max_frequency=values[prefix + '_max_frequency'],
+        reverse_frequency=values[prefix + '_reverse_frequency_mode'],
+    )
+
+
+def build_runtime_config(**values):
+    """由 CONFIG_FIELDS 构造快照并计算派生常量"""
+    presets = tuple((tuple(up), tuple(down)) for up, down in values['gear_shift_presets'])
+    active = clamp(int(values['active_gear_preset']), 0, len(presets) - 1)
+    values.update(
+        gear_shift_presets=presets,
+        active_gear_preset=active,
+        brake_trigger=_slip_trigger(values, 'brake', Trigger.Left, -1),        # 刹车抱死: 负滑移
+        throttle_trigger=_slip_trigger(values, 'throttle', Trigger.Right, 1),  # 油门打滑: 正滑移
+        haptic_slip_scale=1.0 / HAPTIC_SLIP_RANGE,
+        shift_up_rpm=presets[active][0],
+        shift_down_rpm=presets[active][1],
+    )
+    return RuntimeConfig(**values)
+
+
+def replace_runtime_config(runtime_config, **changes):
+    """返回修改了部分字段的新快照(派生常量重新计算)"""
+    values = {name: getattr(runtime_config, name) for name in CONFIG_FIELDS}
+    values.update(changes)
+    return build_runtime_config(**values)
+
+
+def load_runtime_config(config):
+    """从 ConfigParser 解析全部运行时参数并限制在合理范围内"""
+    get, getint, getfloat, getboolean = config.get, config.getint, config.getfloat, config.getboolean
+    legacy_cooldown = getfloat('GearShift', 'shift_cooldown', fallback=0.25)
+    return build_runtime_config(
+        adaptive_trigger_enabled=getboolean('Features', 'adaptive_trigger', fallback=True),
+        led_effect_enabled=getboolean('Features', 'led_effect', fallback=True),
+        haptic_effect_enabled=getboolean('Features', 'haptic_effect', fallback=True),
+        print_telemetry_enabled=getboolean('Features', 'print_telemetry', fallback=True),
+
+        trigger_strength=clamp(getfloat('Feedback', 'trigger_strength', fallback=1.0), 0.1, 2.0),
+        haptic_strength=clamp(getfloat('Feedback', 'haptic_strength', fallback=1.0), 0.0, 1.0),
+        wheel_slip_threshold=clamp(getfloat('Feedback', 'wheel_slip_threshold', fallback=10.0), 5.0, 30.0),
+
+        brake_threshold=clamp(getfloat('BrakeSlip', 'brake_threshold', fallback=3.0), 0.1, 99.0),
+        brake_front_slip_threshold=clamp(getfloat('BrakeSlip', 'front_slip_threshold', fallback=5.0), 1.0, 20.0),
+        brake_rear_slip_threshold=clamp(getfloat('BrakeSlip', 'rear_slip_threshold', fallback=5.0), 1.0, 20.0),
+        brake_feedback_strength=clamp(getint('BrakeSlip', 'feedback_strength', fallback=5), 1, 8),
+        brake_amplitude=clamp(getint('BrakeSlip', 'amplitude', fallback=6), 1, 8),
+        brake_min_frequency=clamp(getint('BrakeSlip', 'min_frequency', fallback=20), 1, 50),
+        brake_max_frequency=clamp(getint('BrakeSlip', 'max_frequency', fallback=70), 20, 150),
+        brake_reverse_frequency_mode=getboolean('BrakeSlip', 'reverse_frequency_mode', fallback=False),
+        brake_use_automatic_gun=getboolean('BrakeSlip', 'use_automatic_gun', fallback=False),
+
+        throttle_threshold=clamp(getfloat('ThrottleSlip', 'throttle_threshold', fallback=3.0), 0.1, 99.0),
+        throttle_front_slip_threshold=clamp(getfloat('ThrottleSlip', 'front_slip_threshold', fallback=7.0), 1.0, 20.0),
+        throttle_rear_slip_threshold=clamp(getfloat('ThrottleSlip', 'rear_slip_threshold', fallback=7.0), 1.0, 20.0),
+        throttle_feedback_strength=clamp(getint('ThrottleSlip', 'feedback_strength', fallback=5), 1, 8),
+        throttle_amplitude=clamp(getint('ThrottleSlip', 'amplitude', fallback=6), 1, 8),
+        throttle_min_frequency=clamp(getint('ThrottleSlip', 'min_frequency', fallback=20), 1, 50),
+        throttle_max_frequency=clamp(getint('ThrottleSlip', 'max_frequency', fallback=70), 20, 150),
+        throttle_reverse_frequency_mode=getboolean('ThrottleSlip', 'reverse_frequency_mode', fallback=False),
+        throttle_use_automatic_gun=getboolean('ThrottleSlip', 'use_automatic_gun', fallback=False),
+
+        auto_gear_shift_enabled=getboolean('GearShift', 'auto_gear_shift', fallback=False),
+        gear_up_key=get('GearShift', 'gear_up_key', fallback='e'),
+        gear_down_key=get('GearShift', 'gear_down_key', fallback='q'),
+        active_gear_preset=getint('GearShift', 'active_preset', fallback=2) - 1,  # 1-based to 0-based
+        gear_shift_presets=load_presets(config),
+        shift_up_cooldown=clamp(getfloat('GearShift', 'shift_up_cooldown', fallback=legacy_cooldown), 0.1, 1.0),
+        shift_down_cooldown=clamp(getfloat('GearShift', 'shift_down_cooldown', fallback=legacy_cooldown), 0.1, 1.0),
+        gear_shift_debug=getboolean('GearShift', 'gear_shift_debug', fallback=False),
+        predictive_shift_enabled=getboolean('GearShift', 'predictive_shift', fallback=False),
+        tick_profiling_enabled=getboolean('Features', 'tick_profiling', fallback=False),
+        stack_sampling_enabled=getboolean('Profiling', 'stack_sampling', fallback=False),
+    )
+
+
+# 热重载时逐项校验的键: (section, key, 类型)；缺失的键使用默认值，不算错误
+VALIDATED_KEYS = (
+    ('Features', 'adaptive_trigger', bool), ('Features', 'led_effect', bool),
+    ('Features', 'haptic_effect', bool), ('Features', 'print_telemetry', bool),
+    ('Features', 'tick_profiling', bool), ('Profiling', 'stack_sampling', bool),
+    ('Profiling', 'sampling_seconds', float), ('Profiling', 'sampling_interval_ms', float),
+    ('Feedback', 'trigger_strength', float), ('Feedback', 'haptic_strength', float),
+    ('Feedback', 'wheel_slip_threshold', float),
+    ('BrakeSlip', 'brake_threshold', float), ('BrakeSlip', 'front_slip_threshold', float),
+    ('BrakeSlip', 'rear_slip_threshold', float), ('BrakeSlip', 'feedback_strength', int),
+    ('BrakeSlip', 'amplitude', int), ('BrakeSlip', 'min_frequency', int), ('BrakeSlip', 'max_frequency', int),
+    ('BrakeSlip', 'reverse_frequency_mode', bool), ('BrakeSlip', 'use_automatic_gun', bool),
+    ('ThrottleSlip', 'throttle_threshold', float), ('ThrottleSlip', 'front_slip_threshold', float),
+    ('ThrottleSlip', 'rear_slip_threshold', float), ('ThrottleSlip', 'feedback_strength', int),
+    ('ThrottleSlip', 'amplitude', int), ('ThrottleSlip', 'min_frequency', int), ('ThrottleSlip', 'max_frequency', int),
+    ('ThrottleSlip', 'reverse_frequency_mode', bool), ('ThrottleSlip', 'use_automatic_gun', bool),
+    ('GearShift', 'auto_gear_shift', bool), ('GearShift', 'active_preset', int),
+    ('GearShift', 'shift_up_cooldown', float), ('GearShift', 'shift_down_cooldown', float),
+    ('GearShift', 'gear_shift_debug', bool), ('GearShift', 'predictive_shift', bool),
+)
+
+
+def validate_config(config):
+    """检查类型错误与互相矛盾的取值，发现问题时抛出 ConfigError"""
+    validate_keys(config, VALIDATED_KEYS)
+    validate_frequency_ranges(config)
+    for _, section, _, _ in GEAR_SHIFT_PRESETS:
+        for key in ('shift_up_rpm', 'shift_down_rpm'):
+            raw = config.get(section, key, fallback='')
+            try:
+                [float(x) for x in raw.split(',') if x.strip()]
+            except ValueError:
+                raise ConfigError(f"[{section}] {key} = {raw!r} must be comma-separated numbers")
+    for key in ('gear_up_key', 'gear_down_key'):
+        if config.has_option('GearShift', key) and not config.get('GearShift', key).strip():
+            raise ConfigError(f"[GearShift] {key} is empty")
+
+
+def parse_config_file(path):
+    """读取并校验 config.ini，返回 (ConfigParser, RuntimeConfig)；文件无效时抛出 ConfigError"""
+    return read_config_file(path, validate_config, load_runtime_config)
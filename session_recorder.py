@@ -0,0 +1,106 @@
+"""
+RBR Session Recorder - 遥测会话录制与加载
+Records per-tick telemetry from the RBR main loop into compressed .npz files so
+offline tools (param_sweep.py, ...) can replay whole stages without the game.
+"""
+import os
+import glob
+import time
+import threading
+
+import numpy as np
+
+# 每帧录制的字段(列顺序即 .npz 中 frames 数组的列顺序)
+SESSION_FIELDS = (
+    't',                    # time.time() 时间戳 (s)
+    'race_time',            # 赛段计时 (s)
+    'distance_from_start',  # 距起点距离 (m)
+    'car_speed',            # 仪表车速 (km/h)
+    'ground_speed',         # 对地速度 (m/s)
+    'rpm',
+    'gear',                 # gear_id: -1=倒档, 0=空档, 1-6=前进档
+    'throttle',             # 0-100 %
+    'brake',                # 0-100 %
+    'clutch',               # 0-100 %
+    'handbrake',            # 0-100 %
+    'wheel_fl',             # 轮速 (km/h)
+    'wheel_fr',
+    'wheel_rl',
+    'wheel_rr',
+    'countdown',            # stage_start_countdown (s)
+)
+FIELD_INDEX = {name: i for i, name in enumerate(SESSION_FIELDS)}
+
+
+class SessionRecorder:
+    """把主循环的每帧遥测缓存在内存中，赛段结束/游戏退出时在后台线程写成 .npz"""
+
+    def __init__(self, sessions_dir, max_frames=360000):
+        self.sessions_dir = sessions_dir
+        self.max_frames = max_frames  # 100Hz 下约 1 小时，超出则自动分段
+        self._rows = []
+        self._session_start = None
+
+    def record(self, *values):
+        """追加一帧，参数顺序与 SESSION_FIELDS 一致"""
+        if self._session_start is None:
+            self._session_start = values[0]
+        self._rows.append(values)
+        if len(self._rows) >= self.max_frames:
+            self.flush()
+
+    def flush(self):
+        """结束当前会话：交给后台线程压缩写盘，主循环不等待 I/O"""
+        if not self._rows:
+            return None
+        rows = self._rows
+        self._rows = []
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self._session_start))
+        self._session_start = None
+        path = os.path.join(self.sessions_dir, f"session_{stamp}.npz")
+        threading.Thread(target=self._write, args=(path, rows), daemon=True).start()
+        return path
+
+    def _write(self, path, rows):
+        try:
+            os.makedirs(self.sessions_dir, exist_ok=True)
+            frames = np.asarray(rows, dtype=np.float64)
+            np.savez_compressed(path, frames=frames, fields=np.array(SESSION_FIELDS))
+            print(f"[Recorder] Saved {len(rows)} frames to {path}")
+        except Exception as e:
+            print(f"[Recorder] Failed to save session {path}: {e}")
+
+
+def load_session(path):
+    """读取单个 .npz 会话，返回 (N, len(SESSION_FIELDS)) 的 float64 数组"""
+    with np.load(path) as data:
+        frames = data['frames']
+        fields = tuple(str(f) for f in data['fields'])
+    if fields != SESSION_FIELDS:
+        # 旧版本录制的字段顺序不同时按名字重排，缺失字段补 0
+        reordered = np.zeros((len(frames), len(SESSION_FIELDS)))
+        for i, name in enumerate(SESSION_FIELDS):
+            if name in fields:
+                reordered[:, i] = frames[:, fields.index(name)]
+        frames = reordered
+    return frames
+
+
+def load_sessions(paths):
+    """读取多个会话(文件或目录)，返回 [(path, frames), ...]"""
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(sorted(glob.glob(os.path.join(p, '*.npz'))))
+        else:
+            files.extend(sorted(glob.glob(p)))
+    return [(f, load_session(f)) for f in files]
+
+
+def frame_durations(frames):
+    """每帧持续时间 (s)；跨会话拼接或暂停造成的大间隔截断为 0.1s"""
+    t = frames[:, FIELD_INDEX['t']]
+    dt = np.diff(t, append=t[-1] if len(t) else 0.0)
+    if len(dt) > 1:
+        dt[-1] = np.median(dt[:-1])
+    return np.clip(dt, 0.0, 0.1)
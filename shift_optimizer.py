@@ -0,0 +1,262 @@
+"""
+RBR Auto Shift Point Optimiser - 离线换挡点优化工具
+Computes per-gear shift points from recorded sessions (see session_recorder.py) by comparing
+full-throttle acceleration versus RPM in neighbouring gears, writes them into one of the preset
+slots the adapter loads (GearShift_Rally1-3) and replays candidate presets through the shared shift
+logic (gear_shift.py) to compare shift counts.
+
+用法示例:
+    python shift_optimizer.py sessions/ --base 2 --write --preset 3
+"""
+import os
+import sys
+import argparse
+import configparser
+
+import numpy as np
+
+from session_recorder import FIELD_INDEX, load_sessions
+from gear_shift import (AutoShiftLogic, SHIFT_UP, MAX_SHIFT_CLUTCH,
+                        GEAR_SHIFT_PRESETS, UP_RPM_RANGE, DOWN_RPM_RANGE, load_presets)
+
+MAX_GEAR = 6
+RPM_BIN_WIDTH = 250
+MAX_RPM = 12000
+MIN_BIN_SAMPLES = 20          # 每个 (档位, 转速区间) 至少需要的样本数
+FULL_THROTTLE = 90.0          # 只使用全油门帧估计加速能力
+MIN_SPEED_KMH = 10.0
+SHIFT_SETTLE_TIME = 0.5       # 换挡后该时间内的帧受离合/动力中断影响，不参与统计
+SMOOTHING_WINDOW = 9          # 车速平滑窗口(帧)，降低求导噪声
+DOWNSHIFT_MARGIN = 0.85       # 降档后转速不超过下一档升档点的该比例，避免升降档来回跳
+
+
+def _session_channels(frames):
+    """计算单个会话的加速度与有效帧掩码"""
+    t = frames[:, FIELD_INDEX['t']]
+    speed = frames[:, FIELD_INDEX['ground_speed']]
+    gear = frames[:, FIELD_INDEX['gear']].astype(int)
+
+    kernel = np.ones(SMOOTHING_WINDOW) / SMOOTHING_WINDOW
+    smooth = np.convolve(speed, kernel, mode='same') if len(speed) >= SMOOTHING_WINDOW else speed
+    accel = np.gradient(smooth, t) if len(t) > 1 else np.zeros_like(speed)
+
+    # 距上一次档位变化的时间
+    changed = np.concatenate(([False], gear[1:] != gear[:-1]))
+    last_change = np.maximum.accumulate(np.where(changed, t, -np.inf))
+
+    valid = ((frames[:, FIELD_INDEX['throttle']] >= FULL_THROTTLE)
+             & (frames[:, FIELD_INDEX['clutch']] < MAX_SHIFT_CLUTCH)
+             & (frames[:, FIELD_INDEX['countdown']] <= 0)
+             & (frames[:, FIELD_INDEX['car_speed']] > MIN_SPEED_KMH)
+             & (gear >= 1) & (gear <= MAX_GEAR)
+             & (t - last_change > SHIFT_SETTLE_TIME)
+             & np.isfinite(accel))
+    return accel, valid
+
+
+def acceleration_table(sessions):
+    """按 (档位, 转速区间) 统计平均加速度，返回 (bin_centers, mean[gear, bin], count[gear, bin], rpm_per_kmh[gear])"""
+    accel, valid = zip(*(_session_channels(f) for _, f in sessions))
+    frames = np.concatenate([f for _, f in sessions])
+    accel = np.concatenate(accel)
+    valid = np.concatenate(valid)
+
+    rpm = frames[valid, FIELD_INDEX['rpm']]
+    gear = frames[valid, FIELD_INDEX['gear']].astype(int)
+    speed = frames[valid, FIELD_INDEX['car_speed']]
+    accel = accel[valid]
+
+    n_bins = MAX_RPM // RPM_BIN_WIDTH
+    bins = np.clip((rpm // RPM_BIN_WIDTH).astype(int), 0, n_bins - 1)
+    flat = gear * n_bins + bins
+    size = (MAX_GEAR + 1) * n_bins
+    count = np.bincount(flat, minlength=size).reshape(MAX_GEAR + 1, n_bins)
+    total = np.bincount(flat, weights=accel, minlength=size).reshape(MAX_GEAR + 1, n_bins)
+    mean = np.where(count >= MIN_BIN_SAMPLES, total / np.maximum(count, 1), np.nan)
+
+    # 各档位总传动比: 每 km/h 对应的转速(中位数)
+    rpm_per_kmh = np.full(MAX_GEAR + 1, np.nan)
+    ratio = rpm / speed
+    for g in range(1, MAX_GEAR + 1):
+        in_gear = gear == g
+        if in_gear.sum() >= MIN_BIN_SAMPLES:
+            rpm_per_kmh[g] = np.median(ratio[in_gear])
+
+    centers = (np.arange(n_bins) + 0.5) * RPM_BIN_WIDTH
+    return centers, mean, count, rpm_per_kmh
+
+
+def optimal_shift_points(centers, mean, rpm_per_kmh, base_up, base_down):
+    """升档点: 当前档加速度首次低于升档后(转速按传动比下降)下一档加速度的转速。
+
+    结果沿用现有换挡逻辑的下标约定(gear_id 档升档看 up[gear_id]，降档看 down[gear_id - 1])，
+    没有足够数据的档位保留 base 预设的值。
+    """
+    up = list(base_up)
+    down = list(base_down)
+    for g in range(1, min(MAX_GEAR, len(up))):
+        cur_ok = ~np.isnan(mean[g])
+        next_ok = ~np.isnan(mean[g + 1])
+        if not cur_ok.any() or not next_ok.any() or np.isnan(rpm_per_kmh[[g, g + 1]]).any():
+            continue
+        step = rpm_per_kmh[g + 1] / rpm_per_kmh[g]  # 升档后转速比例 (<1)
+        rpms = centers[cur_ok]
+        acc_cur = mean[g][cur_ok]
+        after = rpms * step
+        acc_next = np.interp(after, centers[next_ok], mean[g + 1][next_ok], left=np.nan, right=np.nan)
+
+        # 只考虑当前档加速度峰值之后的交叉点
+        peak = int(np.argmax(acc_cur))
+        crossing = np.flatnonzero((acc_cur[peak:] <= acc_next[peak:]) & ~np.isnan(acc_next[peak:]))
+        best = rpms[peak + crossing[0]] if len(crossing) else rpms[-1]
+        up[g] = float(max(UP_RPM_RANGE[0], min(UP_RPM_RANGE[1], round(best))))
+        if g < len(down):
+            # 在 g+1 档降档: 降档后转速 = d / step，需低于 g 档升档点
+            target = up[g] * DOWNSHIFT_MARGIN * step
+            down[g] = float(max(DOWN_RPM_RANGE[0], min(DOWN_RPM_RANGE[1], round(target))))
+    return up, down
+
+
+def replay_shift_counts(sessions, up, down, shift_up_cooldown, shift_down_cooldown):
+    """把录制数据逐帧送入 AutoShiftLogic(开环: 使用录制时的实际档位)，统计会触发的升/降档次数
+
+    开环回放时档位不会因按键而改变，同一档位上的重复按键只计一次。
+    """
+    ups = downs = 0
+    for _, frames in sessions:
+        logic = AutoShiftLogic()
+        t = frames[:, FIELD_INDEX['t']]
+        gear = frames[:, FIELD_INDEX['gear']].astype(int)
+        rpm = frames[:, FIELD_INDEX['rpm']]
+        clutch = frames[:, FIELD_INDEX['clutch']]
+        speed = frames[:, FIELD_INDEX['car_speed']]
+        countdown = frames[:, FIELD_INDEX['countdown']]
+        last_request = None
+        for i in range(len(frames)):
+            now = t[i]
+            if i and gear[i] != gear[i - 1]:
+                last_request = None
+            logic.update_countdown(countdown[i], now)
+            if not logic.can_shift(gear[i], speed[i], countdown[i], now):
+                continue
+            direction = logic.decide(now, gear[i], rpm[i], clutch[i], up, down, shift_up_cooldown, shift_down_cooldown)
+            if direction:
+                logic.commit(direction, gear[i], now)
+                if direction == last_request:
+                    continue
+                last_request = direction
+                if direction == SHIFT_UP:
+                    ups += 1
+                else:
+                    downs += 1
+    return ups, downs
+
+
+def recorded_shift_counts(sessions):
+    ups = downs = 0
+    for _, frames in sessions:
+        gear = frames[:, FIELD_INDEX['gear']].astype(int)
+        delta = np.diff(gear)
+        ups += int((delta > 0).sum())
+        downs += int((delta < 0).sum())
+    return ups, downs
+
+
+def _format_rpm_list(values):
+    return ','.join(str(int(v)) for v in values)
+
+
+def update_ini_keys(path, section, values):
+    """只替换 [section] 中的给定键，其余行(包括 load_config 写入的注释)原样保留；
+    缺少的键追加在该节末尾，缺少的节追加在文件末尾"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+    start = next((i for i, line in enumerate(lines) if line.strip().lower() == f'[{section.lower()}]'), None)
+    if start is None:
+        if lines and lines[-1].strip():
+            lines.append('')
+        lines.append(f'[{section}]')
+        start = len(lines) - 1
+    end = next((i for i in range(start + 1, len(lines)) if lines[i].strip().startswith('[')), len(lines))
+    pending = {key.lower(): (key, value) for key, value in values.items()}
+    for i in range(start + 1, end):
+        line = lines[i]
+        if '=' not in line or line.lstrip().startswith(('#', ';')):
+            continue
+        key = line.split('=', 1)[0].strip().lower()
+        if key in pending:
+            name, value = pending.pop(key)
+            lines[i] = f"{name} = {value}"
+    insert = end
+    while insert > start + 1 and not lines[insert - 1].strip():
+        insert -= 1
+    lines[insert:insert] = [f"{name} = {value}" for name, value in pending.values()]
+    temp = path + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute auto gear shift points from recorded RBR sessions")
+    parser.add_argument('sessions', nargs='+', help="Session .npz files, globs or directories")
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'))
+    parser.add_argument('--base', type=int, choices=(1, 2, 3), default=None,
+                        help="Preset used for gears without enough data (default: active_preset)")
+    parser.add_argument('--preset', type=int, choices=(1, 2, 3), default=None,
+                        help="Preset slot to overwrite with --write (selectable in the app like any preset)")
+    parser.add_argument('--write', action='store_true', help="Write the optimised preset to --config")
+    args = parser.parse_args(argv)
+    if args.write and args.preset is None:
+        parser.error("--write needs --preset 1/2/3 (the preset slot to overwrite)")
+    section = GEAR_SHIFT_PRESETS[args.preset - 1][1] if args.preset else None
+
+    sessions = load_sessions(args.sessions)
+    if not sessions:
+        print("No session files found")
+        return 1
+
+    config = configparser.ConfigParser()
+    if os.path.exists(args.config):
+        config.read(args.config, encoding='utf-8')
+    presets = load_presets(config)
+    base = (args.base or config.getint('GearShift', 'active_preset', fallback=2)) - 1
+    base = max(0, min(len(presets) - 1, base))
+    up_cooldown = max(0.1, min(1.0, config.getfloat('GearShift', 'shift_up_cooldown', fallback=0.25)))
+    down_cooldown = max(0.1, min(1.0, config.getfloat('GearShift', 'shift_down_cooldown', fallback=0.25)))
+
+    centers, mean, count, rpm_per_kmh = acceleration_table(sessions)
+    print(f"Loaded {len(sessions)} session(s), {sum(len(f) for _, f in sessions)} frames, "
+          f"{int(count.sum())} full-throttle samples")
+    for g in range(1, MAX_GEAR + 1):
+        ok = ~np.isnan(mean[g])
+        if ok.any():
+            peak = centers[ok][np.argmax(mean[g][ok])]
+            print(f"  gear {g}: {rpm_per_kmh[g]:6.1f} rpm/(km/h), {int(count[g].sum()):6d} samples, "
+                  f"rpm {centers[ok][0]:.0f}-{centers[ok][-1]:.0f}, peak accel at {peak:.0f}")
+
+    up, down = optimal_shift_points(centers, mean, rpm_per_kmh, *presets[base])
+    print(f"\n[{section or 'optimised'}] (base: {GEAR_SHIFT_PRESETS[base][0]})")
+    print(f"shift_up_rpm = {_format_rpm_list(up)}")
+    print(f"shift_down_rpm = {_format_rpm_list(down)}")
+
+    rec_up, rec_down = recorded_shift_counts(sessions)
+    print(f"\nSimulated shift counts (cooldown up={up_cooldown}s down={down_cooldown}s), recorded: {rec_up} up / {rec_down} down")
+    candidates = [(name, *preset) for (name, _, _, _), preset in zip(GEAR_SHIFT_PRESETS, presets)]
+    candidates.append(('optimised', up, down))
+    for name, cand_up, cand_down in candidates:
+        ups, downs = replay_shift_counts(sessions, cand_up, cand_down, up_cooldown, down_cooldown)
+        print(f"  {name:<22} {ups:6d} up  {downs:6d} down")
+
+    if args.write:
+        update_ini_keys(args.config, section, {'shift_up_rpm': _format_rpm_list(up),
+                                               'shift_down_rpm': _format_rpm_list(down)})
+        print(f"\nWrote [{section}] to {args.config}; select preset {args.preset} in the app to use it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Auto Shift Worker - 独立换挡线程
+Runs the auto-shift decision (gear_shift.AutoShiftLogic) on its own thread at a configurable rate,
+reading only the latest ShiftFrame published by the telemetry loop, and hands key presses to a
+KeyInjector (key_injector.py) so neither GUI updates, DSX output nor the press itself delay a shift.
+"""
+import time
+import threading
+from collections import namedtuple
+
+from latency_stats import LatencyHistogram
+from gear_shift import SHIFT_UP, SHIFT_DOWN
+from key_injector import REFUSED
+
+# 主循环每帧发布的最小换挡输入; can_press = 游戏窗口聚焦且未暂停
+ShiftFrame = namedtuple('ShiftFrame', 't rpm gear clutch speed countdown can_press')
+
+# debug 模式下工作线程每帧发布的判定状态; 主循环只打印这份不可变快照，不调用工作线程独占的 AutoShiftLogic
+ShiftDebug = namedtuple('ShiftDebug', 't can_shift wanted cooling grace n1_threshold rpm_rate latency latency_samples')
+
+FRAME_STALE_TIME = 0.5  # 超过该时间未收到新帧(游戏暂停/退出)则不换挡
+STATS_INTERVAL = 10.0   # debug 模式下打印延迟直方图的间隔(秒)
+
+
+class ShiftWorker:
+    """换挡判定线程
+
+    settings: 无参函数，返回 (enabled, shift_up_rpm, shift_down_rpm, shift_up_cooldown, shift_down_cooldown)，
+    keys: 无参函数，返回 (gear_up_key, gear_down_key)；两者每次判定时调用，从而跟随热重载/预设切换。
+    injector: KeyInjector，升/降档互为冲突按键，冷却期内相撞的请求会被拒绝。
+    """
+
+    def __init__(self, logic, settings, keys, injector, rate_hz=500, debug=False):
+        self.logic = logic
+        self.settings = settings
+        self.keys = keys
+        self.injector = injector
+        self.period = 1.0 / max(50, min(2000, rate_hz))
+        self.debug = debug
+        self._latest = None  # (ShiftFrame, 发布时的 perf_counter_ns)
+        self.debug_state = None  # ShiftDebug，只在 debug 模式下更新
+        self._running = False
+        self.frame_age = LatencyHistogram("frame->decision")
+        self.shift_counts = {SHIFT_UP: 0, SHIFT_DOWN: 0}  # 已提交的换挡次数(只由工作线程自增)
+
+    def publish(self, frame):
+        """主循环调用: 替换最新帧(单次引用赋值，无需加锁)"""
+        self._latest = (frame, time.perf_counter_ns())
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.injector.start()
+        threading.Thread(target=self._decision_loop, name="ShiftWorker", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        self.injector.stop()
+
+    def stats(self):
+        return [self.frame_age.summary()] + self.injector.stats()
+
+    def _decision_loop(self):
+        last_frame = None
+        next_tick = time.perf_counter()
+        next_stats = time.time() + STATS_INTERVAL
+        while self._running:
+            latest = self._latest
+            if latest is not None:
+                frame, frame_ns = latest
+                if frame is not last_frame:
+                    last_frame = frame
+                    # 状态更新每帧只做一次，判定则每个 tick 都做(冷却到期即可立即换挡)
+                    self.logic.update_countdown(frame.countdown, frame.t)
+                    self.logic.observe(frame.gear, frame.rpm, frame.t)
+                    if self.debug:
+                        self._publish_debug(frame)
+                self._tick(frame, frame_ns)
+
+            if self.debug and time.time() >= next_stats:
+                next_stats = time.time() + STATS_INTERVAL
+                if self.frame_age.count:
+                    print("[ShiftWorker] " + " | ".join(self.stats()))
+
+            next_tick += self.period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()  # 落后时不追赶，避免连续空转
+
+    def _publish_debug(self, frame):
+        _, shift_up_rpm, shift_down_rpm, shift_up_cooldown, shift_down_cooldown = self.settings()
+        logic, now = self.logic, time.time()
+        wanted = logic.wanted_shift(frame.gear, frame.rpm, shift_up_rpm, shift_down_rpm, now)
+        self.debug_state = ShiftDebug(
+            now, logic.can_shift(frame.gear, frame.speed, frame.countdown, now), wanted,
+            bool(wanted) and logic.cooling_down(wanted, now, shift_up_cooldown, shift_down_cooldown),
+            logic.in_grace_period(now), logic.n_to_1_threshold(now),
+            logic.rpm_rate.rate() if logic.predictive else None,
+            logic.shift_latency.latency, logic.shift_latency.samples)
+
+    def _tick(self, frame, frame_ns):
+        enabled, shift_up_rpm, shift_down_rpm, shift_up_cooldown, shift_down_cooldown = self.settings()
+        now = time.time()
+        if not enabled or not frame.can_press or now - frame.t > FRAME_STALE_TIME:
+            return
+        if not self.logic.can_shift(frame.gear, frame.speed, frame.countdown, now):
+            return
+        direction = self.logic.decide(now, frame.gear, frame.rpm, frame.clutch, shift_up_rpm, shift_down_rpm,
+                                      shift_up_cooldown, shift_down_cooldown)
+        if direction:
+            self.frame_age.record_ns(time.perf_counter_ns() - frame_ns)
+            up_key, down_key = self.keys()
+            key, other = (up_key, down_key) if direction == SHIFT_UP else (down_key, up_key)
+            result = self.injector.submit(key, conflicts_with=(other,),
+                                          window=min(shift_up_cooldown, shift_down_cooldown))
+            if result == REFUSED:
+                if self.debug:
+                    print(f"[ShiftWorker] {direction} refused: conflicting shift still pending/recent")
+                return
+            # 提交即记录换挡时间(开始冷却)，避免按键执行期间重复判定
+            self.logic.commit(direction, frame.gear, now)
+            self.shift_counts[direction] += 1
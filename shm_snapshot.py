@@ -0,0 +1,144 @@
+"""
+Shared-memory Snapshot - 防撕裂的遥测快照(seqlock)
+The games write their telemetry blocks while we read them. SeqlockSnapshot reads the block's
+sequence field (AC: physics packetId, RBR: TelemetryData.totalSteps), copies the region, reads the
+sequence again and retries a bounded number of times if it changed, counting consistent reads,
+retries and reads that stayed inconsistent. It only needs two callables, so it works for an mmap
+(AC) as well as ReadProcessMemory (RBR).
+
+Self-check on any OS (a writer thread hammers an anonymous mmap):
+    python shm_snapshot.py --seconds 3
+"""
+import sys
+import mmap
+import time
+import struct
+import argparse
+import threading
+from ctypes import Structure, c_uint32, c_float, sizeof
+
+DEFAULT_RETRIES = 3
+_SEQUENCE_FORMATS = {1: '<B', 2: '<H', 4: '<I', 8: '<Q'}
+
+
+class SeqlockSnapshot:
+    """read_sequence(): 返回当前序号(读取失败时 None); copy_region(): 返回区域的一份副本(失败时 None)
+    odd_in_progress=True 时序号为奇数表示写入方正在写(标准 seqlock)；游戏的计数器序号保持 False"""
+
+    def __init__(self, read_sequence, copy_region, retries=DEFAULT_RETRIES, odd_in_progress=False):
+        self.read_sequence = read_sequence
+        self.copy_region = copy_region
+        self.retries = retries
+        self.odd_in_progress = odd_in_progress
+        self.reset_stats()
+
+    @classmethod
+    def over_buffer(cls, struct_type, buffer, sequence_field, **kwargs):
+        """buffer(mmap/bytearray/ctypes 实例) 开头是 struct_type; sequence_field 为其中的序号字段名"""
+        field = getattr(struct_type, sequence_field)
+        fmt, offset = _SEQUENCE_FORMATS[field.size], field.offset
+        return cls(lambda: struct.unpack_from(fmt, buffer, offset)[0],
+                   lambda: struct_type.from_buffer_copy(buffer), **kwargs)
+
+    def reset_stats(self):
+        self.reads = 0          # read() 调用次数
+        self.consistent = 0     # 得到一致快照的次数
+        self.retry_count = 0    # 因序号变化而重新复制的次数
+        self.inconsistent = 0   # 重试用尽仍不一致(返回最后一次副本)
+        self.failed = 0         # copy_region() 失败
+
+    def read(self):
+        """返回 (snapshot, consistent)；copy_region() 失败时返回 (None, False)"""
+        self.reads += 1
+        snapshot = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retry_count += 1
+            before = self.read_sequence()
+            snapshot = self.copy_region() if before is not None else None
+            if snapshot is None:
+                self.failed += 1
+                return None, False
+            if self.odd_in_progress and before & 1:
+                continue
+            after = self.read_sequence()
+            if after is None:
+                self.failed += 1
+                return None, False
+            if after == before:
+                self.consistent += 1
+                return snapshot, True
+        self.inconsistent += 1
+        return snapshot, False
+
+    def stats(self):
+        return {'reads': self.reads, 'consistent': self.consistent, 'retries': self.retry_count,
+                'inconsistent': self.inconsistent, 'failed': self.failed}
+
+    def stats_text(self):
+        return (f"{self.consistent}/{self.reads} consistent, {self.retry_count} retries, "
+                f"{self.inconsistent} inconsistent")
+
+
+###################################################################################
+# Self-check: 写线程按 seqlock 协议改写匿名 mmap，读方比较直接复制与 SeqlockSnapshot
+###################################################################################
+
+class _Block(Structure):
+    _fields_ = [("sequence", c_uint32), ("values", c_float * 16)]
+
+
+def _writer(buffer, stop):
+    """每一代把 16 个值都写成同一个数; 逐个字段写入，让读方有机会在中途复制"""
+    block = _Block.from_buffer(buffer)
+    generation = 0
+    while not stop.is_set():
+        generation += 1
+        block.sequence += 1            # 奇数: 正在写
+        for i in range(16):
+            block.values[i] = generation
+        block.sequence += 1            # 偶数: 写完
+    del block
+
+
+def _torn(block):
+    return any(v != block.values[0] for v in block.values)
+
+
+def hammer(seconds, retries=50):
+    """运行自检 seconds 秒，返回 (直接复制次数, 其中撕裂的次数, SeqlockSnapshot, 报告一致但撕裂的次数)"""
+    buffer = mmap.mmap(-1, sizeof(_Block))
+    stop = threading.Event()
+    writer = threading.Thread(target=_writer, args=(buffer, stop), daemon=True)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)  # 频繁切换线程，放大撕裂的概率
+    writer.start()
+    try:
+        snapshot = SeqlockSnapshot.over_buffer(_Block, buffer, 'sequence', odd_in_progress=True, retries=retries)
+        plain_reads = plain_torn = torn_accepted = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            plain_reads += 1
+            plain_torn += _torn(_Block.from_buffer_copy(buffer))
+            block, consistent = snapshot.read()
+            torn_accepted += consistent and _torn(block)
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(switch_interval)
+    return plain_reads, plain_torn, snapshot, torn_accepted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hammer an anonymous mmap and check snapshots are never torn")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    plain_reads, plain_torn, snapshot, torn_accepted = hammer(args.seconds)
+    print(f"plain copy: {plain_torn}/{plain_reads} torn")
+    print(f"seqlock:    {snapshot.stats_text()}, {torn_accepted} torn snapshots reported consistent")
+    return 1 if torn_accepted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
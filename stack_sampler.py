@@ -0,0 +1,94 @@
+"""
+Stack Sampler - 按需采样分析器
+Samples one thread's Python stack from a side thread via sys._current_frames() for a bounded window
+and writes the counts as collapsed stacks ("frame;frame;frame count" per line), the input format of
+flamegraph.pl, speedscope and inferno. The sampling thread only exists while a window is running,
+so there is no cost at all when it is not in use.
+
+    flamegraph.pl profiles/stacks_20260101_120000.folded > flame.svg
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+
+def collapse_stack(frame):
+    """由叶子帧向上回溯，返回 root;...;leaf 形式的字符串; 每帧为 "函数 (文件:行号)" """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class StackSampler:
+    """thread_id: 被采样线程(threading.get_ident())；每个窗口写一个 .folded 文件到 output_dir"""
+
+    def __init__(self, thread_id, output_dir, seconds=10.0, interval=0.005):
+        self.thread_id = thread_id
+        self.output_dir = output_dir
+        self.seconds = seconds
+        self.interval = interval
+        self._stop = None  # 运行中窗口的 threading.Event
+        self.last_path = None
+
+    @property
+    def running(self):
+        return self._stop is not None
+
+    def start(self):
+        """开始一个采样窗口；已在运行时返回 False"""
+        if self._stop is not None:
+            return False
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, args=(self._stop,), name="StackSampler", daemon=True).start()
+        return True
+
+    def stop(self):
+        """提前结束当前窗口(已采集的样本照常写出)"""
+        if self._stop is not None:
+            self._stop.set()
+
+    def toggle(self):
+        """热键回调: 未运行则开始，运行中则提前结束"""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def _run(self, stop):
+        counts = Counter()
+        started = time.perf_counter()
+        deadline = started + self.seconds
+        print(f"[StackSampler] sampling for up to {self.seconds:g}s every {self.interval * 1000:.0f}ms...")
+        # 采样线程需拿到 GIL 才能采样; 窗口内缩短 GIL 切换间隔，避免样本只落在主循环释放 GIL 的 sleep/IO 处
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval))
+        try:
+            while not stop.is_set() and time.perf_counter() < deadline:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is None:  # 被采样线程已退出
+                    break
+                counts[collapse_stack(frame)] += 1
+                del frame
+                stop.wait(self.interval)
+            self.last_path = self._write(counts)
+            print(f"[StackSampler] {sum(counts.values())} samples in {time.perf_counter() - started:.1f}s "
+                  f"-> {self.last_path}")
+        except OSError as e:
+            print(f"[StackSampler] failed to write profile: {e}")
+        finally:
+            sys.setswitchinterval(switch_interval)
+            self._stop = None
+
+    def _write(self, counts):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, time.strftime('stacks_%Y%m%d_%H%M%S.folded'))
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,82 @@
+"""
+Startup Report - 启动耗时报告
+Records wall-clock milestones from process creation (so interpreter start-up and PyInstaller
+unpacking are included) up to the first packet sent to DSX, together with the time spent in each
+lazily imported module, and prints them in the layout of `python -X importtime`.
+"""
+import sys
+import time
+import importlib
+
+FIRST_PACKET_TARGET = 1.0  # 进程创建到首个 DSX 数据包的目标时间(秒)
+
+
+def _process_start_time():
+    """进程创建时间(epoch 秒)；psutil 不可用时返回 None"""
+    try:
+        import psutil
+        return psutil.Process().create_time()
+    except Exception:
+        return None
+
+
+class StartupReport:
+    """在脚本最开始创建；mark() 记录阶段，first_packet() 在首个数据包发送后打印报告
+
+    verbose=False 时只打印一行首包耗时，True 时打印完整的阶段/导入耗时表。
+    """
+
+    def __init__(self, target=FIRST_PACKET_TARGET, verbose=False):
+        self.target = target
+        self.verbose = verbose
+        self.script_start = time.time()
+        self.process_start = _process_start_time() or self.script_start
+        self.marks = [('interpreter start-up', self.script_start)]
+        self.imports = []  # (module, 耗时秒)
+        self.first_packet_time = None
+
+    def mark(self, stage):
+        self.marks.append((stage, time.time()))
+
+    def import_module(self, name):
+        """导入模块并记录耗时(已导入的模块不记录)，返回模块对象"""
+        if name in sys.modules:
+            return sys.modules[name]
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports.append((name, time.perf_counter() - start))
+        return module
+
+    def first_packet(self):
+        """每次发送后都可调用；只有第一次会记录并打印"""
+        if self.first_packet_time is not None:
+            return
+        self.first_packet_time = time.time()
+        self.mark('first DSX packet')
+        print(self.report() if self.verbose else self.summary())
+
+    def time_to_first_packet(self):
+        if self.first_packet_time is None:
+            return None
+        return self.first_packet_time - self.process_start
+
+    def summary(self):
+        elapsed = self.time_to_first_packet()
+        if elapsed is None:
+            return "[Startup] no packet sent yet"
+        verdict = "OK" if elapsed <= self.target else "over target"
+        return f"[Startup] first DSX packet {elapsed * 1000:.0f} ms after process start " \
+               f"(target {self.target * 1000:.0f} ms, {verdict})"
+
+    def report(self):
+        lines = ["[Startup] self [ms] | cumulative [ms] | stage"]
+        previous = self.process_start
+        for stage, t in self.marks:
+            lines.append(f"[Startup] {(t - previous) * 1000:9.1f} | {(t - self.process_start) * 1000:16.1f} | {stage}")
+            previous = t
+        if self.imports:
+            lines.append("[Startup] lazy imports: self [ms] | module")
+            for name, seconds in self.imports:
+                lines.append(f"[Startup] {seconds * 1000:9.1f} | {name}")
+        lines.append(self.summary())
+        return "\n".join(lines)
@@ -0,0 +1,71 @@
+"""
+AC Packet Test - 仪表盘的每个滑移反馈滑块都必须改变 build_ac_packet() 的输出；配置文件重载整体替换 ConfigParser
+"""
+import configparser
+
+import pytest
+
+import Adaptive_Trigger_AC as ac
+from ac_config import load_runtime_config
+
+MAX_RPM = 8000
+
+
+@pytest.fixture(autouse=True)
+def default_config(monkeypatch):
+    """每个测试从默认参数开始，结束后恢复模块原来的快照"""
+    monkeypatch.setattr(ac, 'runtime_config', load_runtime_config(configparser.ConfigParser()))
+    monkeypatch.setattr(ac, 'last_saved_config', None)
+
+
+def slipping_physics(section, field):
+    """对应踏板踩下一半; 阈值滑块只让被测的那一轴打滑，其余滑块四轮中度打滑(percentage 在 0-1 之间)"""
+    physics = ac.ACPhysics()
+    physics.speedKmh = 100.0
+    physics.rpms = 6000
+    if section == 'BrakeSlip':
+        physics.brake, slip = 0.5, 2.0
+    else:
+        physics.gas, slip = 0.5, 1.0
+    if field.endswith('front_slip_threshold'):
+        physics.wheelSlip[0] = physics.wheelSlip[1] = 0.5
+    elif field.endswith('rear_slip_threshold'):
+        physics.wheelSlip[2] = physics.wheelSlip[3] = 0.5
+    else:
+        for i in range(4):
+            physics.wheelSlip[i] = slip
+    return physics
+
+
+@pytest.mark.parametrize('control', ac.SLIP_CONTROLS, ids=[c[0] for c in ac.SLIP_CONTROLS])
+def test_slider_changes_packet(control):
+    field, section, _, _, low, high, kind = control
+    physics = slipping_physics(section, field)
+    before = ac.build_ac_packet(physics, MAX_RPM).instructions
+    # 滑块移到离默认值较远的一端
+    default = getattr(ac.runtime_config, field)
+    ac.update_runtime_config(**{field: high if high - default > default - low else low})
+    after = ac.build_ac_packet(physics, MAX_RPM).instructions
+    assert after != before
+
+
+def test_reload_replaces_parser(tmp_path, monkeypatch):
+    path = tmp_path / 'config_ac.ini'
+    path.write_text("[BrakeSlip]\namplitude = 2\n", encoding='utf-8')
+    old_parser = configparser.ConfigParser()
+    old_parser.read_string("[Feedback]\ntrigger_strength = 1.5\n")
+    monkeypatch.setattr(ac, 'config_file', str(path))
+    monkeypatch.setattr(ac, 'config', old_parser)
+    ac.reload_config()
+    assert ac.config is not old_parser
+    assert not ac.config.has_section('Feedback')  # 文件中删除的段不会残留到下一次保存
+    assert ac.runtime_config.brake_amplitude == 2 and ac.runtime_config.brake_trigger.amplitude == 2
+
+
+def test_invalid_reload_keeps_config(tmp_path, monkeypatch):
+    path = tmp_path / 'config_ac.ini'
+    path.write_text("[BrakeSlip]\nmin_frequency = 60\nmax_frequency = 40\n", encoding='utf-8')
+    monkeypatch.setattr(ac, 'config_file', str(path))
+    before = ac.runtime_config
+    ac.reload_config()
+    assert ac.runtime_config is before
@@ -5,46 +5,19 @@ DSX Connection Test Tool
 测试与DSX的UDP连接是否正常
 """
 
-import socket
-import json
 import time
-from enum import Enum
+from adapter_core import InstructionType, Trigger, TriggerMode, Instruction, Packet, DSXClient
 
 # DSX配置
 DSX_IP = '127.0.0.1'
 DSX_PORT = 6969
 
-class InstructionType(Enum):
-    Invalid = 0
-    TriggerUpdate = 1
-    RGBUpdate = 2
-
-class Trigger(Enum):
-    Invalid = 0
-    Left = 1
-    Right = 2
-
-class TriggerMode(Enum):
-    Normal = 0
-    VibrateTriggerPulse = 11  # 脉冲振动
-
-class Instruction:
-    def __init__(self, instruction_type, parameters):
-        # instruction_type 现在已经是整数值了
-        self.type = instruction_type if isinstance(instruction_type, int) else instruction_type.value
-        self.parameters = parameters
-
-class Packet:
-    def __init__(self, instructions):
-        self.instructions = instructions
+dsx = DSXClient(DSX_IP, DSX_PORT)
 
 def send_to_dsx(packet):
     """发送数据包到DSX"""
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        message = json.dumps(packet, default=lambda o: o.__dict__)
-        sock.sendto(message.encode(), (DSX_IP, DSX_PORT))
-        sock.close()
+        dsx.send(packet)
         return True
     except Exception as e:
         print(f"[ERROR] Failed to send: {e}")
@@ -0,0 +1,73 @@
+"""
+KeyInjector Test - 通过 RecordingBackend 检查接受、合并、冲突拒绝与异步按提交顺序执行
+"""
+import time
+
+import pytest
+
+from key_injector import KeyInjector, RecordingBackend, ACCEPTED, COALESCED, REFUSED
+
+
+@pytest.fixture
+def injector():
+    injectors = []
+
+    def make(press_duration=0.0):
+        injector = KeyInjector(RecordingBackend(press_duration))
+        injector.start()
+        injectors.append(injector)
+        return injector
+    yield make
+    for injector in injectors:
+        injector.stop()
+
+
+def wait_idle(injector, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while injector.pending():
+        assert time.perf_counter() < deadline, "key presses did not finish"
+        time.sleep(0.001)
+
+
+def pressed_keys(injector):
+    return [key for _, key in injector.backend.presses]
+
+
+def test_accepted_key_is_pressed(injector):
+    keys = injector()
+    assert keys.submit('e') == ACCEPTED
+    wait_idle(keys)
+    assert pressed_keys(keys) == ['e']
+
+
+def test_duplicate_pending_key_is_coalesced(injector):
+    keys = injector(press_duration=0.1)
+    assert keys.submit('e') == ACCEPTED
+    assert keys.submit('e') == COALESCED  # 第一次按键仍在执行(保持在队列头部)
+    wait_idle(keys)
+    assert pressed_keys(keys) == ['e']
+    assert keys.coalesced == 1
+
+
+def test_conflicting_key_is_refused_within_window(injector):
+    keys = injector(press_duration=0.05)
+    assert keys.submit('e', conflicts_with=('q',), window=0.5) == ACCEPTED
+    assert keys.submit('q', conflicts_with=('e',), window=0.5) == REFUSED  # 'e' 仍在队列中
+    wait_idle(keys)
+    assert keys.submit('q', conflicts_with=('e',), window=0.5) == REFUSED  # 'e' 刚执行过，仍在窗口期内
+    assert keys.submit('q', conflicts_with=('e',), window=0.0) == ACCEPTED
+    wait_idle(keys)
+    assert pressed_keys(keys) == ['e', 'q']
+    assert keys.refused == 2
+
+
+def test_presses_run_async_in_submit_order(injector):
+    keys = injector(press_duration=0.05)
+    start = time.perf_counter()
+    for key in ('a', 'b', 'c'):
+        assert keys.submit(key) == ACCEPTED
+    assert time.perf_counter() - start < 0.05  # submit() 不等待按键执行
+    wait_idle(keys)
+    assert pressed_keys(keys) == ['a', 'b', 'c']
+    times = [t for t, _ in keys.backend.presses]
+    assert times == sorted(times)
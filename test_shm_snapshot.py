@@ -0,0 +1,24 @@
+"""
+SeqlockSnapshot Test - 写线程持续改写匿名 mmap，防撕裂读取不应把撕裂的副本报告为一致
+"""
+from shm_snapshot import SeqlockSnapshot, hammer
+
+
+def test_no_torn_snapshot_reported_consistent():
+    plain_reads, plain_torn, snapshot, torn_accepted = hammer(1.0)
+    assert torn_accepted == 0
+    assert snapshot.consistent > 0
+    assert snapshot.reads == plain_reads
+
+
+def test_failed_sequence_read_is_not_consistent():
+    # read_memory() 失败时返回 None; None == None 不能算作一致
+    snapshot = SeqlockSnapshot(lambda: None, lambda: b'block')
+    assert snapshot.read() == (None, False)
+    assert snapshot.failed == 1 and snapshot.consistent == 0
+
+
+def test_failed_copy():
+    snapshot = SeqlockSnapshot(lambda: 1, lambda: None)
+    assert snapshot.read() == (None, False)
+    assert snapshot.failed == 1
@@ -0,0 +1,45 @@
+"""
+Tick Profiler - 主循环分阶段耗时
+One LatencyHistogram per stage of the telemetry tick (memory read, derive, effects, shift, serialise,
+send, GUI handoff) plus the whole tick, so p50/p95/p99 and budget overruns can be shown in the
+dashboard and printed periodically. Recording is a bisect and a few integer increments; callers skip
+the perf_counter_ns() calls entirely when profiling is off.
+"""
+from latency_stats import LatencyHistogram
+
+STAGES = ('read', 'derive', 'effects', 'shift', 'serialise', 'send', 'gui')
+REPORT_INTERVAL = 10.0  # 控制台汇总间隔(秒)，每次打印后清零，显示的是最近一个区间
+
+
+class TickProfiler:
+    """budget_ns: 单个 tick 的时间预算(如 100Hz 为 10ms)，超出计为 overrun"""
+
+    def __init__(self, budget_ns, stages=STAGES):
+        self.budget_ns = budget_ns
+        self.stages = {name: LatencyHistogram(name) for name in stages}
+        self.tick = LatencyHistogram('tick')
+        self.overruns = 0
+
+    def record(self, stage, ns):
+        self.stages[stage].record_ns(ns)
+
+    def end_tick(self, ns):
+        self.tick.record_ns(ns)
+        if ns > self.budget_ns:
+            self.overruns += 1
+
+    def reset(self):
+        for histogram in self.stages.values():
+            histogram.reset()
+        self.tick.reset()
+        self.overruns = 0
+
+    def table(self):
+        """对齐的文本表: 每阶段一行 p50/p95/p99/max (微秒)，末行为 overrun 统计"""
+        lines = [f"{'stage':<10}{'n':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>9}  (us)"]
+        for histogram in list(self.stages.values()) + [self.tick]:
+            lines.append(f"{histogram.name:<10}{histogram.count:>8}{histogram.percentile_us(50):>8.0f}"
+                         f"{histogram.percentile_us(95):>8.0f}{histogram.percentile_us(99):>8.0f}"
+                         f"{histogram.max_ns / 1000:>9.0f}")
+        lines.append(f"overruns: {self.overruns}/{self.tick.count} ticks > {self.budget_ns / 1e6:.1f} ms")
+        return lines